@@ -1,5 +1,265 @@
-from django.contrib import admin
-from api.models import Employee
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.actions import delete_selected as confirm_delete_selected
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.admin.options import (
+    IS_POPUP_VAR, TO_FIELD_VAR, IncorrectLookupParameters, get_content_type_for_model
+)
+from django.contrib.admin.views.main import ERROR_FLAG, IGNORED_PARAMS, PAGE_VAR, SEARCH_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
 
+from api import stats
+from api.models import Department, Employee, EmployeeAggregate, WebhookSubscriber
+from api.pagination import KeysetPagination, decode_cursor, encode_cursor, seek
 
-admin.site.register(Employee)
+CURSOR_VAR = 'cursor'
+# Parameters of the changelist which don't filter its rows.
+NAVIGATION_PARAMS = IGNORED_PARAMS + (PAGE_VAR, ERROR_FLAG, CURSOR_VAR, IS_POPUP_VAR, TO_FIELD_VAR)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator taking its count from ``estimate`` when given, otherwise
+    counting at most ``max_count`` rows.
+    """
+    max_count = 10000
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, estimate=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        if self.estimate is not None:
+            return self.estimate
+        return self.object_list.order_by()[:self.max_count].count()
+
+    @property
+    def is_capped(self):
+        return self.estimate is None and self.count >= self.max_count
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist paged by keyset on the admin's ordering: ``previous`` and
+    ``next`` links carry a cursor instead of a page number, so deep pages
+    cost as much as the first one.
+    """
+
+    def get_queryset(self, request):
+        # the cursor positions the page, it doesn't filter the rows
+        self.cursor = self.params.pop(CURSOR_VAR, None)
+        return super().get_queryset(request)
+
+    def get_ordering(self, request, queryset):
+        return list(self.model_admin.ordering)
+
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        ordering = self.model_admin.ordering
+        reverse, position = False, None
+        if self.cursor is not None:
+            try:
+                reverse, position = decode_cursor(self.cursor, self.model_admin.ordering_types)
+            except ValueError:
+                raise IncorrectLookupParameters
+
+        page, has_next, has_previous = seek(self.queryset, ordering, position, reverse, self.list_per_page)
+        self.next_url = None
+        self.previous_url = None
+        if has_next:
+            self.next_url = self.get_page_url(page, -1, False)
+        if has_previous:
+            self.previous_url = self.get_page_url(page, 0, True)
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = page
+        self.can_show_all = False
+        self.multi_page = has_next or has_previous
+        self.paginator = paginator
+
+    def get_page_url(self, page, index, reverse):
+        if not page:
+            # a reversed cursor that ran past the first row; start over
+            return self.get_query_string()
+        position = [getattr(page[index], field) for field in self.model_admin.ordering]
+        return self.get_query_string({CURSOR_VAR: encode_cursor(reverse, position)})
+
+
+class AggregateListFilter(admin.SimpleListFilter):
+    """
+    List filter whose choices and counts come from the employee
+    aggregates of ``dimension``, rather than a DISTINCT over the table.
+    Rows are filtered on ``lookup``, by default the parameter name.
+    """
+    dimension = None
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        aggregates = EmployeeAggregate.objects.filter(dimension=self.dimension).order_by('value')
+        return [
+            (value, '{} ({})'.format(self.get_label(value), count))
+            for value, count in aggregates.values_list('value', 'count')
+        ]
+
+    def get_label(self, value):
+        return value
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.filter(**{self.lookup or self.parameter_name: self.value()})
+
+
+class DepartmentListFilter(AggregateListFilter):
+    title = 'department'
+    parameter_name = 'department'
+    dimension = 'department'
+    lookup = 'department__name'
+
+
+class GenderListFilter(AggregateListFilter):
+    title = 'gender'
+    parameter_name = 'gender'
+    dimension = 'gender'
+
+    def get_label(self, value):
+        return dict(Employee.GENDER_CHOICES).get(value, value)
+
+
+class EmployeeActionForm(ActionForm):
+    department = forms.CharField(max_length=100, required=False)
+    gender = forms.ChoiceField(choices=(('', '---------'),) + Employee.GENDER_CHOICES, required=False)
+
+
+class EmployeeAdmin(admin.ModelAdmin):
+    """
+    Admin of the employee table, built to stay fast on millions of rows:
+    counts are estimated, pages are seeked by keyset, filters read the
+    aggregates, search uses the full-text index and actions update the
+    selected rows in a single query, deletions included.
+    """
+    list_display = ('name', 'email', 'department', 'gender', 'birthdate', 'hire_date')
+    list_select_related = ('department',)
+    list_filter = (DepartmentListFilter, GenderListFilter)
+    search_fields = ('name', 'email', 'department__name')
+    autocomplete_fields = ('department',)
+    ordering = KeysetPagination.ordering
+    ordering_types = KeysetPagination.ordering_types
+    sortable_by = ()
+    list_per_page = 100
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    action_form = EmployeeActionForm
+    actions = ('update_selected',)
+    # objects listed on the delete confirmation page
+    deleted_objects_shown = 100
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page,
+                              estimate=self.estimate_count(request))
+
+    def estimate_count(self, request):
+        """
+        Count the employees from the aggregates when filtered by
+        department or gender alone, return None otherwise.
+        """
+        params = {key: value for key, value in request.GET.items() if key not in NAVIGATION_PARAMS}
+        if request.GET.get(SEARCH_VAR) or not set(params) <= {'department', 'gender'}:
+            return None
+        return stats.exact_count(params.get('department'), params.get('gender'))
+
+    def get_search_results(self, request, queryset, search_term):
+        # one full-text MATCH instead of a LIKE per field and word
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
+
+    def get_deleted_objects(self, objs, request):
+        # Employees own no related rows: summarize them instead of
+        # collecting every selected object.
+        count = objs.count() if isinstance(objs, QuerySet) else len(objs)
+        shown = objs.select_related('department') if isinstance(objs, QuerySet) else objs
+        deleted_objects = [str(obj) for obj in shown[:self.deleted_objects_shown]]
+        if count > len(deleted_objects):
+            deleted_objects.append('... and {} more'.format(count - len(deleted_objects)))
+        perms_needed = set() if self.has_delete_permission(request) else {self.opts.verbose_name}
+        return deleted_objects, {self.opts.verbose_name_plural: count}, perms_needed, []
+
+    def delete_queryset(self, request, queryset):
+        """
+        Delete the selected employees set-based, logging a single entry
+        that lists them instead of one per employee. Return how many.
+        """
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        deleted, _ = queryset.delete()
+        LogEntry.objects.log_action(
+            user_id=request.user.pk,
+            content_type_id=get_content_type_for_model(self.model).pk,
+            object_id=None,
+            object_repr='{} employees'.format(deleted),
+            action_flag=DELETION,
+            change_message='Deleted employees {}.'.format(', '.join(str(pk) for pk in pks)),
+        )
+        return deleted
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if 'delete_selected' in actions:
+            # kept under its name, which the confirmation page posts back
+            func, name, description = self.get_action('delete_selected_employees')
+            actions['delete_selected'] = (func, 'delete_selected', description)
+        return actions
+
+    def delete_selected_employees(self, request, queryset):
+        """Django's delete action, without its log entry and DELETE per employee."""
+        if not request.POST.get('post') or not self.has_delete_permission(request):
+            # the confirmation page
+            return confirm_delete_selected(self, request, queryset)
+        deleted = self.delete_queryset(request, queryset)
+        self.message_user(request, 'Successfully deleted {} employees.'.format(deleted), messages.SUCCESS)
+    delete_selected_employees.allowed_permissions = ('delete',)
+    delete_selected_employees.short_description = confirm_delete_selected.short_description
+
+    def update_selected(self, request, queryset):
+        """Set the department and/or gender of the selected employees in a single query."""
+        form = self.action_form(request.POST)
+        form.is_valid()
+        changes = {field: value for field, value in form.cleaned_data.items()
+                   if field in ('department', 'gender') and value}
+        if not changes:
+            self.message_user(request, 'Fill in a department or a gender to update.', messages.WARNING)
+            return
+        updated = queryset.update(**changes)
+        self.message_user(request, 'Updated {} employees.'.format(updated), messages.SUCCESS)
+    update_selected.short_description = 'Update department/gender of selected employees'
+
+
+admin.site.register(Employee, EmployeeAdmin)
+
+
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+admin.site.register(Department, DepartmentAdmin)
+
+
+class WebhookSubscriberAdmin(admin.ModelAdmin):
+    list_display = ('url', 'is_active', 'last_event_id', 'delivered_events', 'failures', 'retry_at')
+    list_filter = ('is_active',)
+    readonly_fields = ('last_event_id', 'failures', 'retry_at', 'last_error',
+                       'delivered_events', 'last_delivered', 'last_delivery_latency')
+
+
+admin.site.register(WebhookSubscriber, WebhookSubscriberAdmin)
@@ -0,0 +1,93 @@
+"""
+Authentication classes caching what they resolve, so the steady state
+read path runs no query on the user table, nor any password hashing.
+
+Cached users are dropped by api.receivers whenever the user is saved
+(which covers deactivation and password changes) or deleted, and expire
+after the cache's TTL otherwise, which bounds how long a change made
+behind the ORM's back, or in another process, can go unnoticed.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework.authentication import BasicAuthentication
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings
+
+jwt_get_username_from_payload = api_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER
+
+
+def get_cache():
+    return caches[settings.AUTH_CACHE]
+
+
+def get_user_key(username):
+    digest = hashlib.sha256(username.encode('utf-8')).hexdigest()
+    return 'auth:user:{}'.format(digest)
+
+
+def get_credentials_key(userid, password):
+    """
+    Key of verified Basic credentials: an HMAC keyed with SECRET_KEY, so
+    neither the password nor a plain hash of it ever reaches the cache.
+    """
+    digest = salted_hmac('api.authentication.basic', '{}:{}'.format(userid, password)).hexdigest()
+    return 'auth:basic:{}'.format(digest)
+
+
+def forget_user(username):
+    """Drop everything cached for ``username``."""
+    get_cache().delete(get_user_key(username))
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JSONWebTokenAuthentication keeping the users its tokens resolve to in
+    the auth cache. The token itself is still decoded and its signature
+    and expiration checked on every request.
+    """
+
+    def authenticate_credentials(self, payload):
+        username = jwt_get_username_from_payload(payload)
+        if not username:
+            return super().authenticate_credentials(payload)
+
+        cache = get_cache()
+        key = get_user_key(username)
+        user = cache.get(key)
+        if user is None:
+            user = super().authenticate_credentials(payload)
+            cache.set(key, user)
+        return user
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    BasicAuthentication remembering verified credentials in the auth
+    cache, so the password hasher only runs on the first request of a
+    client, and again once the entry expires.
+
+    Entries hold the user's session auth hash, derived from their
+    password hash, which must still match the cached user's: credentials
+    verified before a password change are never accepted after it.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        cache = get_cache()
+        credentials_key = get_credentials_key(userid, password)
+        verified = cache.get(credentials_key)
+        if verified is not None:
+            username, auth_hash = verified
+            user = cache.get(get_user_key(username))
+            if (user is not None and user.is_active and
+                    constant_time_compare(user.get_session_auth_hash(), auth_hash)):
+                return (user, None)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        cache.set_many({
+            get_user_key(user.get_username()): user,
+            credentials_key: (user.get_username(), user.get_session_auth_hash()),
+        })
+        return (user, auth)
@@ -0,0 +1,98 @@
+"""
+Benchmarks of the employee API, run with ``manage.py benchmark <name>``.
+
+Each benchmark module exposes ``add_arguments(parser)`` and
+``run(command, **options)``. They run against a throwaway test database
+so seeding them never touches real data.
+"""
+import random
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+FIRST_NAMES = (
+    'Ana', 'Beatriz', 'Bruno', 'Camila', 'Carlos', 'Daniel', 'Eduardo', 'Fernanda', 'Gabriel',
+    'Gustavo', 'Helena', 'Isabela', 'Joao', 'Julia', 'Larissa', 'Leonardo', 'Lucas', 'Mariana',
+    'Mateus', 'Pedro', 'Rafael', 'Rodrigo', 'Sofia', 'Thiago', 'Vitoria',
+)
+LAST_NAMES = (
+    'Almeida', 'Alves', 'Barbosa', 'Cardoso', 'Carvalho', 'Costa', 'Ferreira', 'Gomes', 'Lima',
+    'Martins', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Rodrigues', 'Santos', 'Silva', 'Souza',
+)
+# Departments and their share of the headcount.
+DEPARTMENTS = (
+    ('Development', 35), ('Operations', 20), ('Sales', 15), ('Marketing', 10),
+    ('Customer Service', 10), ('Finance', 4), ('Human Resources', 3), ('Legal', 3),
+)
+
+
+@contextmanager
+def benchmark_database(alias=DEFAULT_DB_ALIAS):
+    """Run the block against a freshly migrated test database."""
+    connection = connections[alias]
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def weighted_choice(generator, population, weights):
+    """Pick an item of ``population`` by ``weights``, as Random.choices does from Python 3.6."""
+    cumulative = list(accumulate(weights))
+    return population[bisect(cumulative, generator.random() * cumulative[-1])]
+
+
+def generate_employees(count, departments, seed=0):
+    """
+    Yield ``count`` unsaved employees with a realistic spread of names,
+    departments, ages (18 to 65) and tenures (up to 20 years).
+    ``departments`` maps the names of DEPARTMENTS to their Department.
+    """
+    from api.models import Employee
+
+    generator = random.Random(seed)
+    names, weights = zip(*DEPARTMENTS)
+    today = date.today()
+    for index in range(count):
+        first_name = generator.choice(FIRST_NAMES)
+        last_name = generator.choice(LAST_NAMES)
+        birthdate = today - timedelta(days=generator.randint(18 * 365, 65 * 365))
+        tenure = min(generator.expovariate(1 / 900), (today - birthdate).days - 18 * 365, 20 * 365)
+        yield Employee(
+            name='{} {}'.format(first_name, last_name),
+            email='{}.{}.{}@luizalabs.com'.format(first_name, last_name, index).lower(),
+            department=departments[weighted_choice(generator, names, weights)],
+            gender=generator.choice('MF'),
+            birthdate=birthdate,
+            hire_date=today - timedelta(days=int(tenure)),
+        )
+
+
+def seed_employees(count, seed=0, batch_size=5000):
+    """Insert ``count`` generated employees in a single transaction."""
+    from api.models import Department, Employee
+
+    with transaction.atomic():
+        departments = Department.objects.intern(name for name, weight in DEPARTMENTS)
+        employees = generate_employees(count, departments, seed)
+        while True:
+            batch = [employee for _, employee in zip(range(batch_size), employees)]
+            if not batch:
+                return
+            Employee.objects.bulk_create(batch)
+
+
+def best_of(repeat, function):
+    """Return the best wall time of ``repeat`` calls and the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
@@ -0,0 +1,55 @@
+"""
+Compare BasicAuthentication with CachedBasicAuthentication on employee
+retrieve requests sent through the WSGI application.
+"""
+import base64
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import BasicAuthentication
+
+from api.benchmarks import seed_employees
+from api.benchmarks.load import PASSWORD, USERNAME, run_scenario
+
+
+def add_arguments(parser):
+    parser.add_argument('--employees', type=int, default=1000, help='Employees seeded (default: 1000).')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per class (default: 200).')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per class (default: 10).')
+
+
+def run(command, employees, requests, warmup, **options):
+    from django.contrib.auth import get_user_model
+    from luizalabs_employee_management.wsgi import application
+
+    from api.authentication import CachedBasicAuthentication
+    from api.models import Employee
+    from api.views import EmployeeViewSet
+
+    seed_employees(employees)
+    get_user_model().objects.create_user(USERNAME, password=PASSWORD)
+    ids = list(Employee.objects.values_list('pk', flat=True))
+    credentials = base64.b64encode('{}:{}'.format(USERNAME, PASSWORD).encode('utf-8')).decode('ascii')
+    headers = {'HTTP_AUTHORIZATION': 'Basic {}'.format(credentials)}
+
+    results = []
+    authentication_classes = EmployeeViewSet.authentication_classes
+    try:
+        for authentication_class in (BasicAuthentication, CachedBasicAuthentication):
+            EmployeeViewSet.authentication_classes = (authentication_class,)
+            # both classes request the same employees: start each from an
+            # empty response cache so only authentication differs
+            caches[settings.EMPLOYEE_CACHE].clear()
+            generator = random.Random(0)
+            result = run_scenario(application, lambda: (
+                'GET', '/api/v1/employees/{}/'.format(generator.choice(ids)), None, headers
+            ), requests, warmup)
+            results.append(result)
+            command.stdout.write('{:<27} {:>8.1f} req/s  p50 {:>7.2f}ms  p95 {:>7.2f}ms'.format(
+                authentication_class.__name__, result['throughput'], result['p50'], result['p95']
+            ))
+    finally:
+        EmployeeViewSet.authentication_classes = authentication_classes
+
+    command.stdout.write('Speedup: {:.1f}x'.format(results[1]['throughput'] / results[0]['throughput']))
@@ -0,0 +1,239 @@
+"""
+Drive the employee API through its WSGI application, scenario by
+scenario, reporting throughput, latency percentiles and SQL queries.
+
+Every scenario sends ``--requests`` requests one after the other, after
+``--warmup`` unmeasured ones. Results can be saved as a baseline and
+later runs compared against it: a scenario regresses when it runs more
+queries per request than its baseline and, when ``--tolerance`` is
+given, when its p95 latency grows past the baseline by more than that
+(and a millisecond). Latencies only compare on the machine the baseline
+was measured on, query counts compare anywhere.
+"""
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.benchmarks import DEPARTMENTS, seed_employees
+
+PERCENTILES = (50, 95, 99)
+# Latency growth, in milliseconds, below which a p95 is never a regression:
+# the fastest scenarios take about a millisecond and vary by as much.
+NOISE = 1.0
+USERNAME = 'benchmark'
+PASSWORD = 'benchmark123456'
+# Reads the response cache would answer after the first request: it is
+# cleared before each of theirs, so the database work is what gets measured.
+COLD_SCENARIOS = ('list', 'filter', 'search')
+
+
+def call(application, method, path, data=None, headers=None):
+    """Call the WSGI ``application``, returning its status code and body."""
+    path, _, query = path.partition('?')
+    body = json.dumps(data).encode('utf-8') if data is not None else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    }
+    environ.update(headers or {})
+    setup_testing_defaults(environ)
+
+    status = []
+    chunks = application(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+    try:
+        content = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return int(status[0].split()[0]), content
+
+
+class QueryCounter(object):
+    """Execute wrapper counting the statements run on a connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(timings, percent):
+    """Return the nearest rank ``percent`` percentile of sorted ``timings``."""
+    return timings[max(int(math.ceil(percent / 100 * len(timings))) - 1, 0)]
+
+
+def get_scenarios(generator, ids, token):
+    """
+    Return ``{name: make_request}``, where every call of ``make_request``
+    gives the ``(method, path, data, headers)`` of a new request.
+    """
+    auth = {'HTTP_AUTHORIZATION': 'JWT {}'.format(token)}
+    departments = [department for department, weight in DEPARTMENTS]
+    created = iter(range(10 ** 9))
+
+    def employee():
+        return {
+            'name': 'benchmark employee',
+            'email': 'benchmark.{}@luizalabs.com'.format(next(created)),
+            'department': generator.choice(departments),
+            'gender': generator.choice('MF'),
+            'birthdate': '1990-01-01',
+            'hire_date': '2015-06-01',
+        }
+
+    return OrderedDict([
+        ('list', lambda: (
+            'GET', '/api/v1/employees/?page_size={}'.format(generator.choice((20, 50, 100))), None, auth
+        )),
+        ('filter', lambda: ('GET', '/api/v1/employees/?' + urlencode({
+            'department': generator.choice(departments),
+            'gender': generator.choice('MF'),
+            'hire_date_after': '{}-01-01'.format(generator.randint(2000, 2019)),
+        }), None, auth)),
+        ('search', lambda: ('GET', '/api/v1/employees/?' + urlencode({
+            'q': generator.choice(('silva', 'ana costa', 'develop', 'oliveira sales')),
+        }), None, auth)),
+        ('retrieve', lambda: ('GET', '/api/v1/employees/{}/'.format(generator.choice(ids)), None, auth)),
+        ('create', lambda: ('POST', '/api/v1/employees/', employee(), auth)),
+        ('patch', lambda: ('PATCH', '/api/v1/employees/{}/'.format(generator.choice(ids)), {
+            'department': generator.choice(departments),
+        }, auth)),
+        ('jwt_obtain', lambda: ('POST', '/api-token-auth/', {
+            'username': USERNAME, 'password': PASSWORD,
+        }, None)),
+        ('jwt_refresh', lambda: ('POST', '/api-token-refresh/', {'token': token}, None)),
+    ])
+
+
+def run_scenario(application, make_request, requests, warmup, cold=False):
+    """
+    Send ``warmup`` then ``requests`` requests, returning the measures of
+    the latter. When ``cold``, the employee cache is cleared before each.
+    """
+    counter = QueryCounter()
+    timings = []
+    queries = []
+    with connections[DEFAULT_DB_ALIAS].execute_wrapper(counter):
+        for index in range(warmup + requests):
+            method, path, data, headers = make_request()
+            if cold:
+                caches[settings.EMPLOYEE_CACHE].clear()
+            counter.count = 0
+            start = time.perf_counter()
+            status, content = call(application, method, path, data, headers)
+            elapsed = time.perf_counter() - start
+            if status >= 400:
+                raise RuntimeError('{} {} answered {}: {}'.format(method, path, status, content[:200]))
+            if index >= warmup:
+                timings.append(elapsed)
+                queries.append(counter.count)
+
+    timings.sort()
+    result = OrderedDict([
+        ('requests', requests),
+        ('throughput', round(requests / sum(timings), 1)),
+    ])
+    for percent in PERCENTILES:
+        result['p{}'.format(percent)] = round(percentile(timings, percent) * 1000, 3)
+    result['queries'] = round(sum(queries) / requests, 2)
+    result['max_queries'] = max(queries)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every regression of ``results`` against ``baseline``."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['max_queries'] > expected['max_queries']:
+            regressions.append('{}: {} queries per request, baseline {}'.format(
+                name, result['max_queries'], expected['max_queries']
+            ))
+        if tolerance is not None and result['p95'] > expected['p95'] * (1 + tolerance) + NOISE:
+            regressions.append('{}: p95 {:.1f}ms, baseline {:.1f}ms'.format(name, result['p95'], expected['p95']))
+    return regressions
+
+
+def add_arguments(parser):
+    parser.add_argument('--employees', type=int, default=10000,
+                        help='Employees seeded before the scenarios run, 10000 to 1000000 (default: 10000).')
+    parser.add_argument('--requests', type=int, default=500, help='Measured requests per scenario (default: 500).')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per scenario (default: 20).')
+    parser.add_argument('--scenario', action='append', dest='scenarios',
+                        help='Only run this scenario, can be repeated (default: all of them).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data and requests.')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare against.')
+    parser.add_argument('--tolerance', type=float,
+                        help='p95 latency growth over the baseline tolerated, as a fraction, e.g. 0.5 '
+                             '(default: latencies are not compared, only queries).')
+    parser.add_argument('--save', help='Write the results as JSON to this file, e.g. to make a new baseline.')
+
+
+def run(command, employees, requests, warmup, scenarios, seed, baseline, tolerance, save, **options):
+    from django.contrib.auth import get_user_model
+    from luizalabs_employee_management.wsgi import application
+
+    from api.models import Employee
+
+    if requests < 1:
+        return '--requests must be a positive number.'
+
+    command.stdout.write('Seeding {} employees...'.format(employees))
+    seed_employees(employees, seed=seed)
+    get_user_model().objects.create_user(USERNAME, password=PASSWORD)
+    status, content = call(application, 'POST', '/api-token-auth/', {'username': USERNAME, 'password': PASSWORD})
+    token = json.loads(content.decode('utf-8'))['token']
+
+    ids = list(Employee.objects.values_list('pk', flat=True))
+    available = get_scenarios(random.Random(seed), ids, token)
+    unknown = set(scenarios or ()) - set(available)
+    if unknown:
+        return 'Unknown scenarios: {}. Choose among {}.'.format(', '.join(sorted(unknown)), ', '.join(available))
+
+    results = OrderedDict()
+    command.stdout.write('{:<12} {:>10} {:>9} {:>9} {:>9} {:>8} {:>8}'.format(
+        'scenario', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'max'
+    ))
+    for name, make_request in available.items():
+        if scenarios and name not in scenarios:
+            continue
+        result = results[name] = run_scenario(application, make_request, requests, warmup,
+                                              cold=name in COLD_SCENARIOS)
+        command.stdout.write('{:<12} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>8.1f} {:>8}'.format(
+            name, result['throughput'], result['p50'], result['p95'], result['p99'],
+            result['queries'], result['max_queries']
+        ))
+
+    if save:
+        with open(save, 'w') as results_file:
+            json.dump({'employees': employees, 'scenarios': results}, results_file, indent=2)
+            results_file.write('\n')
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            expected = json.load(baseline_file)
+        if expected['employees'] != employees:
+            command.stderr.write('Baseline was measured with {} employees, latencies may not compare.'.format(
+                expected['employees']
+            ))
+        regressions = compare(results, expected['scenarios'], tolerance)
+        if regressions:
+            return 'Regressions against {}:\n{}'.format(baseline, '\n'.join(regressions))
+        command.stdout.write(command.style.SUCCESS('No regression against the baseline.'))
@@ -0,0 +1,68 @@
+"""
+Compare JSONRenderer with the MessagePack and columnar JSON renderers on
+employee list pages: encode time and payload size, raw and gzipped.
+"""
+import gzip
+import json
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import msgpack
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarks import best_of, seed_employees
+from api.renderers import ColumnarJSONRenderer, MessagePackRenderer
+
+RENDERERS = (
+    ('json', JSONRenderer),
+    ('msgpack', MessagePackRenderer),
+    ('columnar', ColumnarJSONRenderer),
+)
+EPOCH = date(1970, 1, 1)
+
+
+def add_arguments(parser):
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 10000, 100000],
+                        help='Sizes of the rendered lists (default: 100 10000 100000).')
+    parser.add_argument('--repeat', type=int, default=3, help='Renders of each size, the best one counts.')
+
+
+def decode(name, content, date_fields):
+    """Return the data rendered as ``content`` by the renderer ``name``, in the JSON layout."""
+    if name == 'msgpack':
+        return msgpack.unpackb(content, raw=False)
+    data = json.loads(content.decode('utf-8'))
+    if name == 'columnar':
+        columns = data['results']
+        for field in date_fields:
+            columns[field] = [(EPOCH + timedelta(days=days)).isoformat() for days in columns[field]]
+        data['results'] = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return data
+
+
+def run(command, rows, repeat, **options):
+    from api.models import Employee
+    from api.serializers import EmployeeRowSerializer
+    from api.views import EmployeeViewSet
+
+    seed_employees(max(rows))
+    serializer = EmployeeRowSerializer()
+    view = EmployeeViewSet()
+    date_fields = ColumnarJSONRenderer().get_date_fields({'view': view})
+
+    command.stdout.write('{:>8} {:10} {:>10} {:>10} {:>12} {:>12}'.format(
+        'rows', 'renderer', 'encode ms', 'rows/s', 'bytes', 'gzip bytes'
+    ))
+    for size in rows:
+        queryset = serializer.get_queryset(Employee.objects.order_by('name', 'id')[:size])
+        data = OrderedDict([('next', None), ('previous', None), ('results', serializer.to_representation(queryset))])
+        expected = json.loads(json.dumps(data))
+
+        for name, renderer_class in RENDERERS:
+            renderer = renderer_class()
+            encode_time, content = best_of(repeat, lambda: renderer.render(data, renderer_context={'view': view}))
+            command.stdout.write('{:8} {:10} {:10.2f} {:10.0f} {:12} {:12}'.format(
+                size, name, encode_time * 1000, size / encode_time, len(content), len(gzip.compress(content))
+            ))
+            if decode(name, content, date_fields) != expected:
+                return '{} output of {} rows decodes to other data.'.format(name, size)
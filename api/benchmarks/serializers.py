@@ -0,0 +1,38 @@
+"""
+Compare EmployeeRowSerializer with EmployeeSerializer on a full listing,
+from the query to the rendered JSON bytes, which must be identical.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarks import best_of, seed_employees
+
+
+def add_arguments(parser):
+    parser.add_argument('--rows', type=int, default=100000, help='Employees to serialize (default: 100000).')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each serializer, the best one counts.')
+
+
+def run(command, rows, repeat, **options):
+    from api.models import Employee
+    from api.serializers import EmployeeRowSerializer, EmployeeSerializer
+
+    seed_employees(rows)
+    renderer = JSONRenderer()
+
+    def model_serializer():
+        return renderer.render(EmployeeSerializer(Employee.objects.all(), many=True).data)
+
+    def row_serializer():
+        serializer = EmployeeRowSerializer()
+        return renderer.render(serializer.to_representation(serializer.get_queryset(Employee.objects.all())))
+
+    model_time, model_output = best_of(repeat, model_serializer)
+    row_time, row_output = best_of(repeat, row_serializer)
+
+    command.stdout.write('EmployeeSerializer:    {:8.3f}s {:10.0f} rows/s'.format(model_time, rows / model_time))
+    command.stdout.write('EmployeeRowSerializer: {:8.3f}s {:10.0f} rows/s'.format(row_time, rows / row_time))
+    command.stdout.write('Speedup: {:.1f}x'.format(model_time / row_time))
+
+    if model_output != row_output:
+        return 'Rendered outputs differ.'
+    command.stdout.write('Rendered outputs are byte identical ({} bytes).'.format(len(row_output)))
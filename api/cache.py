@@ -0,0 +1,167 @@
+"""
+Response cache for the employee read routes.
+
+Entries are keyed on a generation token stored in the same cache. Every
+write to employees replaces the token, so all entries written before it
+stop being read and age out through the backend's TTL and eviction.
+Entries are also keyed on the database the request reads from, so what
+was read on a lagging replica is never served to reads of the primary.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.response import Response
+
+from api.routers import get_read_database
+
+GENERATION_KEY = 'employees:generation'
+LAST_DELETED_KEY = 'employees:last-deleted'
+HITS_KEY = 'employees:response:hits'
+MISSES_KEY = 'employees:response:misses'
+
+
+def get_cache():
+    return caches[settings.EMPLOYEE_CACHE]
+
+
+def get_generation():
+    """Return the current generation, starting a new one if there's none."""
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached response."""
+    get_cache().set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def get_last_deleted():
+    """
+    Return when an employee was last deleted. When unknown, because it
+    was never recorded or got evicted, assume it just happened.
+    """
+    cache = get_cache()
+    last_deleted = cache.get(LAST_DELETED_KEY)
+    if last_deleted is None:
+        cache.add(LAST_DELETED_KEY, timezone.now(), timeout=None)
+        last_deleted = cache.get(LAST_DELETED_KEY)
+    return last_deleted
+
+
+def set_last_deleted():
+    get_cache().set(LAST_DELETED_KEY, timezone.now(), timeout=None)
+
+
+def increment(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    """Return the hit/miss counters of the response cache."""
+    counters = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else None,
+    }
+
+
+def get_key(kind, *parts, generation=None):
+    """
+    Build the key of an entry of ``kind`` identified by ``parts``, in
+    ``generation`` or else the current one, read from the database reads
+    are routed to.
+    """
+    digest = hashlib.md5(repr((get_read_database(),) + parts).encode('utf-8')).hexdigest()
+    return 'employees:{}:{}:{}'.format(kind, generation or get_generation(), digest)
+
+
+def get_response_key(request, action, kind='response', ignore=()):
+    """
+    Build the cache key of ``request``: the same query parameters in any
+    order share an entry, and the ``ignore``d ones don't count. Scheme
+    and host are part of it since paginated responses carry absolute links.
+    """
+    params = sorted(
+        (key, value)
+        for key in request.query_params if key not in ignore
+        for value in request.query_params.getlist(key)
+    )
+    return get_key(kind, action, request.build_absolute_uri(request.path), params)
+
+
+def get_or_set(key, compute):
+    """Return the value cached under ``key``, calling ``compute`` to fill it in when missing."""
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+def get_many(kind, identifiers, generation):
+    """Return a dict of the entries of ``kind`` cached in ``generation`` for ``identifiers``."""
+    keys = {get_key(kind, identifier, generation=generation): identifier for identifier in identifiers}
+    return {keys[key]: value for key, value in get_cache().get_many(list(keys)).items()}
+
+
+def set_many(kind, values, generation):
+    """
+    Cache the ``values`` of ``kind``, a dict keyed by identifier, in
+    ``generation``: the one current before they were read, so values
+    read across a write are never served.
+    """
+    get_cache().set_many({
+        get_key(kind, identifier, generation=generation): value for identifier, value in values.items()
+    })
+
+
+def get_or_compute(request, action, kind, compute, ignore=()):
+    """
+    Return the value cached for ``request`` under ``kind``, calling
+    ``compute`` to fill it in when missing.
+    """
+    return get_or_set(get_response_key(request, action, kind, ignore), compute)
+
+
+class CachedResponseMixin(object):
+    """
+    Serve list and retrieve from the employee cache, keeping only
+    successful responses.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = get_response_key(request, self.action)
+        data = cache.get(key)
+        if data is not None:
+            increment(HITS_KEY)
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        increment(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+            response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,105 @@
+"""
+Change feed of the employee table.
+
+Employees are read in ``(updated, id)`` order and deletions from their
+tombstones in ``(deleted, id)`` order, both through indexes, and merged
+by time. A cursor holds the position reached in each of them, so a
+mirror resuming from it gets exactly what changed since, in
+O(changes) rather than O(table).
+
+Changes younger than ``settings.CHANGE_FEED_DELAY`` seconds are held
+back: a transaction may commit a row stamped before the last one
+returned, and it must not be skipped. Stamps are taken when rows are
+written, before the transaction commits, so this only holds for
+transactions committing within the delay after writing: the setting
+has to exceed the longest of them.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from api.pagination import decode_cursor, encode_cursor, keyset_filter
+
+EMPLOYEE_ORDERING = ('updated', 'id')
+TOMBSTONE_ORDERING = ('deleted', 'id')
+
+
+def encode_position(employee_position, tombstone_position):
+    """Return the cursor of the positions reached in employees and tombstones."""
+    position = []
+    for changed, pk in (employee_position, tombstone_position):
+        position += [changed.isoformat() if changed is not None else None, pk]
+    return encode_cursor(False, position)
+
+
+def decode_position(cursor):
+    """
+    Return the ``(employee position, tombstone position)`` pair of
+    ``cursor``, raising ValueError when it isn't one.
+    """
+    # each position is a (time, id) pair, or (None, None) before the first change
+    reverse, position = decode_cursor(cursor, ((str, type(None)), (int, type(None))) * 2)
+    positions = []
+    for changed, pk in (position[:2], position[2:]):
+        if changed is None and pk is None:
+            positions.append((None, None))
+            continue
+        changed = parse_datetime(changed) if isinstance(changed, str) else None
+        if reverse or changed is None or not isinstance(pk, int):
+            raise ValueError('Invalid cursor')
+        positions.append((changed, pk))
+    return tuple(positions)
+
+
+def seek_after(queryset, ordering, position, size):
+    """Return the first ``size + 1`` rows of ``queryset`` after ``position`` in ``ordering``."""
+    if position[0] is not None:
+        queryset = queryset.filter(keyset_filter(ordering, position))
+    return list(queryset.order_by(*ordering)[:size + 1])
+
+
+def get_changes(employees, tombstones, positions, size, serializer):
+    """
+    Return ``(changes, positions, has_more)``: the next ``size`` changes
+    after ``positions``, the positions they lead to, and whether more
+    changes are already waiting.
+
+    ``employees`` is read through ``serializer``, a row serializer whose
+    rows carry the "updated" and "id" columns.
+    """
+    until = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_DELAY)
+    employee_position, tombstone_position = positions
+
+    rows = seek_after(
+        serializer.get_queryset(employees.filter(updated__lt=until)), EMPLOYEE_ORDERING, employee_position, size
+    )
+    deleted = seek_after(
+        tombstones.filter(deleted__lt=until), TOMBSTONE_ORDERING, tombstone_position, size
+    )
+
+    changes = sorted(
+        [(row.updated, 'upsert', row.id, row) for row in rows] +
+        [(tombstone.deleted, 'delete', tombstone.id, tombstone) for tombstone in deleted],
+        key=lambda change: change[:3]
+    )
+    has_more = len(changes) > size
+    changes = changes[:size]
+
+    representations = iter(serializer.to_representation([
+        row for changed, kind, pk, row in changes if kind == 'upsert'
+    ]))
+    timestamp = serializers.DateTimeField()
+    data = []
+    for changed, kind, pk, row in changes:
+        if kind == 'upsert':
+            employee_position = (changed, pk)
+            data.append({'type': kind, 'id': row.id, 'changed': timestamp.to_representation(changed),
+                         'employee': next(representations)})
+        else:
+            tombstone_position = (changed, pk)
+            data.append({'type': kind, 'id': row.employee_id, 'changed': timestamp.to_representation(changed),
+                         'email': row.email})
+    return data, (employee_position, tombstone_position), has_more
@@ -0,0 +1,79 @@
+"""
+Conditional GET for the employee read routes.
+
+Validators are derived from ``Employee.updated`` with a single aggregate
+query, so a client whose copy is still fresh gets its 304 Not Modified
+before any row is fetched or serialized. They are kept in the employee
+cache next to the responses, and invalidated along with them.
+"""
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from api import cache
+
+
+def get_etag(request, *validators):
+    """
+    Build an ETag from ``validators`` and what else shapes the response:
+    the full path, query string included, and the negotiated media type.
+    """
+    signature = repr((request.get_full_path(), request.accepted_media_type) + validators)
+    return quote_etag(hashlib.md5(signature.encode('utf-8')).hexdigest())
+
+
+def get_timestamp(value):
+    return timegm(value.utctimetuple()) if value is not None else None
+
+
+class ConditionalGetMixin(object):
+    """
+    Answer list and retrieve with ETag and Last-Modified headers, and
+    with 304 Not Modified when the client's validators still match.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregates = cache.get_or_compute(
+            request, self.action, 'validators',
+            lambda: queryset.order_by().aggregate(last_updated=Max('updated'), count=Count('pk'))
+        )
+
+        # Deleting an employee changes the count but not MAX(updated).
+        last_modified = aggregates['last_updated']
+        last_deleted = cache.get_last_deleted()
+        if last_modified is None or (last_deleted is not None and last_deleted > last_modified):
+            last_modified = last_deleted
+
+        etag = get_etag(request, aggregates['last_updated'], aggregates['count'])
+        return self.get_conditional_response(super().list, etag, last_modified, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        updated = cache.get_or_compute(
+            request, self.action, 'validators',
+            lambda: queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                            .order_by().values_list('updated', flat=True).first()
+        )
+        if updated is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = get_etag(request, updated)
+        return self.get_conditional_response(super().retrieve, etag, updated, request, *args, **kwargs)
+
+    def get_conditional_response(self, handler, etag, last_modified, request, *args, **kwargs):
+        timestamp = get_timestamp(last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,81 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+class SparseFieldsetMixin(object):
+    """
+    Let read requests of `fieldset_actions` pick the fields they get with
+    ``?fields=a,b`` and leave some out with ``?exclude=c``. Only the
+    chosen columns are read from the database. Writes always validate
+    and return every field.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+    fieldset_actions = ('list', 'retrieve')
+    requested_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # reject unknown fields before any cached or conditional response
+        self.requested_fields = self.get_requested_fields(request)
+
+    def get_requested_fields(self, request):
+        """
+        Return the tuple of fields asked for, in the serializer's order,
+        or None for all of them.
+        """
+        if request.method not in SAFE_METHODS or self.action not in self.fieldset_actions:
+            return None
+        include = self.parse_fields(request, self.fields_query_param)
+        exclude = self.parse_fields(request, self.exclude_query_param)
+        if include is None and exclude is None:
+            return None
+
+        available = self.get_serializer_class().Meta.fields
+        fields = tuple(
+            name for name in available
+            if (include is None or name in include) and name not in (exclude or ())
+        )
+        if not fields:
+            raise serializers.ValidationError({self.fields_query_param: ['No field left to return.']})
+        return fields
+
+    def parse_fields(self, request, param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        available = self.get_serializer_class().Meta.fields
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise serializers.ValidationError({param: ['Unknown fields: {}. Choose among {}.'.format(
+                ', '.join(unknown), ', '.join(available)
+            )]})
+        return names
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault('fields', self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_row_serializer(self, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault('fields', self.requested_fields)
+        return super().get_row_serializer(**kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.requested_fields is not None:
+            fields = list(self.requested_fields)
+            selected = queryset.query.select_related
+            if isinstance(selected, dict):
+                # only join the related rows of the chosen fields, reading
+                # just the columns they are represented by
+                kept = [name for name in selected if name in fields]
+                queryset = queryset.select_related(None)
+                if kept:
+                    queryset = queryset.select_related(*kept)
+                    fields += [self.row_serializer_class.get_column(name) for name in kept]
+            # values() and values_list() override this with their own columns
+            queryset = queryset.only(*fields)
+        return queryset
@@ -0,0 +1,283 @@
+"""
+Declarative filtering of employee lists.
+
+A FilterSet declares the query parameters it accepts as ``(param,
+filter)`` pairs. Every filter validates and normalizes its raw value
+before touching the queryset, so invalid values are rejected with a 400
+listing every faulty parameter, and two requests asking for the same
+rows, whatever the order of their parameters and values, share the same
+signature, usable as a cache key.
+
+Multi-value filters take comma separated values (``department_exact=A,B``)
+or repeated parameters, matched in a single query.
+"""
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.filters import BaseFilterBackend
+
+from api.models import Employee
+
+
+class Filter(object):
+    """
+    Base class of filters. ``many`` filters accept several values, kept
+    sorted and without duplicates.
+    """
+    many = False
+    description = ''
+
+    def __init__(self, field_name=None, many=None):
+        self.field_name = field_name
+        if many is not None:
+            self.many = many
+
+    def clean(self, raw_values):
+        """Return the value, or the tuple of values, parsed from ``raw_values``."""
+        if not self.many:
+            return self.parse(raw_values[-1].strip())
+        values = {
+            self.parse(value.strip())
+            for raw_value in raw_values for value in raw_value.split(',') if value.strip()
+        }
+        if not values:
+            raise serializers.ValidationError('Enter at least one value.')
+        return tuple(sorted(values))
+
+    def parse(self, value):
+        if not value:
+            raise serializers.ValidationError('This field may not be blank.')
+        return value
+
+    def to_signature(self, value):
+        values = value if self.many else (value,)
+        return ','.join(str(value) for value in values)
+
+    def filter(self, queryset, value):
+        raise NotImplementedError('Filter class requires .filter() to be implemented')
+
+
+class SearchFilter(Filter):
+    description = 'Employees containing every word in their name, email or department.'
+
+    def filter(self, queryset, value):
+        return queryset.search(value)
+
+
+class ContainsFilter(Filter):
+    """Substring match, case insensitive, answered by the full-text index."""
+    many = True
+    description = 'Contains any of the values, case insensitive.'
+
+    def filter(self, queryset, value):
+        return queryset.contains_any(self.field_name, value)
+
+
+class ExactFilter(Filter):
+    """Exact match, as an IN list when given several values."""
+    many = True
+    description = 'Equal to any of the values.'
+
+    def __init__(self, field_name=None, many=None, choices=None):
+        super().__init__(field_name, many)
+        self.choices = choices
+
+    def parse(self, value):
+        value = super().parse(value)
+        if self.choices is not None and value not in self.choices:
+            raise serializers.ValidationError('"{}" is not a valid choice, choose among {}.'.format(
+                value, ', '.join(self.choices)
+            ))
+        return value
+
+    def filter(self, queryset, value):
+        if len(value) == 1:
+            return queryset.filter(**{self.field_name: value[0]})
+        return queryset.filter(**{self.field_name + '__in': value})
+
+
+class IdFilter(ExactFilter):
+    """Exact match of integer ids, as an IN list when given several values."""
+    description = 'Id equal to any of the values.'
+
+    def parse(self, value):
+        value = super().parse(value)
+        try:
+            return int(value)
+        except ValueError:
+            raise serializers.ValidationError('A valid integer is required.')
+
+
+class PrefixFilter(Filter):
+    """
+    Case sensitive prefix match, written as a range (``value <= field <
+    successor``) so it seeks into the field's index where LIKE wouldn't.
+    """
+    many = True
+    description = 'Starts with any of the values, case sensitive.'
+
+    def __init__(self, field_name=None, many=None, normalize=None):
+        super().__init__(field_name, many)
+        self.normalize = normalize
+
+    def parse(self, value):
+        value = super().parse(value)
+        return self.normalize(value) if self.normalize is not None else value
+
+    def filter(self, queryset, value):
+        condition = Q()
+        for prefix in value:
+            prefix_condition = Q(**{self.field_name + '__gte': prefix})
+            if ord(prefix[-1]) < 0x10ffff:
+                successor = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                prefix_condition &= Q(**{self.field_name + '__lt': successor})
+            condition |= prefix_condition
+        return queryset.filter(condition)
+
+
+class DateFilter(Filter):
+    """Date comparison through ``lookup``, several dates only for exact ones."""
+    description = 'Date formatted as YYYY-MM-DD.'
+
+    def __init__(self, field_name=None, lookup='exact', many=None):
+        super().__init__(field_name, many)
+        self.lookup = lookup
+
+    def parse(self, value):
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise serializers.ValidationError('Enter a valid date formatted as YYYY-MM-DD.')
+        return date
+
+    def to_signature(self, value):
+        values = value if self.many else (value,)
+        return ','.join(date.isoformat() for date in values)
+
+    def filter(self, queryset, value):
+        if self.many:
+            return queryset.filter(**{self.field_name + '__in': value})
+        return queryset.filter(**{'{}__{}'.format(self.field_name, self.lookup): value})
+
+
+class RelatedFilter(Filter):
+    """
+    Apply ``filter`` to the rows of the model the foreign key
+    ``field_name`` points at, and keep the rows pointing at a match:
+    ``field_id IN (SELECT id ...)``, so a small related table is searched
+    on its own and the foreign key's index seeked with the ids found.
+    """
+
+    def __init__(self, field_name, filter):
+        super().__init__(field_name, filter.many)
+        self.related_filter = filter
+        self.description = filter.description
+
+    def clean(self, raw_values):
+        return self.related_filter.clean(raw_values)
+
+    def to_signature(self, value):
+        return self.related_filter.to_signature(value)
+
+    def filter(self, queryset, value):
+        related_model = queryset.model._meta.get_field(self.field_name).related_model
+        related = self.related_filter.filter(related_model._default_manager.all(), value)
+        return queryset.filter(**{self.field_name + '__in': related.values('pk')})
+
+
+class FilterSet(object):
+    """
+    Validate query parameters against the declared ``filters`` and apply
+    the given ones. Parameters that aren't filters are left alone.
+    """
+    filters = ()
+
+    def __init__(self, params):
+        self.params = params
+
+    @property
+    def cleaned_data(self):
+        """OrderedDict of the given filters' values, in declaration order."""
+        if not hasattr(self, '_cleaned_data'):
+            cleaned_data = OrderedDict()
+            errors = OrderedDict()
+            for param, filter_ in self.filters:
+                raw_values = self.params.getlist(param)
+                if not raw_values:
+                    continue
+                try:
+                    cleaned_data[param] = filter_.clean(raw_values)
+                except serializers.ValidationError as e:
+                    errors[param] = e.detail
+            if errors:
+                raise serializers.ValidationError(errors)
+            self._cleaned_data = cleaned_data
+        return self._cleaned_data
+
+    def filter(self, queryset):
+        filters = dict(self.filters)
+        for param, value in self.cleaned_data.items():
+            queryset = filters[param].filter(queryset, value)
+        return queryset
+
+    def get_signature(self):
+        """Return the normalized filters as a query string, the same for the same rows."""
+        filters = dict(self.filters)
+        return '&'.join(
+            '{}={}'.format(param, filters[param].to_signature(value))
+            for param, value in sorted(self.cleaned_data.items())
+        )
+
+
+class EmployeeFilterSet(FilterSet):
+    """
+    Filters of employee lists. ``name``, ``email`` and ``department`` keep
+    their historical substring matching, while the ``_exact`` and
+    ``_prefix`` variants match from the start and can use indexes.
+    Department names are matched in the departments table, employees
+    being then filtered on their department id.
+    """
+    filters = (
+        ('q', SearchFilter()),
+        ('name', ContainsFilter('name')),
+        ('name_prefix', PrefixFilter('name', normalize=str.title)),
+        ('email', ContainsFilter('email')),
+        ('email_exact', ExactFilter('email')),
+        ('email_prefix', PrefixFilter('email')),
+        ('department', RelatedFilter('department', ContainsFilter('name'))),
+        ('department_exact', RelatedFilter('department', ExactFilter('name'))),
+        ('department_prefix', RelatedFilter('department', PrefixFilter('name'))),
+        ('department_id', IdFilter('department')),
+        ('gender', ExactFilter('gender', choices=[key for key, label in Employee.GENDER_CHOICES])),
+        ('birthdate', DateFilter('birthdate', many=True)),
+        ('birthdate_after', DateFilter('birthdate', 'gt')),
+        ('birthdate_before', DateFilter('birthdate', 'lt')),
+        ('hire_date', DateFilter('hire_date', many=True)),
+        ('hire_date_after', DateFilter('hire_date', 'gt')),
+        ('hire_date_before', DateFilter('hire_date', 'lt')),
+    )
+
+
+class FilterSetBackend(BaseFilterBackend):
+    """Filter with the filterset returned by the view's ``get_filterset()``."""
+
+    def filter_queryset(self, request, queryset, view):
+        return view.get_filterset().filter(queryset)
+
+    def get_schema_fields(self, view):
+        assert coreapi is not None, 'coreapi must be installed to use `get_schema_fields()`'
+        assert coreschema is not None, 'coreschema must be installed to use `get_schema_fields()`'
+        return [
+            coreapi.Field(
+                name=param,
+                required=False,
+                location='query',
+                schema=coreschema.String(title=param, description=filter_.description),
+            )
+            for param, filter_ in view.filterset_class.filters
+        ]
@@ -0,0 +1,26 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import benchmark_database
+
+BENCHMARKS = ('auth', 'load', 'renderers', 'serializers')
+
+
+class Command(BaseCommand):
+    help = 'Run one of the employee API benchmarks against a throwaway database.'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', title='benchmarks')
+        subparsers.required = True
+        for name in BENCHMARKS:
+            module = import_module('api.benchmarks.{}'.format(name))
+            subparser = subparsers.add_parser(name, help=module.__doc__.strip().splitlines()[0])
+            module.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        module = import_module('api.benchmarks.{}'.format(options['benchmark']))
+        with benchmark_database():
+            error = module.run(self, **options)
+        if error:
+            raise CommandError(error)
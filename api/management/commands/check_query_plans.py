@@ -0,0 +1,117 @@
+import re
+from itertools import product
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import search
+from api.pagination import KeysetPagination
+from api.views import EmployeeViewSet
+
+# Query parameters accepted by EmployeeViewSet.list, grouped by the column
+# they filter. Parameters of a group are alternatives to each other.
+FILTER_GROUPS = (
+    ({'q': 'doe'},),
+    ({'name': 'doe,john'}, {'name_prefix': 'Jo'}),
+    ({'email': 'luizalabs'}, {'email_exact': 'john.doe@luizalabs.com'}, {'email_prefix': 'john'}),
+    ({'department': 'development'}, {'department_exact': 'Development,Sales'}, {'department_prefix': 'Dev'},
+     {'department_id': '1,2'}),
+    ({'gender': 'F,M'},),
+    ({'birthdate': '1989-05-24,1990-01-01'}, {'birthdate_before': '1989-05-24'},
+     {'birthdate_after': '1989-05-24'}, {'birthdate_after': '1980-01-01', 'birthdate_before': '1989-05-24'}),
+    ({'hire_date': '2019-04-07'}, {'hire_date_before': '2019-04-07'}, {'hire_date_after': '2019-04-07'}),
+)
+
+# Parameters matched through the full-text index, which only SQLite 3.34+
+# has (see migration 0005): without it they fall back to scanning LIKEs.
+FULL_TEXT_PARAMS = ('q', 'name', 'email')
+
+# Any scan of the table, in rowid or in index order.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?api_employee\b')
+# A scan in rowid order, which can't stop early under a LIMIT.
+UNORDERED_SCAN = re.compile(r'^SCAN (TABLE )?api_employee\b(?! USING (COVERING )?INDEX)')
+
+
+def filter_combinations():
+    """Yield every non empty combination of list filters as a dict of params."""
+    for choice in product(*[({},) + group for group in FILTER_GROUPS]):
+        params = {}
+        for alternative in choice:
+            params.update(alternative)
+        if params:
+            yield params
+
+
+def get_list_queryset(params):
+    """Return the queryset EmployeeViewSet.list would paginate for ``params``."""
+    view = EmployeeViewSet(action='list', format_kwarg=None, kwargs={})
+    view.request = Request(APIRequestFactory().get('/', params))
+    return view.filter_queryset(view.get_queryset())
+
+
+def get_statements(queryset):
+    """
+    Return ``(name, queryset, scan pattern)`` for the statements the list
+    route runs: the row lookup behind COUNT(*) must never scan the table,
+    while a keyset page may walk an index in order as it stops at its LIMIT.
+    """
+    paginator = KeysetPagination()
+    return (
+        ('count', queryset.order_by().values('pk'), FULL_SCAN),
+        ('page', queryset.order_by(*paginator.ordering)[:paginator.page_size + 1], UNORDERED_SCAN),
+    )
+
+
+def explain(queryset):
+    """Return the EXPLAIN QUERY PLAN detail lines of ``queryset``."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN QUERY PLAN over every combination of employee list filters '
+        'and fail if any of them scans the whole employee table.'
+    )
+
+    def handle(self, *args, **options):
+        queryset = get_list_queryset({})
+        if connections[queryset.db].vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN is only available on SQLite.')
+
+        indexed = search.has_fts_index(queryset.db)
+        checked = skipped = 0
+        failures = []
+        for params in filter_combinations():
+            if not indexed and any(param in params for param in FULL_TEXT_PARAMS):
+                skipped += 1
+                continue
+            for name, statement, scan in get_statements(get_list_queryset(params)):
+                scans = [detail for detail in explain(statement) if scan.match(detail)]
+                if scans:
+                    failures.append('{} {}: {}'.format(
+                        name,
+                        '&'.join('{}={}'.format(*param) for param in sorted(params.items())),
+                        '; '.join(scans)
+                    ))
+            checked += 1
+
+        if failures:
+            raise CommandError('{} of {} filter combinations scan the employee table:\n{}'.format(
+                len(failures), checked, '\n'.join(failures)
+            ))
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                'Skipped {} filter combinations on {}: this SQLite has no full-text '
+                'trigram index, they fall back to scanning the table.'.format(
+                    skipped, ', '.join(FULL_TEXT_PARAMS)
+                )
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            'No full table scan in {} filter combinations.'.format(checked)
+        ))
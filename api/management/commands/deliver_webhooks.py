@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Post the pending employee change events to the webhook subscribers, in batches '
+        'sent concurrently, once or every --interval seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep delivering, waiting this many seconds between rounds.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of deliveries made concurrently (default: 8).')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Maximum number of events posted in a request (default: 100).')
+        parser.add_argument('--timeout', type=float, default=10,
+                            help='Seconds to wait for a subscriber to answer (default: 10).')
+        parser.add_argument('--backoff', type=float, default=2,
+                            help='Seconds to wait before the first retry, doubled on every failure (default: 2).')
+        parser.add_argument('--max-backoff', type=float, default=3600,
+                            help='Longest wait between retries, in seconds (default: 3600).')
+
+    def handle(self, *args, **options):
+        while True:
+            delivered, failed = outbox.run(
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                timeout=options['timeout'],
+                backoff=options['backoff'],
+                max_backoff=options['max_backoff'],
+            )
+            pruned = outbox.prune()
+            self.stdout.write('Delivered {} events, {} deliveries failed, pruned {} events.'.format(
+                delivered, failed, pruned
+            ))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
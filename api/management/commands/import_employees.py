@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+# Models are imported where they are used: this module is also loaded by
+# the worker processes, which may have to set Django up first.
+
+FIELDS = ('name', 'email', 'department', 'gender', 'birthdate', 'hire_date')
+FORMATS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def read_rows(path, file_format):
+    """
+    Yield ``(line number, row)`` pairs from a CSV or NDJSON file.
+    NDJSON lines that can't be decoded are yielded as their error message.
+    """
+    with open(path, newline='', encoding='utf-8') as employees_file:
+        if file_format == 'csv':
+            reader = csv.DictReader(employees_file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_num, line in enumerate(employees_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError as e:
+                    yield line_num, 'Invalid JSON: {}'.format(e)
+
+
+def validate_chunk(chunk):
+    """
+    Validate a chunk of rows without touching the database. Runs in the
+    worker processes, so it returns plain data: the cleaned rows and the
+    ``(line number, reason)`` of every rejected one.
+    """
+    if not apps.ready:
+        django.setup()
+    from api.models import Department, Employee
+
+    valid = []
+    rejected = []
+    for line_num, row in chunk:
+        if isinstance(row, str):
+            rejected.append((line_num, row))
+            continue
+        if not isinstance(row, dict):
+            rejected.append((line_num, 'Expected an object.'))
+            continue
+
+        # departments are checked by name, and interned when written
+        employee = Employee(**{field: row.get(field) for field in FIELDS if field != 'department'})
+        department = Department(name=row.get('department'))
+        errors = {}
+        try:
+            employee.clean_fields(exclude=('department', 'created', 'updated', 'birth_monthday', 'hire_monthday'))
+        except ValidationError as e:
+            errors.update(e.message_dict)
+        try:
+            department.clean_fields()
+        except ValidationError as e:
+            errors['department'] = e.message_dict['name']
+        if errors:
+            reason = '; '.join(
+                '{}: {}'.format(field, ' '.join(messages))
+                for field, messages in sorted(errors.items())
+            )
+            rejected.append((line_num, reason))
+        else:
+            attrs = {field: getattr(employee, field) for field in FIELDS if field != 'department'}
+            attrs['department'] = department.name
+            valid.append(attrs)
+
+    return valid, rejected
+
+
+@contextmanager
+def relaxed_sqlite_pragmas(db_connection, enabled=True):
+    """
+    Trade durability for speed while the import runs: no fsync and an
+    in memory rollback journal. Previous values are restored afterwards.
+    Does nothing outside SQLite or inside a transaction, where SQLite
+    refuses to change them.
+    """
+    if not enabled or db_connection.vendor != 'sqlite' or db_connection.in_atomic_block:
+        yield
+        return
+
+    with db_connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA journal_mode = MEMORY')
+    try:
+        yield
+    finally:
+        with db_connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = {}'.format(journal_mode))
+            cursor.execute('PRAGMA synchronous = {}'.format(int(synchronous)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Import employees from CSV or NDJSON files, creating new ones and '
+        'updating the ones whose email already exists.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='CSV (.csv) or NDJSON (.ndjson, .jsonl) files.')
+        parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                            help='File format, guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Rows validated and written together (default: 10000).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes validating rows, 0 validates them in this process '
+                                 '(default: number of CPUs).')
+        parser.add_argument('--rejects', help='Write rejected rows to this CSV file instead of stderr.')
+        parser.add_argument('--keep-pragmas', action='store_true',
+                            help="Don't relax SQLite synchronous and journal_mode during the import.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number.')
+
+        files = [(path, self.get_format(path, options['format'])) for path in options['paths']]
+        self.created = self.updated = 0
+        self.rejected = []
+
+        start = time.perf_counter()
+        with relaxed_sqlite_pragmas(connection, enabled=not options['keep_pragmas']):
+            for path, file_format in files:
+                self.import_file(path, file_format, options['batch_size'], options['workers'])
+        elapsed = time.perf_counter() - start
+
+        self.report_rejected(options['rejects'])
+        imported = self.created + self.updated
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {} employees ({} created, {} updated) in {:.2f}s, {:.0f} rows/s. {} rows rejected.'.format(
+                imported, self.created, self.updated, elapsed,
+                (imported + len(self.rejected)) / elapsed if elapsed else 0, len(self.rejected)
+            )
+        ))
+
+    def get_format(self, path, file_format):
+        if not os.path.isfile(path):
+            raise CommandError('File "{}" does not exist.'.format(path))
+        file_format = file_format or FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format is None:
+            raise CommandError('Unknown format for "{}", use --format.'.format(path))
+        return file_format
+
+    def import_file(self, path, file_format, batch_size, workers):
+        rows = read_rows(path, file_format)
+        chunks = iter(lambda: list(islice(rows, batch_size)), [])
+
+        if not workers:
+            for chunk in chunks:
+                self.write_chunk(path, *validate_chunk(chunk))
+            return
+
+        # Keep a bounded number of chunks in flight so memory doesn't grow
+        # with the file, and write them back in file order.
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(validate_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    self.write_chunk(path, *pending.popleft().result())
+            while pending:
+                self.write_chunk(path, *pending.popleft().result())
+
+    def write_chunk(self, path, valid, rejected):
+        """
+        Upsert a validated chunk by email in one transaction. When an
+        email repeats in the chunk, its last row wins.
+        """
+        from api.models import Department, Employee
+
+        self.rejected.extend((path, line_num, reason) for line_num, reason in rejected)
+        rows = OrderedDict((attrs['email'], attrs) for attrs in valid)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            departments = Department.objects.intern(attrs['department'] for attrs in rows.values())
+            for attrs in rows.values():
+                attrs['department'] = departments[attrs['department']]
+            existing = Employee.objects.in_bulk(list(rows), field_name='email')
+            for email, employee in existing.items():
+                for field, value in rows[email].items():
+                    setattr(employee, field, value)
+
+            new = [Employee(**attrs) for email, attrs in rows.items() if email not in existing]
+            Employee.objects.bulk_create(new)
+            if existing:
+                Employee.objects.bulk_update(list(existing.values()), FIELDS)
+
+        self.created += len(new)
+        self.updated += len(existing)
+
+    def report_rejected(self, rejects_path):
+        if rejects_path is None:
+            for path, line_num, reason in self.rejected:
+                self.stderr.write('{}:{}: {}'.format(path, line_num, reason))
+            return
+
+        with open(rejects_path, 'w', newline='', encoding='utf-8') as rejects_file:
+            writer = csv.writer(rejects_file)
+            writer.writerow(['file', 'line', 'reason'])
+            writer.writerows(self.rejected)
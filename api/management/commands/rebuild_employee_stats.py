@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from api import cache, stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the workforce statistics aggregates from the employee table, '
+        'e.g. after writing to it with raw SQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to rebuild the aggregates of (default: "default").')
+
+    def handle(self, *args, **options):
+        count = stats.rebuild(options['database'])
+        cache.bump_generation()
+        self.stdout.write(self.style.SUCCESS('Rebuilt {} employee aggregates.'.format(count)))
@@ -0,0 +1,74 @@
+import os
+import shutil
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database onto its replicas (settings.DATABASE_REPLICAS) '
+        'with the online backup API, or before Python 3.7 by copying the file under an '
+        'exclusive lock, once or every --interval seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep replicating, waiting this many seconds between copies.')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite databases can be replicated by this command.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replica configured in settings.DATABASE_REPLICAS.')
+
+        while True:
+            start = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                self.replicate(primary, connections[alias])
+            self.stdout.write('Replicated {} to {} in {:.2f}s.'.format(
+                DEFAULT_DB_ALIAS, ', '.join(settings.DATABASE_REPLICAS), time.perf_counter() - start
+            ))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def replicate(self, primary, replica):
+        # Replica connections of this process would hold the old file open.
+        replica.close()
+        primary.ensure_connection()
+        if not hasattr(primary.connection, 'backup'):
+            # Connection.backup is new in Python 3.7
+            if primary.is_in_memory_db():
+                raise CommandError('In-memory databases can only be replicated from Python 3.7.')
+            copy_locked(primary.settings_dict['NAME'], replica.settings_dict['NAME'])
+            return
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+
+def copy_locked(source, target):
+    """
+    Copy the SQLite database file ``source`` to ``target`` while holding
+    an exclusive lock on it, so no transaction commits halfway through.
+    The copy replaces ``target`` at once, readers never see it partial.
+    """
+    connection = sqlite3.connect(source, isolation_level=None)
+    try:
+        if connection.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal':
+            raise CommandError('Databases in WAL mode can only be replicated from Python 3.7.')
+        connection.execute('BEGIN EXCLUSIVE')
+        try:
+            shutil.copyfile(source, target + '.tmp')
+        finally:
+            connection.execute('ROLLBACK')
+    finally:
+        connection.close()
+    os.replace(target + '.tmp', target)
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.8 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_auto_20190605_2126'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='employee',
+            options={'ordering': ('name', 'id')},
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['name', 'id'], name='api_employee_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE api_employee_fts USING fts5(
+        name, email, department,
+        content='api_employee', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_insert AFTER INSERT ON api_employee BEGIN
+        INSERT INTO api_employee_fts(rowid, name, email, department)
+        VALUES (new.id, new.name, new.email, new.department);
+    END
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_delete AFTER DELETE ON api_employee BEGIN
+        INSERT INTO api_employee_fts(api_employee_fts, rowid, name, email, department)
+        VALUES ('delete', old.id, old.name, old.email, old.department);
+    END
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_update AFTER UPDATE OF name, email, department ON api_employee BEGIN
+        INSERT INTO api_employee_fts(api_employee_fts, rowid, name, email, department)
+        VALUES ('delete', old.id, old.name, old.email, old.department);
+        INSERT INTO api_employee_fts(rowid, name, email, department)
+        VALUES (new.id, new.name, new.email, new.department);
+    END
+    """,
+    "INSERT INTO api_employee_fts(api_employee_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    'DROP TRIGGER IF EXISTS api_employee_fts_insert',
+    'DROP TRIGGER IF EXISTS api_employee_fts_delete',
+    'DROP TRIGGER IF EXISTS api_employee_fts_update',
+    'DROP TABLE IF EXISTS api_employee_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    """
+    Create the FTS5 trigram index of employees. Only SQLite has it, and
+    only from 3.34 on: elsewhere search falls back to icontains.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts_check USING fts5(value, tokenize='trigram')")
+        except OperationalError:
+            return
+        cursor.execute('DROP TABLE temp.fts_check')
+    for sql in CREATE_FTS:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_FTS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_employee_name_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.8 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_employee_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', 'name', 'id'], name='api_employee_dept_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['gender', 'name', 'id'], name='api_employee_gender_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['birthdate', 'gender'], name='api_employee_birthdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['hire_date', 'gender'], name='api_employee_hire_date_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.8 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_employee_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeAggregate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('department', 'Department'), ('gender', 'Gender'), ('department_gender', 'Department and gender'), ('birthdate', 'Birthdate'), ('hire_date', 'Hire date')], max_length=20)),
+                ('value', models.CharField(max_length=110)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('dimension', 'value')},
+            },
+        ),
+    ]
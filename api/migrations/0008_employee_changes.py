@@ -0,0 +1,31 @@
+# Generated by Django 2.2.8 on 2026-10-18 09:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_employeeaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_id', models.IntegerField()),
+                ('email', models.EmailField(max_length=100)),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['updated', 'id'], name='api_employee_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeetombstone',
+            index=models.Index(fields=['deleted', 'id'], name='api_tombstone_deleted_id_idx'),
+        ),
+    ]
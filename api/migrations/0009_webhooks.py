@@ -0,0 +1,40 @@
+# Generated by Django 2.2.8 on 2026-10-18 09:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_employee_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('employee_id', models.IntegerField()),
+                ('payload', models.TextField()),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WebhookSubscriber',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField()),
+                ('secret', models.CharField(blank=True, max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_event_id', models.IntegerField(default=0)),
+                ('failures', models.IntegerField(default=0)),
+                ('retry_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('delivered_events', models.IntegerField(default=0)),
+                ('last_delivered', models.DateTimeField(blank=True, null=True)),
+                ('last_delivery_latency', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+    ]
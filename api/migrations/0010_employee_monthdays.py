@@ -0,0 +1,50 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+# Adding fields makes SQLite rebuild api_employee, losing the triggers
+# keeping its full-text index up to date: they are dropped before and
+# created again after.
+fts = import_module('api.migrations.0005_employee_fts')
+
+
+def fill_monthdays(apps, schema_editor):
+    Employee = apps.get_model('api', 'Employee')
+    Employee.objects.using(schema_editor.connection.alias).update(
+        birth_monthday=ExtractMonth('birthdate') * 100 + ExtractDay('birthdate'),
+        hire_monthday=ExtractMonth('hire_date') * 100 + ExtractDay('hire_date'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_webhooks'),
+    ]
+
+    operations = [
+        migrations.RunPython(fts.drop_fts, fts.create_fts),
+        migrations.AddField(
+            model_name='employee',
+            name='birth_monthday',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='hire_monthday',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_monthdays, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['birth_monthday'], name='api_employee_birth_md_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['hire_monthday'], name='api_employee_hire_md_idx'),
+        ),
+        migrations.RunPython(fts.create_fts, fts.drop_fts),
+    ]
@@ -0,0 +1,134 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.utils import OperationalError
+
+# The full-text index mirrors api_employee.department, which becomes a
+# foreign key: the old index is dropped before, and one of names and
+# emails created after, department names being matched in their own table.
+fts = import_module('api.migrations.0005_employee_fts')
+
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE api_employee_fts USING fts5(
+        name, email,
+        content='api_employee', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_insert AFTER INSERT ON api_employee BEGIN
+        INSERT INTO api_employee_fts(rowid, name, email)
+        VALUES (new.id, new.name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_delete AFTER DELETE ON api_employee BEGIN
+        INSERT INTO api_employee_fts(api_employee_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_update AFTER UPDATE OF name, email ON api_employee BEGIN
+        INSERT INTO api_employee_fts(api_employee_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO api_employee_fts(rowid, name, email)
+        VALUES (new.id, new.name, new.email);
+    END
+    """,
+    "INSERT INTO api_employee_fts(api_employee_fts) VALUES ('rebuild')",
+]
+
+
+def create_fts(apps, schema_editor):
+    """Create the FTS5 trigram index of employee names and emails, where SQLite has it."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts_check USING fts5(value, tokenize='trigram')")
+        except OperationalError:
+            return
+        cursor.execute('DROP TABLE temp.fts_check')
+    for sql in CREATE_FTS:
+        schema_editor.execute(sql)
+
+
+def intern_departments(apps, schema_editor):
+    """Create a department per distinct name and point employees at theirs."""
+    Department = apps.get_model('api', 'Department')
+    Employee = apps.get_model('api', 'Employee')
+    db = schema_editor.connection.alias
+    names = Employee.objects.using(db).order_by().values_list('department_name', flat=True).distinct()
+    Department.objects.using(db).bulk_create([Department(name=name) for name in names])
+    Employee.objects.using(db).update(department=Subquery(
+        Department.objects.using(db).filter(name=OuterRef('department_name')).values('pk')[:1]
+    ))
+
+
+def restore_department_names(apps, schema_editor):
+    Department = apps.get_model('api', 'Department')
+    Employee = apps.get_model('api', 'Employee')
+    db = schema_editor.connection.alias
+    Employee.objects.using(db).update(department_name=Subquery(
+        Department.objects.using(db).filter(pk=OuterRef('department')).values('name')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_employee_monthdays'),
+    ]
+
+    operations = [
+        migrations.RunPython(fts.drop_fts, fts.create_fts),
+        migrations.CreateModel(
+            name='Department',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ('name',),
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='employee',
+            name='api_employee_dept_name_idx',
+        ),
+        migrations.RenameField(
+            model_name='employee',
+            old_name='department',
+            new_name='department_name',
+        ),
+        # a default lets the column come back with rows when unapplied
+        migrations.AlterField(
+            model_name='employee',
+            name='department_name',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='department',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='employees', to='api.Department'),
+        ),
+        migrations.RunPython(intern_departments, restore_department_names),
+        migrations.RemoveField(
+            model_name='employee',
+            name='department_name',
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='department',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='employees', to='api.Department'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', 'name', 'id'], name='api_employee_dept_name_idx'),
+        ),
+        migrations.RunPython(create_fts, fts.drop_fts),
+    ]
@@ -1,4 +1,143 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Q
+from django.db.models.sql import DeleteQuery
+from django.utils import timezone
+
+from api import search, upcoming
+from api.signals import employees_changed
+
+
+class DepartmentQuerySet(models.QuerySet):
+
+    def contains_any(self, field, values):
+        """Filter departments whose ``field`` contains any of ``values``, case insensitive."""
+        condition = Q()
+        for value in values:
+            condition |= Q(**{field + '__icontains': value})
+        return self.filter(condition)
+
+    def intern(self, names):
+        """
+        Return ``{name: Department}`` for ``names``, creating the missing
+        departments, in two queries when they all exist and four otherwise.
+        """
+        queryset = self if self._db else self.using(router.db_for_write(self.model))
+        names = set(names)
+        departments = {department.name: department for department in queryset.filter(name__in=names)}
+        missing = names - set(departments)
+        if missing:
+            # another writer may intern the same names meanwhile
+            queryset.bulk_create([Department(name=name) for name in missing], ignore_conflicts=True)
+            departments.update((department.name, department) for department in queryset.filter(name__in=missing))
+        return departments
+
+
+class Department(models.Model):
+    """Department model represents the departments employees work at."""
+    name = models.CharField(max_length=100, unique=True)
+
+    objects = DepartmentQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ('name',)
+
+
+class EmployeeQuerySet(models.QuerySet):
+    """QuerySet whose bulk writes keep the normalization done by Employee.save."""
+
+    def contains(self, field, value):
+        """Filter employees whose ``field`` contains ``value``, case insensitive."""
+        return search.contains(self, field, value)
+
+    def contains_any(self, field, values):
+        """Filter employees whose ``field`` contains any of ``values``, case insensitive."""
+        return search.contains_any(self, field, values)
+
+    def upcoming(self, field, start, days):
+        """Filter employees whose ``field`` anniversary is in the ``days`` days from ``start``, in order."""
+        return upcoming.upcoming(self, field, start, days)
+
+    def search(self, query):
+        """Filter employees matching every term of ``query`` in name, email or department."""
+        return search.search(self, query)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Normalize every employee before inserting them in a single query,
+        and report the change in the same transaction.
+        """
+        objs = list(objs)
+        for obj in objs:
+            obj.normalize()
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            employees_changed.send(sender=self.model, action='create', using=self.db, objs=objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """
+        Normalize every employee and touch its ``updated`` field, which
+        bulk_update would otherwise leave alone, before updating them
+        along with the month-day columns of the dates updated.
+        Each batch goes through update(), which reports the change.
+        """
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.normalize()
+            obj.updated = now
+        fields = set(fields) | {'updated'}
+        fields |= {upcoming.MONTHDAY_FIELDS[field] for field in fields if field in upcoming.MONTHDAY_FIELDS}
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        """
+        Touch ``updated`` and the month-day columns of the given dates
+        along with the given fields, and report the change, with the
+        previous values of those fields, by field name even when given by
+        attname (bulk_update gives ``department_id``). A department may be
+        given by name.
+        """
+        name = kwargs.get('department')
+        if isinstance(name, str):
+            kwargs['department'] = Department.objects.using(self._db).intern([name])[name]
+        kwargs.setdefault('updated', timezone.now())
+        for field, monthday_field in upcoming.MONTHDAY_FIELDS.items():
+            if field in kwargs:
+                kwargs[monthday_field] = upcoming.get_monthday(kwargs[field])
+        fields = [
+            self.model._meta.get_field(field).name for field in kwargs
+            if field != 'updated' and field not in upcoming.MONTHDAY_FIELDS.values()
+        ]
+        with transaction.atomic(using=self.db, savepoint=False):
+            previous = {row.pop('pk'): row for row in self.values('pk', *fields)}
+            rows = super().update(**kwargs)
+            employees_changed.send(sender=self.model, action='update', using=self.db,
+                                   pks=list(previous), previous=previous)
+        return rows
+
+    def delete(self):
+        """
+        Delete the employees in one query per batch of ids, instead of one
+        by one as the receivers of post_delete would have Django do, and
+        report the change with the employees as they were, read at once.
+        """
+        assert self.query.can_filter(), "Cannot use 'limit' or 'offset' with delete."
+        queryset = self._chain()
+        queryset._for_write = True
+        with transaction.atomic(using=queryset.db, savepoint=False):
+            objs = list(queryset.order_by().select_related('department'))
+            pks = [obj.pk for obj in objs]
+            rows = DeleteQuery(self.model).delete_batch(pks, queryset.db) if pks else 0
+            employees_changed.send(sender=self.model, action='delete', using=queryset.db, objs=objs, pks=pks)
+        self._result_cache = None
+        return rows, {self.model._meta.label: rows}
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Employee(models.Model):
@@ -10,20 +149,135 @@ class Employee(models.Model):
 
     name = models.CharField(max_length=100)
     email = models.EmailField(max_length=100, unique=True)
-    department = models.CharField(max_length=100)
+    # indexed by api_employee_dept_name_idx, which starts with it
+    department = models.ForeignKey(Department, models.PROTECT, related_name='employees', db_index=False)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     birthdate = models.DateField()
     hire_date = models.DateField()
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # month * 100 + day of birthdate and hire_date, see api.upcoming
+    birth_monthday = models.PositiveSmallIntegerField(editable=False)
+    hire_monthday = models.PositiveSmallIntegerField(editable=False)
 
-    def save(self, *args, **kwargs):
-        """Override save method to convert Employee's name to title before saving."""
+    objects = EmployeeQuerySet.as_manager()
+
+    def normalize(self):
+        """Convert Employee's name to title and derive the month-day columns of its dates."""
         self.name = self.name.title()
-        super().save(*args, **kwargs)
+        for field, monthday_field in upcoming.MONTHDAY_FIELDS.items():
+            setattr(self, monthday_field, upcoming.get_monthday(getattr(self, field)))
+
+    def save(self, *args, **kwargs):
+        """
+        Override save method to normalize Employee before saving, and to
+        run the save and its signals in a single transaction.
+        """
+        self.normalize()
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return "{} at {}".format(self.name, self.department)
 
     class Meta:
-        ordering = ('name',)
+        ordering = ('name', 'id')
+        indexes = [
+            models.Index(fields=['name', 'id'], name='api_employee_name_id_idx'),
+            models.Index(fields=['department', 'name', 'id'], name='api_employee_dept_name_idx'),
+            models.Index(fields=['gender', 'name', 'id'], name='api_employee_gender_name_idx'),
+            models.Index(fields=['birthdate', 'gender'], name='api_employee_birthdate_idx'),
+            models.Index(fields=['hire_date', 'gender'], name='api_employee_hire_date_idx'),
+            models.Index(fields=['updated', 'id'], name='api_employee_updated_id_idx'),
+            models.Index(fields=['birth_monthday'], name='api_employee_birth_md_idx'),
+            models.Index(fields=['hire_monthday'], name='api_employee_hire_md_idx'),
+        ]
+
+
+class EmployeeAggregate(models.Model):
+    """
+    EmployeeAggregate holds how many employees share a value, e.g. a
+    department, kept up to date on every write by api.stats.
+    """
+    DIMENSION_CHOICES = (
+        ('department', 'Department'),
+        ('gender', 'Gender'),
+        ('department_gender', 'Department and gender'),
+        ('birthdate', 'Birthdate'),
+        ('hire_date', 'Hire date'),
+    )
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    value = models.CharField(max_length=110)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return "{} {}: {}".format(self.dimension, self.value, self.count)
+
+    class Meta:
+        unique_together = ('dimension', 'value')
+
+
+class EmployeeTombstone(models.Model):
+    """
+    EmployeeTombstone records that an employee was deleted, so the change
+    feed can tell mirrors about it.
+    """
+    employee_id = models.IntegerField()
+    email = models.EmailField(max_length=100)
+    deleted = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return "{} deleted at {}".format(self.email, self.deleted)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted', 'id'], name='api_tombstone_deleted_id_idx'),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """
+    OutboxEvent is a change to an employee waiting to be delivered to
+    webhook subscribers, written in the transaction of the change.
+    """
+    ACTION_CHOICES = (
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    )
+
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    employee_id = models.IntegerField()
+    payload = models.TextField()
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return "{} employee {}".format(self.action, self.employee_id)
+
+
+class WebhookSubscriber(models.Model):
+    """
+    WebhookSubscriber is an URL employee changes are posted to. It keeps
+    the last event it acknowledged and the state of its retries.
+    """
+    url = models.URLField()
+    secret = models.CharField(max_length=100, blank=True)
+    is_active = models.BooleanField(default=True)
+    last_event_id = models.IntegerField(default=0)
+    failures = models.IntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    delivered_events = models.IntegerField(default=0)
+    last_delivered = models.DateTimeField(null=True, blank=True)
+    last_delivery_latency = models.FloatField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        """New subscribers start with the events written after them."""
+        if self._state.adding and not self.last_event_id:
+            self.last_event_id = OutboxEvent.objects.aggregate(last=models.Max('id'))['last'] or 0
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.url
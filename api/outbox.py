@@ -0,0 +1,230 @@
+"""
+Transactional outbox of employee changes and their webhook delivery.
+
+Every write to employees, bulk ones included, adds OutboxEvent rows in
+its own transaction (see api.receivers), so there is an event for every
+committed change and none for rolled back ones. The deliver_webhooks
+command then posts them, in order and in batches, to every active
+WebhookSubscriber over a pool of threads. Each subscriber keeps the id
+of the last event it acknowledged; failed deliveries are retried after
+an exponential backoff, and events every active subscriber got are
+pruned. Inactive subscribers are moved past the events pruned before
+they got them, which their ``last_error`` records.
+"""
+import hashlib
+import hmac
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from api.models import Employee, OutboxEvent, WebhookSubscriber
+from api.serializers import EmployeeRowSerializer, EmployeeSerializer
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+# WebhookSubscriber fields written by deliveries.
+DELIVERY_FIELDS = (
+    'last_event_id', 'failures', 'retry_at', 'last_error',
+    'delivered_events', 'last_delivered', 'last_delivery_latency',
+)
+
+
+def get_payload(employee):
+    """Return the representation of an Employee instance, whatever types its fields were set with."""
+    payload = OrderedDict()
+    for name in EmployeeSerializer.Meta.fields:
+        field = Employee._meta.get_field(name)
+        if field.is_relation:
+            # represented by name, like Department
+            payload[name] = str(getattr(employee, name))
+            continue
+        value = field.to_python(getattr(employee, name))
+        payload[name] = value.isoformat() if isinstance(value, date) else value
+    return payload
+
+
+def record(using, action, payloads):
+    """Add an ``action`` event for each of the employee ``payloads``."""
+    now = timezone.now()
+    OutboxEvent.objects.using(using).bulk_create([
+        OutboxEvent(action=action, employee_id=payload['id'], payload=json.dumps(payload), created=now)
+        for payload in payloads
+    ])
+
+
+def record_created(using, employees):
+    """Add create events for ``employees``, finding the ids bulk_create left unset."""
+    missing = [employee.email for employee in employees if employee.pk is None]
+    ids = dict(Employee.objects.using(using).filter(email__in=missing).values_list('email', 'id')) if missing else {}
+    payloads = []
+    for employee in employees:
+        payload = get_payload(employee)
+        if payload['id'] is None:
+            payload['id'] = ids[employee.email]
+        payloads.append(payload)
+    record(using, 'create', payloads)
+
+
+def record_updated(using, pks):
+    """Add update events for the employees with ``pks``, as they are now."""
+    serializer = EmployeeRowSerializer()
+    rows = serializer.get_queryset(Employee.objects.using(using).order_by('pk').filter(pk__in=pks))
+    record(using, 'update', serializer.to_representation(rows))
+
+
+def get_signature(secret, body):
+    return hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def send(url, secret, body, timeout):
+    """
+    Post ``body`` to ``url``, signed with ``secret`` when there's one.
+    Return None once delivered, else the error. Runs in worker threads,
+    so it doesn't touch the database.
+    """
+    headers = {'Content-Type': 'application/json'}
+    if secret:
+        headers[SIGNATURE_HEADER] = get_signature(secret, body)
+    try:
+        response = requests.post(url, data=body, headers=headers, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+def get_batch(subscriber, size):
+    """
+    Return the next ``size`` events ``subscriber`` hasn't acknowledged,
+    holding back the ones younger than ``settings.CHANGE_FEED_DELAY``
+    seconds, which a late commit could still slip an event before.
+    """
+    until = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_DELAY)
+    events = OutboxEvent.objects.filter(pk__gt=subscriber.last_event_id, created__lt=until)
+    return list(events.order_by('pk')[:size])
+
+
+def get_body(events):
+    return json.dumps({'events': [
+        OrderedDict([
+            ('id', event.pk),
+            ('action', event.action),
+            ('employee_id', event.employee_id),
+            ('created', event.created.isoformat()),
+            ('employee', json.loads(event.payload, object_pairs_hook=OrderedDict)),
+        ])
+        for event in events
+    ]}).encode('utf-8')
+
+
+def get_backoff(failures, backoff, max_backoff):
+    """Return the seconds to wait before retrying after ``failures`` failed deliveries in a row."""
+    return min(backoff * 2 ** (failures - 1), max_backoff)
+
+
+def deliver(pool, batch_size=100, timeout=10, backoff=2, max_backoff=3600):
+    """
+    Post one batch of pending events to every active subscriber whose
+    retry is due, concurrently on ``pool``, and record how it went.
+    Return the ``(delivered events, failed batches)`` counts.
+    """
+    now = timezone.now()
+    subscribers = WebhookSubscriber.objects.filter(is_active=True).filter(
+        Q(retry_at__isnull=True) | Q(retry_at__lte=now)
+    )
+    deliveries = []
+    for subscriber in subscribers:
+        events = get_batch(subscriber, batch_size)
+        if events:
+            future = pool.submit(send, subscriber.url, subscriber.secret, get_body(events), timeout)
+            deliveries.append((subscriber, events, future))
+
+    delivered = failed = 0
+    for subscriber, events, future in deliveries:
+        error = future.result()
+        now = timezone.now()
+        if error is None:
+            subscriber.last_event_id = events[-1].pk
+            subscriber.failures = 0
+            subscriber.retry_at = None
+            subscriber.last_error = ''
+            subscriber.delivered_events += len(events)
+            subscriber.last_delivered = now
+            subscriber.last_delivery_latency = (now - events[0].created).total_seconds()
+            delivered += len(events)
+        else:
+            subscriber.failures += 1
+            subscriber.retry_at = now + timedelta(seconds=get_backoff(subscriber.failures, backoff, max_backoff))
+            subscriber.last_error = error
+            failed += 1
+        # leave what else may have been edited meanwhile, e.g. is_active
+        subscriber.save(update_fields=DELIVERY_FIELDS)
+    return delivered, failed
+
+
+def prune():
+    """
+    Delete the events every active subscriber acknowledged, return how
+    many. Inactive subscribers that hadn't got them are moved past them,
+    so once reactivated they resume after the gap instead of waiting for
+    events that are gone, and are told so in their last_error.
+    """
+    with transaction.atomic():
+        last_event_id = WebhookSubscriber.objects.filter(is_active=True).aggregate(
+            last=Min('last_event_id')
+        )['last']
+        if last_event_id is None:
+            last_event_id = OutboxEvent.objects.aggregate(last=Max('id'))['last'] or 0
+        behind = WebhookSubscriber.objects.select_for_update().filter(is_active=False, last_event_id__lt=last_event_id)
+        for subscriber in behind:
+            subscriber.last_error = (
+                'Events {} to {} were pruned while inactive, catch up through the change feed.'.format(
+                    subscriber.last_event_id + 1, last_event_id
+                )
+            )
+            subscriber.last_event_id = last_event_id
+            subscriber.save(update_fields=('last_event_id', 'last_error'))
+        deleted, per_model = OutboxEvent.objects.filter(pk__lte=last_event_id).delete()
+    return deleted
+
+
+def run(workers=8, **options):
+    """Deliver batches until no subscriber has anything due, return the delivered and failed counts."""
+    delivered = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            round_delivered, round_failed = deliver(pool, **options)
+            delivered += round_delivered
+            failed += round_failed
+            if not round_delivered:
+                return delivered, failed
+
+
+def get_metrics():
+    """Return the outbox size and the queue depth and latencies of every subscriber."""
+    now = timezone.now()
+    subscribers = []
+    for subscriber in WebhookSubscriber.objects.order_by('pk'):
+        pending = OutboxEvent.objects.filter(pk__gt=subscriber.last_event_id)
+        oldest = pending.order_by('pk').values_list('created', flat=True).first()
+        subscribers.append({
+            'url': subscriber.url,
+            'is_active': subscriber.is_active,
+            'queue_depth': pending.count(),
+            'oldest_pending_age': (now - oldest).total_seconds() if oldest is not None else None,
+            'delivered_events': subscriber.delivered_events,
+            'last_delivery_latency': subscriber.last_delivery_latency,
+            'failures': subscriber.failures,
+            'retry_at': subscriber.retry_at,
+            'last_error': subscriber.last_error,
+        })
+    return {
+        'outbox_size': OutboxEvent.objects.count(),
+        'subscribers': subscribers,
+    }
@@ -0,0 +1,344 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.template import loader
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api import cache
+
+
+def keyset_filter(ordering, position, reverse=False):
+    """
+    Build a Q object selecting the rows strictly after ``position``
+    (or strictly before it when ``reverse`` is set) for an ascending
+    ``ordering`` of unique-together fields.
+
+    The condition is nested as ``a >= x AND (a > x OR (b > y))`` rather
+    than the flat ``a > x OR (a = x AND b > y)`` so the leading range
+    can seek into a composite index on ``ordering``.
+    """
+    strict = 'lt' if reverse else 'gt'
+    inclusive = 'lte' if reverse else 'gte'
+
+    field, value = ordering[-1], position[-1]
+    condition = Q(**{'{}__{}'.format(field, strict): value})
+    for field, value in zip(reversed(ordering[:-1]), reversed(position[:-1])):
+        condition = (
+            Q(**{'{}__{}'.format(field, inclusive): value}) &
+            (Q(**{'{}__{}'.format(field, strict): value}) | condition)
+        )
+    return condition
+
+
+def seek(queryset, ordering, position=None, reverse=False, size=None):
+    """
+    Return ``(page, has_next, has_previous)``: the ``size`` rows of
+    ``queryset`` following ``position`` in ``ordering``, or preceding it
+    when ``reverse`` is set, in ascending order either way.
+    """
+    if reverse:
+        queryset = queryset.order_by(*['-' + field for field in ordering])
+    else:
+        queryset = queryset.order_by(*ordering)
+
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(ordering, position, reverse))
+
+    # Fetch an extra row to know whether there is a page past this one.
+    results = list(queryset[:size + 1])
+    has_more = len(results) > size
+    page = results[:size]
+
+    if reverse:
+        page.reverse()
+        return page, True, has_more
+    return page, has_more, position is not None
+
+
+def encode_cursor(reverse, position):
+    """Return the opaque cursor of ``position``, seeking backwards when ``reverse`` is set."""
+    tokens = json.dumps({'r': int(reverse), 'p': position}, cls=DjangoJSONEncoder)
+    return urlsafe_b64encode(tokens.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(encoded, types):
+    """
+    Return the ``(reverse, position)`` pair of ``encoded``, raising
+    ValueError unless it holds a position of one value of each of
+    ``types``, in order. Cursors come from clients: a value of another
+    type would fail in the query instead.
+    """
+    try:
+        padding = '=' * (-len(encoded) % 4)
+        tokens = json.loads(urlsafe_b64decode((encoded + padding).encode('ascii')).decode('utf-8'))
+        reverse = bool(tokens['r'])
+        position = tokens['p']
+    except (TypeError, ValueError, KeyError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(position, list) or len(position) != len(types):
+        raise ValueError('Invalid cursor')
+    for value, value_type in zip(position, types):
+        # bool is an int, and no ordering field holds one
+        if not isinstance(value, value_type) or isinstance(value, bool):
+            raise ValueError('Invalid cursor')
+    return reverse, position
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (a.k.a. seek) pagination over a unique ``ordering``.
+
+    Instead of counting and skipping rows, each page continues from the
+    ordering values of the last row of the previous one, so every page
+    costs the same index range scan no matter how deep it is. Cursors
+    are opaque to clients:
+
+    http://api.example.org/employees/?cursor=WyJKYW5lIERvZSIsIDJd
+    """
+    ordering = ('name', 'id')
+    # type of the cursor value of each ordering field
+    ordering_types = (str, int)
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+    template = 'rest_framework/pagination/previous_and_next.html'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        reverse, position = self.decode_cursor(request)
+        self.page, self.has_next, self.has_previous = seek(
+            queryset, self.ordering, position, reverse, self.page_size
+        )
+
+        if (self.has_next or self.has_previous) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # A reversed cursor that ran past the first row; start over.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(False, self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.get_position(self.page[0]))
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            return [instance[field] for field in self.ordering]
+        return [getattr(instance, field) for field in self.ordering]
+
+    def decode_cursor(self, request):
+        """
+        Return a ``(reverse, position)`` pair for the request's cursor.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            return decode_cursor(encoded, self.ordering_types)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, position):
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_cursor(reverse, position))
+
+    def get_html_context(self):
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+        }
+
+    def to_html(self):
+        template = loader.get_template(self.template)
+        context = self.get_html_context()
+        return template.render(context)
+
+    def get_schema_fields(self, view):
+        assert coreapi is not None, 'coreapi must be installed to use `get_schema_fields()`'
+        assert coreschema is not None, 'coreschema must be installed to use `get_schema_fields()`'
+        return [
+            coreapi.Field(
+                name=self.cursor_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Cursor',
+                    description='The pagination cursor value.'
+                )
+            ),
+            coreapi.Field(
+                name=self.page_size_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.Integer(
+                    title='Page size',
+                    description='Number of results to return per page.'
+                )
+            ),
+        ]
+
+
+class CountedLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination whose count can be computed in several ways,
+    chosen with ``?count=``:
+
+    - ``exact``: COUNT(*) over the filtered rows on every page.
+    - ``cached`` (default): the same count, cached per filter signature
+      until employees are written to, so every page of a listing shares it.
+    - ``estimate``: asks the view's ``estimate_count()``, which answers
+      from precomputed figures when it can, and skips counting otherwise.
+    - ``false``: skips counting.
+
+    The response says which one gave its ``count`` in ``count_strategy``,
+    ``none`` when counting was skipped and ``count`` is null. Pages fetch
+    one extra row to know whether there's a next one without counting.
+    """
+    count_query_param = 'count'
+    count_strategies = ('exact', 'cached', 'estimate', 'false')
+    default_count_strategy = 'cached'
+    # Query parameters which don't change which rows are counted.
+    count_ignored_params = ('limit', 'offset', 'count', 'fields', 'exclude', 'format')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        self.count_strategy = self.get_count_strategy(request)
+        self.count = self.get_count(queryset, request, view)
+        if self.count is not None and self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_count_strategy(self, request):
+        strategy = request.query_params.get(self.count_query_param, self.default_count_strategy)
+        if strategy not in self.count_strategies:
+            raise ValidationError({self.count_query_param: ['Choose among {}.'.format(
+                ', '.join(self.count_strategies)
+            )]})
+        return strategy
+
+    def get_count(self, queryset, request, view=None):
+        if self.count_strategy == 'exact':
+            return queryset.count()
+        if self.count_strategy == 'cached':
+            return cache.get_or_set(self.get_count_key(request, view), queryset.count)
+
+        estimate = getattr(view, 'estimate_count', None)
+        count = estimate() if self.count_strategy == 'estimate' and estimate is not None else None
+        if count is None:
+            self.count_strategy = 'none'
+        return count
+
+    def get_count_key(self, request, view=None):
+        """
+        Key of cached counts: the view's filter signature when it has one,
+        else the query parameters which may change the counted rows.
+        """
+        action = getattr(view, 'action', None)
+        get_filterset = getattr(view, 'get_filterset', None)
+        if get_filterset is not None:
+            return cache.get_key('count', action, get_filterset().get_signature())
+        return cache.get_response_key(request, action, 'count', ignore=self.count_ignored_params)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_strategy', self.count_strategy),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+class EmployeePagination(BasePagination):
+    """
+    Keyset pagination by default. Clients that still send ``limit`` or
+    ``offset`` get the previous limit/offset pagination, ``count``
+    included (see CountedLimitOffsetPagination), so they keep working.
+    """
+    keyset_class = KeysetPagination
+    limit_offset_class = CountedLimitOffsetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginator(self, request):
+        limit_offset = self.limit_offset_class
+        if (limit_offset.limit_query_param in request.query_params or
+                limit_offset.offset_query_param in request.query_params):
+            return limit_offset()
+        return self.keyset_class()
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    @property
+    def ordering(self):
+        return self.keyset_class.ordering
+
+    @property
+    def display_page_controls(self):
+        paginator = getattr(self, 'paginator', None)
+        return getattr(paginator, 'display_page_controls', False)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return (self.keyset_class().get_schema_fields(view) +
+                self.limit_offset_class().get_schema_fields(view))
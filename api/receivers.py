@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from api import authentication, cache, outbox, stats
+from api.models import Employee, EmployeeTombstone
+from api.signals import employees_changed
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(employees_changed, sender=Employee)
+def invalidate_response_cache(sender, using, **kwargs):
+    # bumped before the commit, a concurrent read could cache the old rows
+    # again under the new generation
+    transaction.on_commit(cache.bump_generation, using=using)
+
+
+@receiver(post_delete, sender=Employee)
+def record_last_deleted(sender, **kwargs):
+    cache.set_last_deleted()
+
+
+@receiver(post_delete, sender=Employee)
+def record_tombstone(sender, instance, using, **kwargs):
+    EmployeeTombstone.objects.using(using).create(employee_id=instance.pk, email=instance.email)
+
+
+@receiver(pre_save, sender=Employee)
+def remember_stats_values(sender, instance, using, **kwargs):
+    """Keep the values an employee is counted under before it is saved."""
+    instance._stats_previous = None
+    if not instance._state.adding:
+        instance._stats_previous = stats.get_current_values([instance.pk], using).get(instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+def update_stats_on_save(sender, instance, using, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    stats.record_change(using, removed=[previous] if previous else [], added=[stats.get_values(instance)])
+
+
+@receiver(post_delete, sender=Employee)
+def update_stats_on_delete(sender, instance, using, **kwargs):
+    stats.record_change(using, removed=[stats.get_values(instance)])
+
+
+@receiver(employees_changed, sender=Employee)
+def record_bulk_delete(sender, action, using, objs=None, **kwargs):
+    if action == 'delete' and objs:
+        cache.set_last_deleted()
+        EmployeeTombstone.objects.using(using).bulk_create([
+            EmployeeTombstone(employee_id=obj.pk, email=obj.email) for obj in objs
+        ])
+
+
+@receiver(employees_changed, sender=Employee)
+def update_stats_on_bulk_change(sender, action, using, objs=None, pks=None, previous=None, **kwargs):
+    if action == 'create':
+        stats.record_change(using, added=[stats.get_values(obj) for obj in objs])
+    elif action == 'delete':
+        stats.record_change(using, removed=[stats.get_values(obj) for obj in objs])
+    elif any(field in stats.TRACKED_FIELDS for values in previous.values() for field in values):
+        current = stats.get_current_values(pks, using)
+        stats.name_departments(previous.values(), using)
+        stats.record_change(
+            using,
+            removed=[dict(values, **previous[pk]) for pk, values in current.items()],
+            added=current.values()
+        )
+
+
+@receiver(post_save, sender=Employee)
+def record_save_event(sender, instance, created, using, **kwargs):
+    outbox.record(using, 'create' if created else 'update', [outbox.get_payload(instance)])
+
+
+@receiver(post_delete, sender=Employee)
+def record_delete_event(sender, instance, using, **kwargs):
+    outbox.record(using, 'delete', [outbox.get_payload(instance)])
+
+
+@receiver(employees_changed, sender=Employee)
+def record_bulk_events(sender, action, using, objs=None, pks=None, **kwargs):
+    if action == 'create':
+        outbox.record_created(using, objs)
+    elif action == 'delete':
+        outbox.record(using, 'delete', [outbox.get_payload(obj) for obj in objs])
+    elif pks:
+        outbox.record_updated(using, pks)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    authentication.forget_user(instance.get_username())
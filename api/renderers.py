@@ -0,0 +1,192 @@
+import csv
+import json
+from collections import OrderedDict
+from datetime import date
+from itertools import islice
+from operator import itemgetter
+
+import msgpack
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# serializer class: names of its fields and of its date fields, see ColumnarJSONRenderer
+_fields = {}
+
+
+class Echo(object):
+    """File-like object whose write returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Base class for renderers able to stream rows as they are read from
+    the database, `chunk_size` rows per yielded string.
+    """
+    charset = 'utf-8'
+    chunk_size = 1000
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = [data]
+        fields = list(data[0]) if data else []
+        rows = ([item.get(field) for field in fields] for item in data)
+        return ''.join(self.stream(fields, rows)).encode(self.charset)
+
+    def stream(self, fields, rows):
+        """
+        Yield the rendered `rows`, tuples of values ordered as `fields`.
+        """
+        rows = iter(rows)
+        header = self.render_header(fields)
+        if header:
+            yield header
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield ''.join(self.render_row(fields, row) for row in chunk)
+
+    def render_header(self, fields):
+        return ''
+
+    def render_row(self, fields, row):
+        raise NotImplementedError('Renderer class requires .render_row() to be implemented')
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """Renders one JSON object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_row(self, fields, row):
+        return json.dumps(dict(zip(fields, row)), cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+class CSVRenderer(StreamingRenderer):
+    """Renders a header line followed by one CSV line per row."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+
+    def render_header(self, fields):
+        return self.writer.writerow(fields)
+
+    def render_row(self, fields, row):
+        return self.writer.writerow(row)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack, the structure of JSON in a binary encoding:
+    smaller payloads, faster to encode and decode. Values MessagePack has
+    no type for are written as in JSON, e.g. dates as ISO strings.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True, default=self.encoder.default)
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Renders lists of objects, and the ``results`` of paginated ones, as
+    an object of one array per field instead of an array of objects, so
+    field names are written once rather than in every item. The date
+    fields of the view's serializer become days since 1970-01-01.
+    Anything else, errors included, is rendered as by JSONRenderer.
+    """
+    media_type = 'application/vnd.luizalabs.columnar+json'
+    format = 'columnar'
+    epoch = date(1970, 1, 1).toordinal()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if response is None or not (response.exception or response.status_code >= 400):
+            fields = self.get_fields(renderer_context)
+            date_fields = self.get_date_fields(renderer_context)
+            if self.is_rows(data, fields):
+                data = self.to_columns(data, date_fields)
+            elif isinstance(data, dict) and self.is_rows(data.get('results'), fields):
+                data = OrderedDict(data, results=self.to_columns(data['results'], date_fields))
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def is_rows(self, items, fields):
+        """
+        Return whether ``items`` is a list of serialized objects, all of
+        the same ``fields`` of the view's serializer when there is one.
+        """
+        if not isinstance(items, list):
+            return False
+        if not items:
+            return True
+        if not isinstance(items[0], dict) or (fields is not None and not fields.issuperset(items[0])):
+            return False
+        keys = list(items[0])
+        return all(isinstance(item, dict) and list(item) == keys for item in items)
+
+    def get_fields(self, renderer_context):
+        view = renderer_context.get('view')
+        if view is None or not hasattr(view, 'get_serializer_class'):
+            return None
+        return self.get_serializer_fields(view.get_serializer_class())[0]
+
+    def get_serializer_fields(self, serializer_class):
+        """Return the field names and the date field names of ``serializer_class``."""
+        if serializer_class not in _fields:
+            fields = serializer_class().fields
+            _fields[serializer_class] = (
+                set(fields), {name for name, field in fields.items() if isinstance(field, serializers.DateField)}
+            )
+        return _fields[serializer_class]
+
+    def get_date_fields(self, renderer_context):
+        view = renderer_context.get('view')
+        if view is None or not hasattr(view, 'get_serializer_class'):
+            return set()
+        return self.get_serializer_fields(view.get_serializer_class())[1]
+
+    def to_columns(self, items, date_fields):
+        """Turn ``items``, objects of the same fields, into ``{field: values}``."""
+        if not items:
+            return OrderedDict()
+        columns = OrderedDict()
+        for field in items[0]:
+            column = list(map(itemgetter(field), items))
+            columns[field] = self.encode_dates(column) if field in date_fields else column
+        return columns
+
+    def encode_dates(self, values):
+        # a long list holds the same dates many times: parse each once
+        encoded = {}
+        for value in values:
+            if value not in encoded:
+                encoded[value] = self.encode_date(value)
+        return [encoded[value] for value in values]
+
+    def encode_date(self, value):
+        if isinstance(value, str):
+            try:
+                # the ISO format serializers write, faster than parse_date's regex
+                value = date(int(value[:4]), int(value[5:7]), int(value[8:]))
+            except ValueError:
+                parsed = parse_date(value)
+                if parsed is None:
+                    return value
+                value = parsed
+        return value.toordinal() - self.epoch if value is not None else None
@@ -0,0 +1,101 @@
+"""
+Primary/replica database routing.
+
+Writes, and reads by default, go to the primary ('default'). Views using
+ReplicaReadMixin send the reads of their safe actions to one of
+``settings.DATABASE_REPLICAS``, unless the requesting user wrote through
+one of them less than ``settings.READ_YOUR_WRITES_WINDOW`` seconds ago:
+their reads then stay on the primary, so they see their own changes.
+Those pins are kept in ``settings.ROUTING_CACHE``, which must be shared
+by every process serving the API for them to follow the user.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+_state = threading.local()
+
+
+def get_pinned_key(user):
+    return 'routing:pinned:{}'.format(user.pk)
+
+
+def pin_to_primary(user):
+    """Send the reads of ``user`` to the primary for the read-your-writes window."""
+    caches[settings.ROUTING_CACHE].set(get_pinned_key(user), True, timeout=settings.READ_YOUR_WRITES_WINDOW)
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and caches[settings.ROUTING_CACHE].get(get_pinned_key(user), False)
+
+
+def choose_read_database(user):
+    """Return the database the reads of ``user`` may go to."""
+    if not settings.DATABASE_REPLICAS or is_pinned_to_primary(user):
+        return DEFAULT_DB_ALIAS
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def get_read_database():
+    return getattr(_state, 'read_database', None) or DEFAULT_DB_ALIAS
+
+
+def set_read_database(alias):
+    """Route the reads made on this thread to ``alias``, None for the primary."""
+    _state.read_database = alias
+
+
+@contextmanager
+def reading_from(alias):
+    """Route the reads made in the block, on this thread, to ``alias``."""
+    previous = getattr(_state, 'read_database', None)
+    set_read_database(alias)
+    try:
+        yield
+    finally:
+        set_read_database(previous)
+
+
+class PrimaryReplicaRouter(object):
+    """Send reads where reading_from() says, and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return get_read_database()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are copies of the primary, schema included
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin(object):
+    """
+    Serve the safe requests of `replica_actions` from a read replica and
+    pin users to the primary after each of their successful writes.
+    Authentication and permission checks still read from the primary.
+    """
+    replica_actions = ()
+    read_database = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and self.action in self.replica_actions:
+            self.read_database = choose_read_database(request.user)
+            set_read_database(self.read_database)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.read_database is not None:
+            set_read_database(None)
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
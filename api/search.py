@@ -0,0 +1,96 @@
+"""
+Substring search over employees.
+
+On SQLite names and emails are mirrored into an FTS5 table using the
+trigram tokenizer (see migration 0011), kept in sync by triggers, so
+``LIKE '%x%'`` style lookups become index lookups. Terms shorter than a
+trigram, and databases without the index, fall back to ``icontains``.
+
+Department names live in their own small table: they are matched there
+and employees selected by the ids found, through their foreign key index.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'api_employee_fts'
+FTS_COLUMNS = ('name', 'email')
+MIN_TERM_LENGTH = 3
+
+_fts_tables = {}
+
+
+def has_fts_index(using):
+    """Return whether the database behind ``using`` has the FTS table."""
+    connection = connections[using]
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        _fts_tables[key] = (connection.vendor == 'sqlite' and
+                            FTS_TABLE in connection.introspection.table_names())
+    return _fts_tables[key]
+
+
+def quote(term):
+    """Quote ``term`` as an FTS5 string, where every character is literal."""
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+class RawSubquery(RawSQL):
+    """
+    Raw subquery usable as the right hand side of ``__in``. RawSQL would
+    add its own parentheses on top of the lookup's, and SQLite reads
+    ``IN ((SELECT ...))`` as a scalar subquery returning one row.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def match(expression):
+    """Q object selecting the employees matched by an FTS5 ``expression``."""
+    return Q(pk__in=RawSubquery(
+        'SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(FTS_TABLE), [expression]
+    ))
+
+
+def contains(queryset, field, value):
+    """
+    Filter ``queryset`` to the employees whose ``field`` contains
+    ``value``, case insensitive, like ``field__icontains`` would.
+    """
+    return contains_any(queryset, field, [value])
+
+
+def contains_any(queryset, field, values):
+    """
+    Filter ``queryset`` to the employees whose ``field`` contains any of
+    ``values``, case insensitive, in a single MATCH when they are all
+    long enough for the index.
+    """
+    if (field in FTS_COLUMNS and all(len(value) >= MIN_TERM_LENGTH for value in values) and
+            has_fts_index(queryset.db)):
+        return queryset.filter(match('{} : ({})'.format(field, ' OR '.join(quote(value) for value in values))))
+
+    condition = Q()
+    for value in values:
+        condition |= Q(**{field + '__icontains': value})
+    return queryset.filter(condition)
+
+
+def search(queryset, query):
+    """
+    Filter ``queryset`` to the employees containing every whitespace
+    separated term of ``query`` in their name, email or department.
+    """
+    from api.models import Department
+
+    indexed = has_fts_index(queryset.db)
+    for term in query.split():
+        condition = Q(department__in=Department.objects.contains_any('name', [term]))
+        if indexed and len(term) >= MIN_TERM_LENGTH:
+            condition |= match('{{{}}} : {}'.format(' '.join(FTS_COLUMNS), quote(term)))
+        else:
+            for field in FTS_COLUMNS:
+                condition |= Q(**{field + '__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
@@ -1,12 +1,219 @@
-from rest_framework import serializers
+from collections import OrderedDict
+from datetime import date
 
-from api.models import Employee
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from api.models import Department, Employee
+
+
+def intern_departments(validated_data):
+    """
+    Replace the department names of a list of ``validated_data`` with
+    their Department, creating the new ones, in a few queries for all.
+    """
+    names = {attrs['department'] for attrs in validated_data if 'department' in attrs}
+    if not names:
+        return
+    departments = Department.objects.intern(names)
+    for attrs in validated_data:
+        if 'department' in attrs:
+            attrs['department'] = departments[attrs['department']]
+
+
+class DepartmentField(serializers.CharField):
+    """
+    Department of an employee, read and written by name as when it was
+    a text column. Names are turned into departments when saving.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_length', Department._meta.get_field('name').max_length)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value.name if isinstance(value, Department) else value
+
+
+class EmployeeListSerializer(serializers.ListSerializer):
+    """
+    EmployeeListSerializer validates and writes batches of employees
+    with a fixed number of queries, whatever the size of the batch.
+    """
+
+    def to_internal_value(self, data):
+        validated_data = super().to_internal_value(data)
+        self.validate_unique_emails(validated_data)
+        return validated_data
+
+    def validate_unique_emails(self, validated_data):
+        """
+        Check email uniqueness for the whole batch with a single query,
+        raising per item errors aligned with the submitted list.
+        """
+        if self.instance is not None:
+            pks = [instance.pk for instance in self.instance]
+        else:
+            pks = [None] * len(validated_data)
+
+        emails = [attrs.get('email') for attrs in validated_data]
+        owners = dict(
+            Employee.objects.filter(email__in=[email for email in emails if email])
+                            .order_by().values_list('email', 'pk')
+        )
+
+        errors = []
+        seen = set()
+        for pk, email in zip(pks, emails):
+            if email is None:
+                errors.append({})
+            elif email in seen:
+                errors.append({'email': ['This email is repeated in the batch.']})
+            elif owners.get(email, pk) != pk:
+                errors.append({'email': ['employee with this email already exists.']})
+            else:
+                errors.append({})
+            seen.add(email)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+    def create(self, validated_data):
+        intern_departments(validated_data)
+        employees = [Employee(**attrs) for attrs in validated_data]
+        Employee.objects.bulk_create(employees)
+
+        # Not every backend returns primary keys from a bulk insert,
+        # so read them back through the unique email column.
+        if any(employee.pk is None for employee in employees):
+            pks = dict(
+                Employee.objects.filter(email__in=[employee.email for employee in employees])
+                                .order_by().values_list('email', 'pk')
+            )
+            for employee in employees:
+                employee.pk = pks[employee.email]
+
+        return employees
+
+    def update(self, instances, validated_data):
+        intern_departments(validated_data)
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+
+        if fields:
+            Employee.objects.bulk_update(instances, fields)
+        return instances
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
-    """EmployeeSerializer serializes Employee model. """
+    """
+    EmployeeSerializer serializes Employee model. A ``fields`` argument
+    restricts it to a subset of its fields.
+    """
+    department = DepartmentField()
 
     class Meta:
         model = Employee
         fields = ('id', 'name', 'email', 'department', 'gender', 'birthdate', 'hire_date')
+        list_serializer_class = EmployeeListSerializer
+
+    def __init__(self, *args, **kwargs):
+        self.only_fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        if self.only_fields is not None:
+            fields = OrderedDict((name, field) for name, field in fields.items() if name in self.only_fields)
+
+        # Batches check email uniqueness in one query for all their items.
+        if isinstance(self.parent, EmployeeListSerializer):
+            email = fields['email']
+            email.validators = [
+                validator for validator in email.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+
+        return fields
+
+    def create(self, validated_data):
+        intern_departments([validated_data])
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        intern_departments([validated_data])
+        return super().update(instance, validated_data)
+
+
+class EmployeeRowSerializer(object):
+    """
+    EmployeeRowSerializer is a read only fast path of EmployeeSerializer.
+
+    Rows are read as tuples of exactly the serializer's fields and turned
+    into the same representation in a single loop, without creating model
+    instances or dispatching every field of every row to its serializer
+    field. Only fields whose representation differs from the database
+    value are converted.
+
+    ``fields`` restricts it to a subset of the serializer's fields, and
+    ``extra_fields`` are read along with them without being serialized,
+    e.g. for the pagination.
+    """
+    serializer_class = EmployeeSerializer
+    # fields read from a related table: the column they are read from
+    columns_by_field = {'department': 'department__name'}
+
+    def __init__(self, fields=None, extra_fields=()):
+        self.fields = tuple(name for name in self.serializer_class.Meta.fields if fields is None or name in fields)
+        self.columns = self.fields + tuple(name for name in extra_fields if name not in self.fields)
+        serializer_fields = self.serializer_class().fields
+        self.converters = [
+            (index, self.get_converter(serializer_fields[name]))
+            for index, name in enumerate(self.fields)
+        ]
+        self.converters = [(index, convert) for index, convert in self.converters if convert is not None]
+
+    def get_converter(self, field):
+        """
+        Return a function turning a database value into the representation
+        of ``field``, or None when it's the value itself.
+        """
+        if type(field) is serializers.DateField:
+            output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601:
+                return date.isoformat
+        if type(field) in (serializers.IntegerField, serializers.CharField, serializers.EmailField, DepartmentField):
+            return None
+        if type(field) is serializers.ChoiceField and all(
+                key == value for key, value in field.choice_strings_to_values.items()):
+            return None
+        return field.to_representation
+
+    @classmethod
+    def get_column(cls, name):
+        """Return the column the field ``name`` is read from."""
+        return cls.columns_by_field.get(name, name)
+
+    def get_queryset(self, queryset):
+        """Return ``queryset`` as named rows of the serialized and extra fields."""
+        return queryset.values_list(*[self.get_column(name) for name in self.columns], named=True)
 
+    def to_representation(self, rows):
+        fields = self.fields
+        converters = self.converters
+        data = []
+        for row in rows:
+            if converters:
+                row = list(row)
+                for index, convert in converters:
+                    value = row[index]
+                    if value is not None:
+                        row[index] = convert(value)
+            # zip stops at the last serialized field, leaving extra ones out
+            data.append(OrderedDict(zip(fields, row)))
+        return data
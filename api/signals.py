@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Sent by EmployeeQuerySet after writes that bypass Model.save() and
+# Model.delete(), so their post_save/post_delete signals never fire.
+# ``using`` is the database written to. ``action`` is "create", with the
+# created employees as ``objs``, "update", with the ``pks`` of the
+# updated employees and ``previous``, a {pk: {field: value}} of the
+# updated fields before the update, or "delete", with the ``pks`` and the
+# deleted employees, departments loaded, as ``objs``.
+employees_changed = Signal(providing_args=['action', 'using', 'objs', 'pks', 'previous'])
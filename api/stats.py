@@ -0,0 +1,211 @@
+"""
+Workforce statistics.
+
+Instead of aggregating the employee table on every request, the number of
+employees per department, gender, department and gender, birthdate and
+hire date is kept in EmployeeAggregate and adjusted on every write (see
+api.receivers). Ages and tenures change every day, so they are counted
+per date and grouped into bands when the statistics are read.
+"""
+from collections import Counter, OrderedDict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.models import Department, Employee, EmployeeAggregate
+
+TRACKED_FIELDS = ('department', 'gender', 'birthdate', 'hire_date')
+# Departments are counted by name, read through their foreign key.
+TRACKED_COLUMNS = ('department__name', 'gender', 'birthdate', 'hire_date')
+
+# (upper bound in years, exclusive, label) of every band, last one unbounded.
+AGE_BANDS = (
+    (20, 'under 20'),
+    (30, '20-29'),
+    (40, '30-39'),
+    (50, '40-49'),
+    (60, '50-59'),
+    (None, '60+'),
+)
+TENURE_BANDS = (
+    (1, 'under 1'),
+    (3, '1-2'),
+    (6, '3-5'),
+    (10, '6-9'),
+    (None, '10+'),
+)
+
+
+def get_date(field, value):
+    """Return ``value`` of a date ``field`` as an ISO string, whatever type it was set with."""
+    return Employee._meta.get_field(field).to_python(value).isoformat()
+
+
+def get_keys(values):
+    """Return the ``(dimension, value)`` keys an employee is counted under."""
+    return (
+        ('department', values['department']),
+        ('gender', values['gender']),
+        ('department_gender', '{}:{}'.format(values['gender'], values['department'])),
+        ('birthdate', get_date('birthdate', values['birthdate'])),
+        ('hire_date', get_date('hire_date', values['hire_date'])),
+    )
+
+
+def get_values(employee):
+    """Return the tracked values of an Employee instance."""
+    values = {field: getattr(employee, field) for field in TRACKED_FIELDS}
+    values['department'] = values['department'].name
+    return values
+
+
+def get_current_values(pks, using):
+    """Return ``{pk: tracked values}`` of the employees with ``pks``."""
+    rows = Employee.objects.using(using).order_by().filter(pk__in=pks).values_list('pk', *TRACKED_COLUMNS)
+    return {row[0]: dict(zip(TRACKED_FIELDS, row[1:])) for row in rows}
+
+
+def name_departments(rows, using):
+    """Replace the department ids of the ``rows`` of tracked values with names, in place."""
+    ids = {values['department'] for values in rows if 'department' in values}
+    names = dict(Department.objects.using(using).filter(pk__in=ids).values_list('pk', 'name')) if ids else {}
+    for values in rows:
+        if 'department' in values:
+            values['department'] = names[values['department']]
+
+
+def record_change(using, removed=(), added=()):
+    """
+    Adjust the aggregates for employees going away with the ``removed``
+    values and coming in with the ``added`` ones, in a few queries.
+    """
+    deltas = Counter()
+    for values in removed:
+        deltas.subtract(get_keys(values))
+    for values in added:
+        deltas.update(get_keys(values))
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    condition = Q()
+    for dimension in {dimension for dimension, value in deltas}:
+        condition |= Q(dimension=dimension, value__in=[v for d, v in deltas if d == dimension])
+
+    aggregates = EmployeeAggregate.objects.using(using)
+    with transaction.atomic(using=using, savepoint=False):
+        existing = {(aggregate.dimension, aggregate.value): aggregate
+                    for aggregate in aggregates.filter(condition)}
+        for key, aggregate in existing.items():
+            aggregate.count = F('count') + deltas[key]
+        aggregates.bulk_update(existing.values(), ['count'])
+        aggregates.bulk_create(
+            EmployeeAggregate(dimension=dimension, value=value, count=delta)
+            for (dimension, value), delta in deltas.items() if (dimension, value) not in existing
+        )
+        if any(deltas[key] < 0 for key in existing):
+            aggregates.filter(pk__in=[aggregate.pk for aggregate in existing.values()], count__lte=0).delete()
+
+
+def rebuild(using):
+    """Recompute every aggregate from the employee table, returning how many there are."""
+    employees = Employee.objects.using(using).order_by()
+    aggregates = []
+    for dimension, column in zip(TRACKED_FIELDS, TRACKED_COLUMNS):
+        for value, count in employees.values_list(column).annotate(count=Count('pk')):
+            aggregates.append(EmployeeAggregate(dimension=dimension, value=str(value), count=count))
+    for department, gender, count in employees.values_list('department__name', 'gender').annotate(count=Count('pk')):
+        aggregates.append(EmployeeAggregate(
+            dimension='department_gender',
+            value='{}:{}'.format(gender, department),
+            count=count
+        ))
+
+    with transaction.atomic(using=using):
+        EmployeeAggregate.objects.using(using).all().delete()
+        EmployeeAggregate.objects.using(using).bulk_create(aggregates)
+    return len(aggregates)
+
+
+def years_since(date, today):
+    """Return how many full years have passed from ``date`` to ``today``."""
+    return today.year - date.year - ((today.month, today.day) < (date.month, date.day))
+
+
+def get_band(years, bands):
+    """Return the label of the band ``years`` falls in."""
+    for upper, label in bands:
+        if upper is None or years < upper:
+            return label
+
+
+def count_bands(counts, bands, today):
+    """Group ``{date: count}`` into ``bands`` by the years since each date."""
+    totals = OrderedDict((label, 0) for upper, label in bands)
+    for date, count in counts.items():
+        totals[get_band(years_since(date, today), bands)] += count
+    return totals
+
+
+def estimate_count(department=None, gender=None, using=None):
+    """
+    Count the employees of ``gender`` whose department contains
+    ``department``, case insensitive, from the aggregates alone.
+    """
+    if department is None:
+        aggregates = EmployeeAggregate.objects.using(using).filter(dimension='gender')
+        if gender is not None:
+            aggregates = aggregates.filter(value=gender)
+        return sum(aggregates.values_list('count', flat=True))
+
+    dimension = 'department' if gender is None else 'department_gender'
+    prefix = '' if gender is None else '{}:'.format(gender)
+    department = department.lower()
+    return sum(
+        count for value, count
+        in EmployeeAggregate.objects.using(using).filter(dimension=dimension).values_list('value', 'count')
+        if value.startswith(prefix) and department in value[len(prefix):].lower()
+    )
+
+
+def exact_count(department=None, gender=None, using=None):
+    """
+    Count the employees of ``gender`` in exactly ``department`` from the
+    aggregates alone.
+    """
+    if department is None:
+        return estimate_count(gender=gender, using=using)
+    if gender is None:
+        dimension, value = 'department', department
+    else:
+        dimension, value = 'department_gender', '{}:{}'.format(gender, department)
+    aggregate = EmployeeAggregate.objects.using(using).filter(dimension=dimension, value=value).first()
+    return aggregate.count if aggregate is not None else 0
+
+
+def get_stats(using=None, today=None):
+    """Return the workforce statistics read from the aggregates."""
+    today = today or timezone.localdate()
+    dimensions = {dimension: {} for dimension, label in EmployeeAggregate.DIMENSION_CHOICES}
+    for dimension, value, count in EmployeeAggregate.objects.using(using).values_list('dimension', 'value', 'count'):
+        dimensions[dimension][value] = count
+
+    by_gender = {}
+    for value, count in dimensions['department_gender'].items():
+        gender, department = value.split(':', 1)
+        by_gender.setdefault(department, {})[gender] = count
+
+    return OrderedDict([
+        ('total', sum(dimensions['gender'].values())),
+        ('departments', OrderedDict(sorted(dimensions['department'].items()))),
+        ('genders', OrderedDict(sorted(dimensions['gender'].items()))),
+        ('departments_by_gender', OrderedDict(sorted(by_gender.items()))),
+        ('age_bands', count_bands(
+            {parse_date(value): count for value, count in dimensions['birthdate'].items()}, AGE_BANDS, today
+        )),
+        ('tenure_bands', count_bands(
+            {parse_date(value): count for value, count in dimensions['hire_date'].items()}, TENURE_BANDS, today
+        )),
+    ])
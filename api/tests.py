@@ -1,18 +1,90 @@
-from datetime import datetime
-
+import base64
+import csv
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock, skipUnless
+
+import msgpack
+from django.conf import settings
+from django.contrib.admin.models import DELETION, LogEntry
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.db.utils import IntegrityError
+from django.http import QueryDict
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 
-from api.models import Employee
-from api.serializers import EmployeeSerializer
+from api import authentication, cache, outbox, routers, search, stats, timing, upcoming
+from api.benchmarks import DEPARTMENTS, load, seed_employees, weighted_choice
+from api.filters import EmployeeFilterSet
+from api.management.commands import replicate_database
+from api.models import (
+    Department, Employee, EmployeeAggregate, EmployeeTombstone, OutboxEvent, WebhookSubscriber
+)
+from api.pagination import decode_cursor
+from api.renderers import ColumnarJSONRenderer
+from api.serializers import EmployeeRowSerializer, EmployeeSerializer
+from api.views import EmployeeViewSet
 
 
 UserModel = get_user_model()
 
 
+@contextmanager
+def committed(using='default'):
+    """
+    Run the on_commit callbacks of the writes made inside the block, as if
+    they were committed: tests run in a transaction that never is.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    # rolled back savepoints replace the list without their callbacks
+    pending = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, func in pending:
+        func()
+
+
+def tamper_cursor(position, reverse=False):
+    """Return a cursor holding ``position``, as a client could forge it."""
+    tokens = json.dumps({'r': int(reverse), 'p': position}).encode('utf-8')
+    return base64.urlsafe_b64encode(tokens).decode('ascii').rstrip('=')
+
+
+def requires_fts_index(test):
+    """
+    Skip ``test`` on SQLite builds without the full-text trigram index
+    (before 3.34), checked when it runs, against the test database.
+    """
+    @wraps(test)
+    def wrapper(self, *args, **kwargs):
+        if not search.has_fts_index('default'):
+            self.skipTest('this SQLite has no full-text trigram index')
+        return test(self, *args, **kwargs)
+    return wrapper
+
+
+def get_department(name):
+    """Return the Department named ``name``, creating it when missing."""
+    return Department.objects.intern([name])[name]
+
+
 class EmployeeModelTests(TestCase):
     """Test class for Employee model."""
 
@@ -23,14 +95,14 @@ class EmployeeModelTests(TestCase):
         """
         Employee.objects.create(name='John Doe',
                                 email='test@luizalabs.com',
-                                department='Development',
+                                department=get_department('Development'),
                                 gender='M',
                                 birthdate=datetime(1989, 5, 23),
                                 hire_date=datetime(2004, 7, 12))
         with self.assertRaises(IntegrityError):
             Employee.objects.create(name='Jane Doe',
                                     email='test@luizalabs.com',
-                                    department='Marketing',
+                                    department=get_department('Marketing'),
                                     gender='M',
                                     birthdate=datetime(1989, 5, 23),
                                     hire_date=datetime(2004, 7, 12))
@@ -42,19 +114,19 @@ class EmployeeModelTests(TestCase):
         """
         Employee.objects.create(name='John Doe',
                                 email='john.doe@luizalabs.com',
-                                department='Development',
+                                department=get_department('Development'),
                                 gender='M',
                                 birthdate=datetime(1989, 5, 23),
                                 hire_date=datetime(2004, 7, 12))
         Employee.objects.create(name='Jane Doe',
                                 email='jane.doe@luizalabs.com',
-                                department='Marketing',
+                                department=get_department('Marketing'),
                                 gender='F',
                                 birthdate=datetime(1989, 5, 24),
                                 hire_date=datetime(2019, 4, 7))
         Employee.objects.create(name='Richard Roe',
                                 email='richard.roe@luizalabs.com',
-                                department='Sales',
+                                department=get_department('Sales'),
                                 gender='M',
                                 birthdate=datetime(1999, 2, 13),
                                 hire_date=datetime(2019, 4, 8))
@@ -72,6 +144,10 @@ class BaseAPITest(APITestCase):
         """
         super().setUp()
 
+        # cached responses must not leak between tests
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
         # create test user for authentication
         self.test_user = UserModel.objects.create_user(
             'test_user', 'test@luizalabs.com', 'test123456'
@@ -149,7 +225,7 @@ class JWTAuthenticationTests(BaseAPITest):
         )
         content = response.json()
         self.assertEqual(response.status_code, 200)
-        self.assertIn('count', content)
+        self.assertIn('next', content)
         self.assertIn('results', content)
 
 
@@ -170,19 +246,19 @@ class EmployeeAPIViewTests(BaseAPITest):
         Employee.objects.bulk_create([
             Employee(name='John Doe',
                      email='john.doe@luizalabs.com',
-                     department='Development',
+                     department=get_department('Development'),
                      gender='M',
                      birthdate=datetime(1989, 5, 23),
                      hire_date=datetime(2004, 7, 12)),
             Employee(name='Jane Doe',
                      email='jane.doe@luizalabs.com',
-                     department='Marketing',
+                     department=get_department('Marketing'),
                      gender='F',
                      birthdate=datetime(1989, 5, 24),
                      hire_date=datetime(2019, 4, 7)),
             Employee(name='Richard Roe',
                      email='richard.roe@luizalabs.com',
-                     department='Sales',
+                     department=get_department('Sales'),
                      gender='M',
                      birthdate=datetime(1999, 2, 13),
                      hire_date=datetime(2019, 4, 8)),
@@ -198,7 +274,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.all()
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -217,7 +292,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(name__contains='Doe')
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -236,7 +310,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(email__contains='luizalabs.com')
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -253,9 +326,8 @@ class EmployeeAPIViewTests(BaseAPITest):
         response = self.client.get(reverse('employee-list'), data={'department': 'dev'}, HTTP_AUTHORIZATION=self.auth_token)
         self.assertEqual(200, response.status_code)
 
-        employees = Employee.objects.filter(department__contains='Dev')
+        employees = Employee.objects.filter(department__name__contains='Dev')
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -274,7 +346,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(gender='F')
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -293,7 +364,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(birthdate=datetime(1989, 5, 24).date())
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -312,7 +382,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(birthdate__lt=datetime(1989, 5, 24).date())
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -331,7 +400,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(birthdate__gt=datetime(1989, 5, 24).date())
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -350,7 +418,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(hire_date=datetime(2019, 4, 7).date())
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -369,7 +436,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(hire_date__lt=datetime(2019, 4, 7).date())
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -388,7 +454,6 @@ class EmployeeAPIViewTests(BaseAPITest):
 
         employees = Employee.objects.filter(hire_date__gt=datetime(2019, 4, 7).date())
         employees_serialized_data = {
-            'count': employees.count(),
             'next': None,
             'previous': None,
         }
@@ -453,3 +518,2171 @@ class EmployeeAPIViewTests(BaseAPITest):
         updated_employee = EmployeeSerializer(instance=updated_employee).data
 
         self.assertEqual(updated_employee, response_data)
+
+
+class EmployeePaginationTests(BaseAPITest):
+    """Test class for keyset and limit/offset pagination of employees."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        # duplicated names make sure pages are split on id as well
+        Employee.objects.bulk_create([
+            Employee(name='Employee {}'.format(i // 2),
+                     email='employee{}@luizalabs.com'.format(i),
+                     department=get_department('Development'),
+                     gender='M',
+                     birthdate=datetime(1989, 5, 23),
+                     hire_date=datetime(2004, 7, 12))
+            for i in range(7)
+        ])
+
+    def _get(self, url, data=None):
+        response = self.client.get(url, data=data, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        return response.json()
+
+    def test_keyset_pagination_walks_every_employee_once(self):
+        """
+        keyset_pagination_walks_every_employee_once returns True if following
+        next links returns all employees in (name, id) order without repeats.
+        """
+        content = self._get(reverse('employee-list'), data={'page_size': 3})
+        self.assertNotIn('count', content)
+        self.assertIsNone(content['previous'])
+
+        ids = [employee['id'] for employee in content['results']]
+        while content['next']:
+            content = self._get(content['next'])
+            ids.extend(employee['id'] for employee in content['results'])
+
+        expected = list(Employee.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(expected, ids)
+
+    def test_keyset_pagination_previous_link(self):
+        """
+        keyset_pagination_previous_link returns True if the previous link
+        of the second page returns the first page again.
+        """
+        first_page = self._get(reverse('employee-list'), data={'page_size': 3})
+        second_page = self._get(first_page['next'])
+        previous_page = self._get(second_page['previous'])
+
+        self.assertEqual(first_page['results'], previous_page['results'])
+        self.assertIsNone(previous_page['previous'])
+
+    def test_keyset_pagination_invalid_cursor(self):
+        """
+        keyset_pagination_invalid_cursor returns True if a tampered
+        cursor is rejected with 404.
+        """
+        response = self.client.get(reverse('employee-list'), data={'cursor': 'not-a-cursor'},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(404, response.status_code)
+
+    def test_keyset_pagination_tampered_position(self):
+        """
+        keyset_pagination_tampered_position returns True if a cursor
+        whose values don't match the types of the ordering is rejected
+        with 404 instead of reaching the query.
+        """
+        for position in (['x', 'y'], [None, None], ['x', [1]], ['x', True], [1, 2], ['x']):
+            with self.assertRaises(ValueError):
+                decode_cursor(tamper_cursor(position), (str, int))
+            response = self.client.get(reverse('employee-list'), data={'cursor': tamper_cursor(position)},
+                                       HTTP_AUTHORIZATION=self.auth_token)
+            self.assertEqual(404, response.status_code)
+
+        self.assertEqual((False, ['x', 1]), decode_cursor(tamper_cursor(['x', 1]), (str, int)))
+
+    def test_limit_offset_pagination_opt_in(self):
+        """
+        limit_offset_pagination_opt_in returns True if sending limit/offset
+        keeps the previous paginated response with count.
+        """
+        content = self._get(reverse('employee-list'), data={'limit': 3, 'offset': 3})
+        self.assertEqual(7, content['count'])
+        self.assertEqual(3, len(content['results']))
+        self.assertIsNotNone(content['next'])
+        self.assertIsNotNone(content['previous'])
+
+    def _count_queries(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            content = self._get(reverse('employee-list'), data=data)
+        return content, len([query for query in queries.captured_queries if '"__count"' in query['sql']])
+
+    def test_exact_and_cached_counts(self):
+        """
+        exact_and_cached_counts returns True if exact counts run on every
+        page and cached ones once per filters until employees change.
+        """
+        content, counts = self._count_queries({'limit': 3, 'count': 'exact'})
+        self.assertEqual((7, 'exact', 1), (content['count'], content['count_strategy'], counts))
+
+        content, counts = self._count_queries({'limit': 3, 'department': 'dev'})
+        self.assertEqual((7, 'cached', 1), (content['count'], content['count_strategy'], counts))
+        content, counts = self._count_queries({'limit': 3, 'offset': 3, 'department': 'dev'})
+        self.assertEqual((7, 'cached', 0), (content['count'], content['count_strategy'], counts))
+
+        with committed():
+            Employee.objects.filter(email='employee0@luizalabs.com').delete()
+        content, counts = self._count_queries({'limit': 3, 'offset': 3, 'department': 'dev'})
+        self.assertEqual((6, 1), (content['count'], counts))
+
+    def test_estimated_and_skipped_counts(self):
+        """
+        estimated_and_skipped_counts returns True if estimates come from
+        the statistics when the filters allow it, and counting is skipped
+        otherwise, pages still linking to the next one.
+        """
+        content, counts = self._count_queries({'limit': 3, 'count': 'estimate', 'department': 'DEV', 'gender': 'M'})
+        self.assertEqual((7, 'estimate', 0), (content['count'], content['count_strategy'], counts))
+
+        content, counts = self._count_queries({'limit': 3, 'count': 'estimate', 'name': 'employee'})
+        self.assertEqual((None, 'none', 0), (content['count'], content['count_strategy'], counts))
+
+        content, counts = self._count_queries({'limit': 3, 'offset': 3, 'count': 'false'})
+        self.assertEqual((None, 'none', 0), (content['count'], content['count_strategy'], counts))
+        self.assertIsNotNone(content['next'])
+        content = self._get(reverse('employee-list'), data={'limit': 3, 'offset': 6, 'count': 'false'})
+        self.assertEqual(1, len(content['results']))
+        self.assertIsNone(content['next'])
+
+        response = self.client.get(reverse('employee-list'), data={'limit': 3, 'count': 'maybe'},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+
+
+class EmployeeBulkAPITests(BaseAPITest):
+    """Test class for the employee bulk routes."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.employee = Employee.objects.create(name='John Doe',
+                                                email='john.doe@luizalabs.com',
+                                                department=get_department('Development'),
+                                                gender='M',
+                                                birthdate=datetime(1989, 5, 23),
+                                                hire_date=datetime(2004, 7, 12))
+
+    def _payload(self, name, email):
+        return {
+            'name': name,
+            'email': email,
+            'department': 'Test',
+            'gender': 'F',
+            'birthdate': '1990-08-17',
+            'hire_date': '2010-05-21',
+        }
+
+    def test_bulk_create_employees(self):
+        """
+        bulk_create_employees returns True if every employee of the batch
+        is created with its name normalized and returned with its id.
+        """
+        payload = [self._payload('jane doe', 'jane.doe@luizalabs.com'),
+                   self._payload('richard roe', 'richard.roe@luizalabs.com')]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('employee-bulk'), data=payload, format='json',
+                                        HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(201, response.status_code)
+
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "api_employee" ')]
+        self.assertEqual(1, len(inserts))
+
+        response_data = response.json()
+        self.assertEqual(['Jane Doe', 'Richard Roe'], [employee['name'] for employee in response_data])
+        for employee in response_data:
+            self.assertEqual(EmployeeSerializer(Employee.objects.get(pk=employee['id'])).data, employee)
+
+    def test_bulk_create_duplicated_emails(self):
+        """
+        bulk_create_duplicated_emails returns True if the batch is rejected
+        with per item errors when emails exist or repeat and nothing is created.
+        """
+        payload = [self._payload('Jane Doe', 'jane.doe@luizalabs.com'),
+                   self._payload('John Doe', 'john.doe@luizalabs.com'),
+                   self._payload('Jane Roe', 'jane.doe@luizalabs.com')]
+        response = self.client.post(reverse('employee-bulk'), data=payload, format='json',
+                                    HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+
+        response_data = response.json()
+        self.assertEqual({}, response_data[0])
+        self.assertEqual(['employee with this email already exists.'], response_data[1]['email'])
+        self.assertEqual(['This email is repeated in the batch.'], response_data[2]['email'])
+        self.assertEqual(1, Employee.objects.count())
+
+    def test_bulk_update_employees(self):
+        """
+        bulk_update_employees returns True if the employees of the batch
+        are partially updated and their updated timestamp is touched.
+        """
+        updated = self.employee.updated
+        payload = [{'id': self.employee.pk, 'name': 'johnny doe', 'department': 'Sales'}]
+        response = self.client.patch(reverse('employee-bulk'), data=payload, format='json',
+                                     HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+
+        self.employee.refresh_from_db()
+        self.assertEqual('Johnny Doe', self.employee.name)
+        self.assertEqual('Sales', self.employee.department.name)
+        self.assertGreater(self.employee.updated, updated)
+        self.assertEqual([EmployeeSerializer(self.employee).data], response.json())
+
+    def test_bulk_update_unknown_employee(self):
+        """
+        bulk_update_unknown_employee returns True if ids that don't exist
+        are reported per item.
+        """
+        payload = [{'id': self.employee.pk, 'name': 'Johnny Doe'}, {'id': 0, 'name': 'Nobody'}]
+        response = self.client.patch(reverse('employee-bulk'), data=payload, format='json',
+                                     HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+        self.assertEqual([{}, {'id': ['Not found.']}], response.json())
+
+    def test_bulk_delete_employees(self):
+        """
+        bulk_delete_employees returns True if existing employees are deleted
+        and missing ids are reported as not found.
+        """
+        response = self.client.delete(reverse('employee-bulk'), data=[self.employee.pk, 0], format='json',
+                                      HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([{'id': self.employee.pk, 'status': 'deleted'}, {'id': 0, 'status': 'not_found'}],
+                         response.json())
+        self.assertFalse(Employee.objects.exists())
+
+    def test_bulk_delete_set_based(self):
+        """
+        bulk_delete_set_based returns True if deleting many employees takes
+        a fixed number of queries and still records their tombstones,
+        outbox events and statistics.
+        """
+        Employee.objects.bulk_create([
+            Employee(name='Employee {}'.format(i), email='employee{}@luizalabs.com'.format(i),
+                     department=get_department('Development'), gender='M',
+                     birthdate=date(1990, 1, 1), hire_date=date(2015, 1, 1))
+            for i in range(20)
+        ])
+        ids = list(Employee.objects.exclude(pk=self.employee.pk).values_list('pk', flat=True))
+        events = OutboxEvent.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(reverse('employee-bulk'), data=ids, format='json',
+                                          HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len([query for query in queries if query['sql'].startswith('DELETE FROM "api_employee"')]))
+        self.assertLess(len(queries), 20)
+
+        self.assertEqual([self.employee], list(Employee.objects.all()))
+        self.assertEqual(set(ids), set(EmployeeTombstone.objects.values_list('employee_id', flat=True)))
+        deletes = OutboxEvent.objects.filter(action='delete').order_by('employee_id')
+        self.assertEqual(events + 20, OutboxEvent.objects.count())
+        self.assertEqual(sorted(ids), [event.employee_id for event in deletes])
+        self.assertEqual('Development', json.loads(deletes[0].payload)['department'])
+        kept = set(EmployeeAggregate.objects.values_list('dimension', 'value', 'count'))
+        stats.rebuild('default')
+        self.assertEqual(set(EmployeeAggregate.objects.values_list('dimension', 'value', 'count')), kept)
+
+
+class EmployeeExportTests(BaseAPITest):
+    """Test class for the streaming employee export."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        Employee.objects.bulk_create([
+            Employee(name='John Doe',
+                     email='john.doe@luizalabs.com',
+                     department=get_department('Development'),
+                     gender='M',
+                     birthdate=datetime(1989, 5, 23),
+                     hire_date=datetime(2004, 7, 12)),
+            Employee(name='Jane Doe',
+                     email='jane.doe@luizalabs.com',
+                     department=get_department('Marketing'),
+                     gender='F',
+                     birthdate=datetime(1989, 5, 24),
+                     hire_date=datetime(2019, 4, 7)),
+        ])
+
+    def _export(self, data):
+        response = self.client.get(reverse('employee-export'), data=data, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_export_ndjson(self):
+        """
+        export_ndjson returns True if every filtered employee is streamed
+        as one JSON object per line, serialized like the list route.
+        """
+        response, content = self._export({'format': 'ndjson', 'gender': 'F'})
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+
+        employees = Employee.objects.filter(gender='F')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(EmployeeSerializer(instance=employees, many=True).data, rows)
+
+    def test_export_csv(self):
+        """
+        export_csv returns True if employees are streamed as CSV with a header.
+        """
+        response, content = self._export({'format': 'csv'})
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(list(EmployeeSerializer.Meta.fields), rows[0])
+        self.assertEqual(['Jane Doe', 'John Doe'], [row[1] for row in rows[1:]])
+        self.assertEqual('1989-05-24', rows[1][5])
+
+
+class ImportEmployeesCommandTests(TestCase):
+    """Test class for the import_employees management command."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        Employee.objects.create(name='John Doe',
+                                email='john.doe@luizalabs.com',
+                                department=get_department('Development'),
+                                gender='M',
+                                birthdate=datetime(1989, 5, 23),
+                                hire_date=datetime(2004, 7, 12))
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as employees_file:
+            employees_file.write(content)
+        return path
+
+    def test_import_csv_upserts_by_email(self):
+        """
+        import_csv_upserts_by_email returns True if new emails are created,
+        known ones updated and invalid rows rejected with their reasons.
+        """
+        path = self._write('employees.csv', '\n'.join([
+            'name,email,department,gender,birthdate,hire_date',
+            'jane doe,jane.doe@luizalabs.com,Marketing,F,1989-05-24,2019-04-07',
+            'john doe,john.doe@luizalabs.com,Sales,M,1989-05-23,2004-07-12',
+            'richard roe,not-an-email,Sales,M,1999-02-13,2019-04-08',
+        ]))
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_employees', path, workers=0, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(['Jane Doe', 'John Doe'], list(Employee.objects.values_list('name', flat=True)))
+        self.assertEqual('Sales', Employee.objects.get(email='john.doe@luizalabs.com').department.name)
+        self.assertIn('1 created, 1 updated', stdout.getvalue())
+        self.assertIn('employees.csv:4: email: Enter a valid email address.', stderr.getvalue())
+
+    def test_import_ndjson_with_workers(self):
+        """
+        import_ndjson_with_workers returns True if rows validated by the
+        process pool are imported and undecodable lines are rejected.
+        """
+        path = self._write('employees.ndjson', '\n'.join([
+            json.dumps({'name': 'jane doe', 'email': 'jane.doe@luizalabs.com', 'department': 'Marketing',
+                        'gender': 'F', 'birthdate': '1989-05-24', 'hire_date': '2019-04-07'}),
+            '{not json',
+        ]))
+        stderr = StringIO()
+        call_command('import_employees', path, workers=2, batch_size=1, stdout=StringIO(), stderr=stderr)
+
+        self.assertTrue(Employee.objects.filter(email='jane.doe@luizalabs.com', name='Jane Doe').exists())
+        self.assertIn('employees.ndjson:2: Invalid JSON', stderr.getvalue())
+
+
+class EmployeeSearchTests(BaseAPITest):
+    """Test class for the indexed employee search."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        Employee.objects.bulk_create([
+            Employee(name='John Doe',
+                     email='john.doe@luizalabs.com',
+                     department=get_department('Development'),
+                     gender='M',
+                     birthdate=datetime(1989, 5, 23),
+                     hire_date=datetime(2004, 7, 12)),
+            Employee(name='Jane Doe',
+                     email='jane.doe@luizalabs.com',
+                     department=get_department('Marketing'),
+                     gender='F',
+                     birthdate=datetime(1989, 5, 24),
+                     hire_date=datetime(2019, 4, 7)),
+            Employee(name='Richard Roe',
+                     email='richard.roe@luizalabs.com',
+                     department=get_department('Sales'),
+                     gender='M',
+                     birthdate=datetime(1999, 2, 13),
+                     hire_date=datetime(2019, 4, 8)),
+        ])
+
+    def _names(self, data):
+        response = self.client.get(reverse('employee-list'), data=data, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        return [employee['name'] for employee in response.json()['results']]
+
+    def test_search_matches_every_term_in_any_field(self):
+        """
+        search_matches_every_term_in_any_field returns True if q returns
+        employees containing all its terms in name, email or department.
+        """
+        self.assertEqual(['Jane Doe', 'John Doe'], self._names({'q': 'DOE'}))
+        self.assertEqual(['John Doe'], self._names({'q': 'doe velop'}))
+        self.assertEqual(['Jane Doe'], self._names({'q': 'ja ket'}))
+        self.assertEqual([], self._names({'q': 'doe sales'}))
+
+    @requires_fts_index
+    def test_search_uses_index(self):
+        """
+        search_uses_index returns True if contains filters are answered
+        by the full-text index.
+        """
+        queryset = Employee.objects.contains('name', 'oe')
+        self.assertNotIn(search.FTS_TABLE, str(queryset.query))
+
+        queryset = Employee.objects.contains('name', 'doe')
+        self.assertIn(search.FTS_TABLE, str(queryset.query))
+        self.assertEqual(['Jane Doe', 'John Doe'], [employee.name for employee in queryset])
+
+    def test_search_fallback(self):
+        """
+        search_fallback returns True if, without the full-text index,
+        icontains lookups find the same employees.
+        """
+        params = ({'name': 'doe'}, {'email': 'luizalabs'}, {'q': 'jane doe'}, {'name': 'oe,roe'})
+        expected = [self._names(data) for data in params]
+        # or the responses would come from the cache
+        caches[settings.EMPLOYEE_CACHE].clear()
+        with mock.patch('api.search.has_fts_index', return_value=False):
+            self.assertNotIn(search.FTS_TABLE, str(Employee.objects.contains('name', 'doe').query))
+            self.assertEqual(expected, [self._names(data) for data in params])
+
+    def test_search_index_follows_writes(self):
+        """
+        search_index_follows_writes returns True if updated and deleted
+        employees are found by their new values only.
+        """
+        employee = Employee.objects.get(name='Richard Roe')
+        employee.name = 'Richard Smith'
+        employee.save()
+        Employee.objects.filter(name='Jane Doe').delete()
+
+        self.assertEqual(['John Doe'], self._names({'name': 'doe'}))
+        self.assertEqual([], self._names({'name': 'roe'}))
+        self.assertEqual(['Richard Smith'], self._names({'name': 'smith'}))
+
+
+class EmployeeFilterTests(BaseAPITest):
+    """Test class for the declarative employee list filters."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        Employee.objects.bulk_create([
+            Employee(name='John Doe',
+                     email='john.doe@luizalabs.com',
+                     department=get_department('Development'),
+                     gender='M',
+                     birthdate=datetime(1989, 5, 23),
+                     hire_date=datetime(2004, 7, 12)),
+            Employee(name='Jane Doe',
+                     email='jane.doe@luizalabs.com',
+                     department=get_department('Marketing'),
+                     gender='F',
+                     birthdate=datetime(1989, 5, 24),
+                     hire_date=datetime(2019, 4, 7)),
+            Employee(name='Richard Roe',
+                     email='richard.roe@luizalabs.com',
+                     department=get_department('Sales'),
+                     gender='M',
+                     birthdate=datetime(1999, 2, 13),
+                     hire_date=datetime(2019, 4, 8)),
+        ])
+
+    def _names(self, data):
+        response = self.client.get(reverse('employee-list'), data=data, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        return [employee['name'] for employee in response.json()['results']]
+
+    def test_multiple_values(self):
+        """
+        multiple_values returns True if comma separated or repeated values
+        match employees having any of them, in a single page query.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            names = self._names({'department_exact': 'Sales,Development'})
+        self.assertEqual(['John Doe', 'Richard Roe'], names)
+        pages = [query['sql'] for query in queries if 'LIMIT' in query['sql']]
+        self.assertEqual(1, len(pages))
+        self.assertIn('"api_employee"."department_id" IN (SELECT', pages[0])
+
+        self.assertEqual(['Jane Doe', 'John Doe'], self._names({'name': ['jane', 'john']}))
+        self.assertEqual(['Jane Doe', 'John Doe', 'Richard Roe'], self._names({'gender': 'F,M'}))
+        self.assertEqual(['Jane Doe', 'John Doe'], self._names({'birthdate': '1989-05-24,1989-05-23'}))
+
+    def test_prefix_and_range_filters(self):
+        """
+        prefix_and_range_filters returns True if prefixes match from the
+        start of the value and before/after combine into a range.
+        """
+        self.assertEqual(['Jane Doe', 'John Doe'], self._names({'name_prefix': 'j'}))
+        self.assertEqual(['Richard Roe'], self._names({'email_prefix': 'rich'}))
+        self.assertEqual(['John Doe'], self._names({'department_prefix': 'Dev,Fin'}))
+        self.assertEqual([], self._names({'department_prefix': 'velop'}))
+        self.assertEqual(['Jane Doe'], self._names({
+            'birthdate_after': '1989-05-23', 'birthdate_before': '1999-02-13'
+        }))
+
+    def test_invalid_values(self):
+        """
+        invalid_values returns True if the list responds 400 with the
+        errors of every invalid parameter.
+        """
+        response = self.client.get(reverse('employee-list'), data={
+            'gender': 'F,X', 'birthdate_after': '1989-13-01', 'hire_date': 'yesterday', 'name': 'doe'
+        }, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+
+        response_data = response.json()
+        self.assertEqual(['gender', 'birthdate_after', 'hire_date'], list(response_data))
+        self.assertEqual(['"X" is not a valid choice, choose among M, F.'], response_data['gender'])
+        self.assertEqual(['Enter a valid date formatted as YYYY-MM-DD.'], response_data['hire_date'])
+
+    def test_signature_ignores_order(self):
+        """
+        signature_ignores_order returns True if the same filters share a
+        signature whatever the order of their parameters and values.
+        """
+        first = EmployeeFilterSet(QueryDict('gender=M,F&department=dev&name=doe,roe&limit=10'))
+        second = EmployeeFilterSet(QueryDict('name=roe&name=doe&gender=F,M,F&department=dev'))
+        self.assertEqual(first.get_signature(), second.get_signature())
+        self.assertEqual('department=dev&gender=F,M&name=doe,roe', first.get_signature())
+
+        third = EmployeeFilterSet(QueryDict('gender=M&department=dev&name=doe,roe'))
+        self.assertNotEqual(first.get_signature(), third.get_signature())
+
+
+class QueryPlanTests(TestCase):
+    """Test class for the indexes backing the employee list filters."""
+
+    def test_no_filter_combination_scans_the_table(self):
+        """
+        no_filter_combination_scans_the_table returns True if every filter
+        combination accepted by the list route is answered by an index.
+        """
+        stdout = StringIO()
+        call_command('check_query_plans', stdout=stdout)
+        self.assertIn('No full table scan', stdout.getvalue())
+
+    def test_combinations_without_full_text_index(self):
+        """
+        combinations_without_full_text_index returns True if, on a SQLite
+        without the trigram index, the combinations needing it are skipped
+        and reported instead of failing the check.
+        """
+        stdout = StringIO()
+        with mock.patch('api.search.has_fts_index', return_value=False):
+            call_command('check_query_plans', stdout=stdout)
+        self.assertIn('Skipped', stdout.getvalue())
+        self.assertIn('No full table scan', stdout.getvalue())
+
+
+class EmployeeResponseCacheTests(BaseAPITest):
+    """Test class for the employee response cache."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.employee = Employee.objects.create(name='John Doe',
+                                                email='john.doe@luizalabs.com',
+                                                department=get_department('Development'),
+                                                gender='M',
+                                                birthdate=datetime(1989, 5, 23),
+                                                hire_date=datetime(2004, 7, 12))
+
+    def _get(self, url, data=None):
+        response = self.client.get(url, data=data, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        return response
+
+    def test_repeated_list_is_served_from_cache(self):
+        """
+        repeated_list_is_served_from_cache returns True if the same list,
+        with its parameters in any order, is only queried once.
+        """
+        url = reverse('employee-list')
+        first = self._get(url + '?gender=M&department=dev')
+        self.assertEqual('MISS', first['X-Cache'])
+
+        with self.assertNumQueries(0):
+            second = self._get(url + '?department=dev&gender=M')
+        self.assertEqual('HIT', second['X-Cache'])
+        self.assertEqual(first.json(), second.json())
+
+    def test_writes_invalidate_cached_responses(self):
+        """
+        writes_invalidate_cached_responses returns True if saves, bulk
+        updates and deletes make the next read miss the cache.
+        """
+        url = reverse('employee-detail', [self.employee.pk])
+        self._get(url)
+
+        self.employee.department = get_department('Sales')
+        with committed():
+            self.employee.save()
+        response = self._get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual('Sales', response.json()['department'])
+
+        self.employee.department = get_department('Marketing')
+        with committed():
+            Employee.objects.bulk_update([self.employee], ['department'])
+        response = self._get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual('Marketing', response.json()['department'])
+
+        self._get(reverse('employee-list'))
+        with committed():
+            self.employee.delete()
+        response = self._get(reverse('employee-list'))
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual([], response.json()['results'])
+
+    def test_invalidated_on_commit(self):
+        """
+        invalidated_on_commit returns True if cached responses stay valid
+        until the write is committed, and not when it is rolled back.
+        """
+        url = reverse('employee-detail', [self.employee.pk])
+        self._get(url)
+
+        with committed():
+            with transaction.atomic():
+                self.employee.name = 'Johnny Doe'
+                self.employee.save()
+                self.assertEqual('HIT', self._get(url)['X-Cache'])
+        self.assertEqual('MISS', self._get(url)['X-Cache'])
+
+        with committed():
+            try:
+                with transaction.atomic():
+                    Employee.objects.filter(pk=self.employee.pk).update(name='John Doe')
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertEqual('HIT', self._get(url)['X-Cache'])
+
+    def test_cache_metrics(self):
+        """
+        cache_metrics returns True if hits and misses are counted and
+        exposed to admin users only.
+        """
+        self._get(reverse('employee-list'))
+        self._get(reverse('employee-list'))
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(403, response.status_code)
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        response = self._get(reverse('metrics'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'hit_ratio': 0.5}, response.json()['response_cache'])
+
+
+class ConditionalGetTests(BaseAPITest):
+    """Test class for ETag and Last-Modified support on employee reads."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.employee = Employee.objects.create(name='John Doe',
+                                                email='john.doe@luizalabs.com',
+                                                department=get_department('Development'),
+                                                gender='M',
+                                                birthdate=datetime(1989, 5, 23),
+                                                hire_date=datetime(2004, 7, 12))
+        Employee.objects.create(name='Jane Doe',
+                                email='jane.doe@luizalabs.com',
+                                department=get_department('Marketing'),
+                                gender='F',
+                                birthdate=datetime(1989, 5, 24),
+                                hire_date=datetime(2019, 4, 7))
+
+    def _get(self, url, **headers):
+        return self.client.get(url, HTTP_AUTHORIZATION=self.auth_token, **headers)
+
+    def test_list_not_modified(self):
+        """
+        list_not_modified returns True if a list requested with its ETag
+        or Last-Modified is answered with 304 and no employee query.
+        """
+        url = reverse('employee-list') + '?gender=M'
+        response = self._get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self._get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(304, not_modified.status_code)
+        self.assertEqual(response['ETag'], not_modified['ETag'])
+        self.assertFalse([query for query in queries.captured_queries if 'api_employee' in query['sql']])
+
+        not_modified = self._get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(304, not_modified.status_code)
+
+    def test_list_modified_after_write(self):
+        """
+        list_modified_after_write returns True if updating or deleting an
+        employee makes the old validators fail.
+        """
+        url = reverse('employee-list')
+        etag = self._get(url)['ETag']
+
+        self.employee.department = get_department('Sales')
+        with committed():
+            self.employee.save()
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+        etag = response['ETag']
+        with committed():
+            Employee.objects.filter(name='Jane Doe').delete()
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(response.json()['results']))
+
+    def test_retrieve_not_modified(self):
+        """
+        retrieve_not_modified returns True if an employee requested with its
+        ETag is answered with 304 until it changes.
+        """
+        url = reverse('employee-detail', [self.employee.pk])
+        etag = self._get(url)['ETag']
+        self.assertEqual(304, self._get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+
+        self.employee.name = 'Johnny Doe'
+        with committed():
+            self.employee.save()
+        self.assertEqual(200, self._get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+        self.assertEqual(404, self._get(reverse('employee-detail', [0])).status_code)
+
+
+class EmployeeRowSerializerTests(TestCase):
+    """Test class for the read only EmployeeRowSerializer."""
+
+    def test_row_serializer_matches_model_serializer(self):
+        """
+        row_serializer_matches_model_serializer returns True if rendering
+        rows gives the same bytes as rendering EmployeeSerializer's output.
+        """
+        seed_employees(50)
+        renderer = JSONRenderer()
+        row_serializer = EmployeeRowSerializer()
+
+        rows = row_serializer.to_representation(row_serializer.get_queryset(Employee.objects.all()))
+        expected = EmployeeSerializer(Employee.objects.all(), many=True).data
+        self.assertEqual(renderer.render(expected), renderer.render(rows))
+
+
+class EmployeeStatsTests(BaseAPITest):
+    """Test class for the workforce statistics endpoint and its aggregates."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.employee = Employee.objects.create(name='John Doe',
+                                                email='john.doe@luizalabs.com',
+                                                department=get_department('Development'),
+                                                gender='M',
+                                                birthdate=datetime(1989, 5, 23),
+                                                hire_date=datetime(2004, 7, 12))
+        Employee.objects.create(name='Jane Doe',
+                                email='jane.doe@luizalabs.com',
+                                department=get_department('Marketing'),
+                                gender='F',
+                                birthdate=datetime(2008, 2, 29),
+                                hire_date=datetime(2019, 4, 7))
+
+    def test_stats(self):
+        """
+        stats returns True if the endpoint counts employees per
+        department, gender and age and tenure bands.
+        """
+        response = self.client.get(reverse('employee-stats'), HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+
+        content = response.json()
+        self.assertEqual(2, content['total'])
+        self.assertEqual({'Development': 1, 'Marketing': 1}, content['departments'])
+        self.assertEqual({'F': 1, 'M': 1}, content['genders'])
+        self.assertEqual({'Development': {'M': 1}, 'Marketing': {'F': 1}}, content['departments_by_gender'])
+        self.assertEqual(2, sum(content['age_bands'].values()))
+        self.assertEqual(2, sum(content['tenure_bands'].values()))
+
+    def test_stats_bands(self):
+        """
+        stats_bands returns True if ages and tenures are counted in full
+        years, a leap day birthday turning a year older on March 1st.
+        """
+        self.assertEqual(1, stats.get_stats(today=date(2028, 2, 28))['age_bands']['under 20'])
+        self.assertEqual(1, stats.get_stats(today=date(2028, 3, 1))['age_bands']['20-29'])
+        self.assertEqual(1, stats.get_stats(today=date(2028, 3, 1))['tenure_bands']['6-9'])
+        self.assertEqual(1, stats.get_stats(today=date(2028, 3, 1))['tenure_bands']['10+'])
+
+    def test_aggregates_follow_writes(self):
+        """
+        aggregates_follow_writes returns True if after saves, deletes and
+        bulk writes the aggregates match the ones rebuilt from scratch.
+        """
+        seed_employees(100)
+        self.employee.department = get_department('Sales')
+        self.employee.save()
+        Employee.objects.filter(gender='F').update(department='Finance')
+        employees = list(Employee.objects.filter(department__name='Finance')[:10])
+        for employee in employees:
+            employee.gender = 'M'
+        Employee.objects.bulk_update(employees, ['gender'])
+        for employee in employees[:5]:
+            employee.department = get_department('Brand New')
+        Employee.objects.bulk_update(employees[:5], ['department'])
+        Employee.objects.filter(pk=employees[5].pk).update(department_id=get_department('Legal').pk)
+        Employee.objects.filter(department__name='Sales').delete()
+
+        incremental = stats.get_stats()
+        stdout = StringIO()
+        call_command('rebuild_employee_stats', stdout=stdout)
+        self.assertIn('Rebuilt', stdout.getvalue())
+        self.assertEqual(stats.get_stats(), incremental)
+        self.assertEqual(Employee.objects.count(), incremental['total'])
+        self.assertNotIn('Sales', incremental['departments'])
+        self.assertIn('Brand New', incremental['departments'])
+        self.assertFalse(EmployeeAggregate.objects.filter(count__lte=0).exists())
+
+
+class LoadBenchmarkTests(TestCase):
+    """Test class for the load benchmark measures."""
+
+    def test_percentile(self):
+        """
+        percentile returns True if the nearest rank percentile is picked.
+        """
+        timings = list(range(1, 101))
+        self.assertEqual(50, load.percentile(timings, 50))
+        self.assertEqual(95, load.percentile(timings, 95))
+        self.assertEqual(1, load.percentile([1], 99))
+
+    @skipUnless(hasattr(random.Random, 'choices'), 'Random.choices is new in Python 3.6')
+    def test_weighted_choice(self):
+        """
+        weighted_choice returns True if it picks what Random.choices picks
+        from the same generator state, without needing Python 3.6.
+        """
+        names, weights = zip(*DEPARTMENTS)
+        generator, reference = random.Random(7), random.Random(7)
+        picked = [weighted_choice(generator, names, weights) for _ in range(200)]
+        self.assertEqual(reference.choices(names, weights, k=200), picked)
+
+    def test_compare_against_baseline(self):
+        """
+        compare_against_baseline returns True if extra queries and a p95
+        past the tolerance, when there is one, are reported as regressions.
+        """
+        baseline = {'list': {'p95': 10.0, 'max_queries': 2}}
+        self.assertEqual([], load.compare({'list': {'p95': 14.0, 'max_queries': 2}}, baseline, 0.5))
+        self.assertEqual([], load.compare({'retrieve': {'p95': 99.0, 'max_queries': 9}}, baseline, 0.5))
+
+        regressions = load.compare({'list': {'p95': 17.0, 'max_queries': 3}}, baseline, 0.5)
+        self.assertEqual(2, len(regressions))
+        regressions = load.compare({'list': {'p95': 170.0, 'max_queries': 3}}, baseline, None)
+        self.assertEqual(['list: 3 queries per request, baseline 2'], regressions)
+
+
+class ServerTimingTests(BaseAPITest):
+    """Test class for the per request Server-Timing instrumentation."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+    def test_server_timing_header(self):
+        """
+        server_timing_header returns True if the response reports the
+        queries run and the time spent in every phase of the request.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('employee-list'), HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+
+        metrics = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(['db', 'auth', 'view', 'render', 'total'], metrics)
+        self.assertIn('desc="{} queries"'.format(len(queries)), response['Server-Timing'])
+
+    def test_slow_request_log(self):
+        """
+        slow_request_log returns True if requests over the threshold are
+        logged with their measures, and faster ones aren't.
+        """
+        with self.settings(SLOW_REQUEST_THRESHOLD=0):
+            with self.assertLogs('api.timing', 'WARNING') as logs:
+                self.client.get(reverse('employee-list'), HTTP_AUTHORIZATION=self.auth_token)
+        record = logs.records[0].timing
+        self.assertEqual('/api/v1/employees/', record['path'])
+        self.assertEqual(200, record['status'])
+        self.assertIn('db_ms', record)
+
+        with self.settings(SLOW_REQUEST_THRESHOLD=60 * 1000):
+            with mock.patch.object(timing.logger, 'warning') as warning:
+                self.client.get(reverse('employee-list'), HTTP_AUTHORIZATION=self.auth_token)
+        warning.assert_not_called()
+
+
+class CachedJWTAuthenticationTests(BaseAPITest):
+    """Test class for the user cache of JWT authentication."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+    def _get(self):
+        return self.client.get(reverse('metrics'), HTTP_AUTHORIZATION=self.auth_token)
+
+    def test_user_lookup_is_cached(self):
+        """
+        user_lookup_is_cached returns True if only the first request with
+        a token queries the user table.
+        """
+        self.test_user.is_staff = True
+        self.test_user.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(200, self._get().status_code)
+        self.assertTrue([query for query in queries.captured_queries if 'auth_user' in query['sql']])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(200, self._get().status_code)
+        self.assertFalse([query for query in queries.captured_queries if 'auth_user' in query['sql']])
+
+    def test_deactivated_user_is_rejected(self):
+        """
+        deactivated_user_is_rejected returns True if a cached user stops
+        being authenticated as soon as they are deactivated.
+        """
+        self.assertEqual(403, self._get().status_code)
+        self.test_user.is_active = False
+        self.test_user.save()
+        self.assertEqual(401, self._get().status_code)
+
+    def test_deleted_user_is_rejected(self):
+        """
+        deleted_user_is_rejected returns True if a cached user stops being
+        authenticated as soon as they are deleted.
+        """
+        self.assertEqual(403, self._get().status_code)
+        self.test_user.delete()
+        self.assertEqual(401, self._get().status_code)
+
+    def test_password_change_drops_cached_user(self):
+        """
+        password_change_drops_cached_user returns True if changing the
+        password removes the user from the cache.
+        """
+        self._get()
+        key = authentication.get_user_key('test_user')
+        self.assertIsNotNone(authentication.get_cache().get(key))
+
+        self.test_user.set_password('new123456')
+        self.test_user.save()
+        self.assertIsNone(authentication.get_cache().get(key))
+
+
+class CachedBasicAuthenticationTests(BaseAPITest):
+    """Test class for the verified credentials cache of Basic authentication."""
+
+    def _get(self, password):
+        credentials = base64.b64encode('test_user:{}'.format(password).encode('utf-8')).decode('ascii')
+        return self.client.get(reverse('employee-list'), HTTP_AUTHORIZATION='Basic {}'.format(credentials))
+
+    def test_verified_credentials_are_cached(self):
+        """
+        verified_credentials_are_cached returns True if only the first
+        request with some credentials checks the password.
+        """
+        self.assertEqual(200, self._get('test123456').status_code)
+        with mock.patch('django.contrib.auth.base_user.check_password') as check_password:
+            with self.assertNumQueries(0):
+                self.assertEqual(200, self._get('test123456').status_code)
+        check_password.assert_not_called()
+
+        self.assertEqual(401, self._get('wrong123456').status_code)
+
+    def test_password_change_rejects_old_credentials(self):
+        """
+        password_change_rejects_old_credentials returns True if cached
+        credentials stop working once the password is changed.
+        """
+        self.assertEqual(200, self._get('test123456').status_code)
+        self.test_user.set_password('new123456')
+        self.test_user.save()
+
+        self.assertEqual(200, self._get('new123456').status_code)
+        self.assertEqual(401, self._get('test123456').status_code)
+
+
+class DatabaseRoutingTests(BaseAPITest):
+    """Test class for the primary/replica database routing."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+    def test_router(self):
+        """
+        router returns True if reads go where reading_from() says and
+        writes always go to the primary.
+        """
+        router = routers.PrimaryReplicaRouter()
+        self.assertEqual('default', router.db_for_read(Employee))
+        with routers.reading_from('replica'):
+            self.assertEqual('replica', router.db_for_read(Employee))
+            self.assertEqual('default', router.db_for_write(Employee))
+        self.assertEqual('default', router.db_for_read(Employee))
+
+        with self.settings(DATABASE_REPLICAS=['replica']):
+            self.assertFalse(router.allow_migrate('replica', 'api'))
+            self.assertTrue(router.allow_migrate('default', 'api'))
+
+    def test_reads_stick_to_primary_after_write(self):
+        """
+        reads_stick_to_primary_after_write returns True if a user's reads
+        go to a replica until they write, then to the primary.
+        """
+        with self.settings(DATABASE_REPLICAS=['replica']):
+            self.assertEqual('replica', routers.choose_read_database(self.test_user))
+
+            response = self.client.post(reverse('employee-list'), data={
+                'name': 'jane doe',
+                'email': 'jane.doe@luizalabs.com',
+                'department': 'Marketing',
+                'gender': 'F',
+                'birthdate': '1989-05-24',
+                'hire_date': '2019-04-07',
+            }, HTTP_AUTHORIZATION=self.auth_token)
+            self.assertEqual(201, response.status_code)
+            self.assertEqual('default', routers.choose_read_database(self.test_user))
+
+    def test_view_reads_from_chosen_database(self):
+        """
+        view_reads_from_chosen_database returns True if list reads are
+        routed to the chosen database only while the view runs.
+        """
+        with mock.patch('api.routers.set_read_database', wraps=routers.set_read_database) as set_read_database:
+            response = self.client.get(reverse('employee-list'), HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([mock.call('default'), mock.call(None)], set_read_database.call_args_list)
+        self.assertEqual('default', routers.get_read_database())
+
+    def test_cache_keys_per_database(self):
+        """
+        cache_keys_per_database returns True if what was read from a
+        replica is cached apart from what was read from the primary, and
+        pins live in the routing cache.
+        """
+        primary_key = cache.get_key('response', 'list', [])
+        with routers.reading_from('replica'):
+            replica_key = cache.get_key('response', 'list', [])
+        self.assertNotEqual(primary_key, replica_key)
+        self.assertEqual(primary_key, cache.get_key('response', 'list', []))
+
+        with self.settings(ROUTING_CACHE='auth'):
+            routers.pin_to_primary(self.test_user)
+            self.assertTrue(caches['auth'].get(routers.get_pinned_key(self.test_user)))
+            self.assertFalse(caches['default'].get(routers.get_pinned_key(self.test_user)))
+
+
+class ReplicateDatabaseTests(TransactionTestCase):
+    """
+    Test class for the replicate_database command, committing its writes:
+    the backup API waits on a source with a transaction open.
+    """
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.replica_path = os.path.join(self.directory.name, 'replica.sqlite3')
+        connections.databases['replica'] = dict(connections.databases['default'], NAME=self.replica_path)
+        self.addCleanup(self._remove_replica)
+
+        Employee.objects.create(name='Jane Doe', email='jane.doe@luizalabs.com',
+                                department=get_department('Development'), gender='F',
+                                birthdate=date(1990, 1, 1), hire_date=date(2015, 1, 1))
+
+    def _remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+
+    def test_replicate_and_read_back(self):
+        """
+        replicate_and_read_back returns True if employees written to the
+        primary are read back from the replica after replicating.
+        """
+        stdout = StringIO()
+        with self.settings(DATABASE_REPLICAS=['replica']):
+            call_command('replicate_database', stdout=stdout)
+        self.assertIn('Replicated default to replica', stdout.getvalue())
+        employee = Employee.objects.using('replica').select_related('department').get(email='jane.doe@luizalabs.com')
+        self.assertEqual(('Jane Doe', 'Development'), (employee.name, employee.department.name))
+
+    def test_copy_locked(self):
+        """
+        copy_locked returns True if a database file is copied whole, the
+        way replicas are made before Python 3.7.
+        """
+        source = os.path.join(self.directory.name, 'source.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('CREATE TABLE employee (name TEXT)')
+            connection.execute("INSERT INTO employee VALUES ('Jane Doe')")
+        connection.close()
+
+        replicate_database.copy_locked(source, self.replica_path)
+        with sqlite3.connect(self.replica_path) as connection:
+            self.assertEqual([('Jane Doe',)], connection.execute('SELECT name FROM employee').fetchall())
+        connection.close()
+        self.assertFalse(os.path.exists(self.replica_path + '.tmp'))
+
+
+class SparseFieldsetTests(BaseAPITest):
+    """Test class for the ?fields= and ?exclude= query parameters."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.employee = Employee.objects.create(name='John Doe',
+                                                email='john.doe@luizalabs.com',
+                                                department=get_department('Development'),
+                                                gender='M',
+                                                birthdate=datetime(1989, 5, 23),
+                                                hire_date=datetime(2004, 7, 12))
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_token)
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT') and 'FROM "api_employee"' in query['sql']]
+        return response, selects
+
+    def test_list_fields(self):
+        """
+        list_fields returns True if only the chosen fields are returned
+        and read, besides the ones the pagination needs.
+        """
+        response, selects = self._get(reverse('employee-list') + '?fields=email,id')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([{'id': self.employee.id, 'email': 'john.doe@luizalabs.com'}], response.json()['results'])
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('"department"', sql)
+            self.assertNotIn('"birthdate"', sql)
+
+    def test_retrieve_exclude(self):
+        """
+        retrieve_exclude returns True if excluded fields are neither
+        returned nor read.
+        """
+        url = reverse('employee-detail', [self.employee.id]) + '?exclude=birthdate,hire_date,gender'
+        response, selects = self._get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(['id', 'name', 'email', 'department'], list(response.json()))
+        self.assertNotIn('"hire_date"', selects[-1])
+
+    def test_retrieve_fields(self):
+        """
+        retrieve_fields returns True if the department is only joined
+        when it is one of the chosen fields.
+        """
+        url = reverse('employee-detail', [self.employee.id])
+        response, selects = self._get(url + '?fields=id,email')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'id': self.employee.id, 'email': 'john.doe@luizalabs.com'}, response.json())
+        self.assertNotIn('"api_department"', selects[-1])
+
+        response, selects = self._get(url + '?fields=id,department')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'id': self.employee.id, 'department': 'Development'}, response.json())
+        self.assertIn('"api_department"."name"', selects[-1])
+        self.assertNotIn('"api_employee"."email"', selects[-1])
+
+    def test_unknown_fields(self):
+        """
+        unknown_fields returns True if unknown or excluding every field
+        is rejected with a 400.
+        """
+        response, selects = self._get(reverse('employee-list') + '?fields=id,salary')
+        self.assertEqual(400, response.status_code)
+        self.assertIn('salary', response.json()['fields'][0])
+
+        response, selects = self._get(reverse('employee-list') + '?fields=id&exclude=id')
+        self.assertEqual(400, response.status_code)
+
+
+class EmployeeAdminTests(TestCase):
+    """Test class for the employee admin."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        for cache_alias in settings.CACHES:
+            caches[cache_alias].clear()
+        admin_user = UserModel.objects.create_superuser('admin', 'admin@luizalabs.com', 'admin123456')
+        self.client.force_login(admin_user)
+
+        Employee.objects.bulk_create([
+            Employee(name='Employee {:02}'.format(i),
+                     email='employee{}@luizalabs.com'.format(i),
+                     department=get_department('Development' if i % 3 else 'Sales'),
+                     gender='F' if i % 2 else 'M',
+                     birthdate=datetime(1990, 1, 1),
+                     hire_date=datetime(2015, 1, 1))
+            for i in range(30)
+        ])
+        self.url = reverse('admin:api_employee_changelist')
+
+    def _names(self, response):
+        return [employee.name for employee in response.context['cl'].result_list]
+
+    def test_changelist_pages_by_keyset(self):
+        """
+        changelist_pages_by_keyset returns True if next and previous
+        links walk the employees in order without offsets.
+        """
+        with mock.patch('api.admin.EmployeeAdmin.list_per_page', 12):
+            first = self.client.get(self.url)
+            self.assertEqual(200, first.status_code)
+            self.assertEqual(['Employee {:02}'.format(i) for i in range(12)], self._names(first))
+            self.assertIsNone(first.context['cl'].previous_url)
+
+            second = self.client.get(self.url + first.context['cl'].next_url)
+            self.assertEqual(['Employee {:02}'.format(i) for i in range(12, 24)], self._names(second))
+
+            with CaptureQueriesContext(connection) as queries:
+                third = self.client.get(self.url + second.context['cl'].next_url)
+            self.assertEqual(['Employee {:02}'.format(i) for i in range(24, 30)], self._names(third))
+            self.assertIsNone(third.context['cl'].next_url)
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+
+            previous = self.client.get(self.url + third.context['cl'].previous_url)
+            self.assertEqual(self._names(second), self._names(previous))
+
+    def test_filters_count_from_aggregates(self):
+        """
+        filters_count_from_aggregates returns True if filter choices and
+        filtered counts come from the aggregates, without COUNT queries.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'department': 'Sales', 'gender': 'M'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(5, response.context['cl'].result_count)
+        self.assertEqual(5, len(response.context['cl'].result_list))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertContains(response, 'Sales (10)')
+        self.assertContains(response, 'Female (15)')
+
+    def test_changelist_rejects_tampered_cursor(self):
+        """
+        changelist_rejects_tampered_cursor returns True if a cursor of
+        values of the wrong types is an invalid lookup, not an error.
+        """
+        for position in (['x', 'y'], [None, None], ['x', [1]]):
+            response = self.client.get(self.url, {'cursor': tamper_cursor(position)})
+            self.assertEqual(302, response.status_code)
+            self.assertIn('e=1', response['Location'])
+
+    @requires_fts_index
+    def test_search_uses_index(self):
+        """
+        search_uses_index returns True if the admin search is answered
+        by the full-text index.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'q': 'employee 07'})
+        self.assertEqual(['Employee 07'], self._names(response))
+        self.assertTrue(any(search.FTS_TABLE in query['sql'] for query in queries))
+
+    def test_update_action_is_set_based(self):
+        """
+        update_action_is_set_based returns True if the update action
+        changes every selected employee with a single UPDATE.
+        """
+        selected = list(Employee.objects.filter(department__name='Sales').values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'update_selected',
+                '_selected_action': selected,
+                'department': 'Finance',
+                'gender': '',
+            })
+        self.assertEqual(302, response.status_code)
+        self.assertEqual(10, Employee.objects.filter(department__name='Finance').count())
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "api_employee"')]
+        self.assertEqual(1, len(updates))
+        self.assertEqual(10, stats.exact_count('Finance'))
+
+    def test_delete_action_is_set_based(self):
+        """
+        delete_action_is_set_based returns True if the delete action asks
+        for confirmation, then deletes the selected employees with a single
+        DELETE and logs one entry listing them.
+        """
+        selected = list(Employee.objects.filter(department__name='Sales').values_list('pk', flat=True))
+        response = self.client.post(self.url, {'action': 'delete_selected', '_selected_action': selected})
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'Are you sure')
+        self.assertEqual(30, Employee.objects.count())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'delete_selected',
+                '_selected_action': selected,
+                'post': 'yes',
+            })
+        self.assertEqual(302, response.status_code)
+        self.assertEqual(20, Employee.objects.count())
+        deletes = [query for query in queries if query['sql'].startswith('DELETE FROM "api_employee"')]
+        self.assertEqual(1, len(deletes))
+        self.assertLess(len(queries), 20)
+        self.assertEqual(0, stats.exact_count('Sales'))
+
+        entry = LogEntry.objects.get()
+        self.assertEqual(DELETION, entry.action_flag)
+        self.assertEqual('10 employees', entry.object_repr)
+        self.assertEqual('Deleted employees {}.'.format(', '.join(str(pk) for pk in sorted(selected))),
+                         entry.change_message)
+
+
+class EmployeeBatchTests(BaseAPITest):
+    """Test class for the batch retrieval of employees."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.employees = Employee.objects.bulk_create([
+            Employee(name='Employee {}'.format(i),
+                     email='employee{}@luizalabs.com'.format(i),
+                     department=get_department('Development'),
+                     gender='M',
+                     birthdate=datetime(1990, 1, 1),
+                     hire_date=datetime(2015, 1, 1))
+            for i in range(5)
+        ])
+        self.url = reverse('employee-batch')
+
+    def _get(self, data):
+        return self.client.get(self.url, data=data, HTTP_AUTHORIZATION=self.auth_token)
+
+    def test_batch_by_ids_and_emails(self):
+        """
+        batch_by_ids_and_emails returns True if the asked employees come
+        in order from a single query, with missing keys listed apart.
+        """
+        first, second, third = [Employee.objects.get(email='employee{}@luizalabs.com'.format(i)) for i in (3, 0, 1)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get({
+                'ids': '{},{},999999'.format(first.pk, second.pk),
+                'emails': 'employee1@luizalabs.com,EMPLOYEE0@luizalabs.com,nobody@luizalabs.com',
+            })
+        self.assertEqual(200, response.status_code)
+
+        response_data = response.json()
+        self.assertEqual(EmployeeSerializer(instance=[first, second, third], many=True).data, response_data['results'])
+        self.assertEqual({'ids': [999999], 'emails': ['EMPLOYEE0@luizalabs.com', 'nobody@luizalabs.com']},
+                         response_data['missing'])
+        selects = [query for query in queries if query['sql'].startswith('SELECT "api_employee"."id"')]
+        self.assertEqual(1, len(selects))
+
+    def test_batch_served_from_cache(self):
+        """
+        batch_served_from_cache returns True if employees fetched once are
+        served without reading them again, until employees are written to.
+        """
+        ids = ','.join(str(employee.pk) for employee in Employee.objects.all()[:3])
+        self._get({'ids': ids})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get({'ids': ids, 'fields': 'id,name'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([{'id', 'name'}] * 3, [set(employee) for employee in response.json()['results']])
+        self.assertFalse(any('"api_employee"' in query['sql'] for query in queries))
+
+        with committed():
+            Employee.objects.filter(pk=int(ids.split(',')[0])).update(name='Renamed Employee')
+        response = self._get({'ids': ids})
+        self.assertEqual('Renamed Employee', response.json()['results'][0]['name'])
+
+    def test_batch_invalid_keys(self):
+        """
+        batch_invalid_keys returns True if invalid, missing or too many
+        keys respond 400.
+        """
+        response = self._get({'ids': '1,two'})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'ids': ['"two" is not a valid id.']}, response.json())
+
+        response = self._get({})
+        self.assertEqual(400, response.status_code)
+
+        response = self._get({'ids': ','.join(str(i) for i in range(1, 102))})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(['Ensure no more than 100 employees are asked for.'], response.json()['non_field_errors'])
+
+
+@override_settings(CHANGE_FEED_DELAY=0)
+class EmployeeChangeFeedTests(BaseAPITest):
+    """Test class for the employee change feed."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        for i in range(5):
+            Employee.objects.create(name='Employee {}'.format(i),
+                                    email='employee{}@luizalabs.com'.format(i),
+                                    department=get_department('Development'),
+                                    gender='M',
+                                    birthdate=datetime(1990, 1, 1),
+                                    hire_date=datetime(2015, 1, 1))
+
+    def _get(self, url=None, data=None):
+        response = self.client.get(url or reverse('employee-changes'), data=data, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        return response.json()
+
+    def test_feed_pages_through_every_employee(self):
+        """
+        feed_pages_through_every_employee returns True if following next
+        links returns each employee once, in the order they changed.
+        """
+        with mock.patch('api.views.EmployeeViewSet.changes_page_size', 2):
+            pages = [self._get()]
+            while pages[-1]['has_more']:
+                pages.append(self._get(pages[-1]['next']))
+
+        self.assertEqual([2, 2, 1], [len(page['results']) for page in pages])
+        changes = [change for page in pages for change in page['results']]
+        self.assertEqual(['upsert'] * 5, [change['type'] for change in changes])
+        self.assertEqual(
+            EmployeeSerializer(instance=Employee.objects.order_by('updated', 'id'), many=True).data,
+            [change['employee'] for change in changes]
+        )
+        self.assertEqual([], self._get(pages[-1]['next'])['results'])
+
+    def test_feed_resumes_with_changes_and_tombstones(self):
+        """
+        feed_resumes_with_changes_and_tombstones returns True if a cursor
+        only gets the employees changed and deleted since it was given.
+        """
+        cursor = self._get()['next']
+
+        updated = Employee.objects.get(email='employee3@luizalabs.com')
+        updated.department = get_department('Sales')
+        updated.save()
+        deleted = Employee.objects.get(email='employee1@luizalabs.com')
+        deleted_pk = deleted.pk
+        deleted.delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            page = self._get(cursor + '&fields=id,department')
+        self.assertFalse(page['has_more'])
+        self.assertEqual(
+            [('upsert', updated.pk), ('delete', deleted_pk)],
+            [(change['type'], change['id']) for change in page['results']]
+        )
+        self.assertEqual({'id': updated.pk, 'department': 'Sales'}, page['results'][0]['employee'])
+        self.assertEqual('employee1@luizalabs.com', page['results'][1]['email'])
+        self.assertEqual([], self._get(page['next'])['results'])
+
+        for query in queries:
+            if query['sql'].startswith('SELECT') and 'ORDER BY' in query['sql']:
+                with connection.cursor() as db_cursor:
+                    db_cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plan = ' '.join(row[-1] for row in db_cursor.fetchall())
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feed_holds_back_recent_changes(self):
+        """
+        feed_holds_back_recent_changes returns True if changes younger than
+        CHANGE_FEED_DELAY are left out, the cursor not moving past them,
+        so a transaction stamped earlier and committed later is not missed.
+        """
+        with self.settings(CHANGE_FEED_DELAY=60):
+            page = self._get()
+            self.assertEqual([], page['results'])
+
+        # committed late, with a stamp older than the delay
+        Employee.objects.filter(email='employee2@luizalabs.com').update(
+            updated=timezone.now() - timedelta(seconds=120)
+        )
+        with self.settings(CHANGE_FEED_DELAY=60):
+            page = self._get(page['next'])
+        self.assertEqual(['employee2@luizalabs.com'], [change['employee']['email'] for change in page['results']])
+        self.assertEqual(5, len(self._get()['results']))
+
+    def test_feed_since_and_invalid_cursors(self):
+        """
+        feed_since_and_invalid_cursors returns True if `since` starts the
+        feed at a date time, and invalid cursors or dates are rejected.
+        """
+        Employee.objects.filter(email='employee4@luizalabs.com').update(department='Sales')
+        since = Employee.objects.get(email='employee4@luizalabs.com').updated
+        page = self._get(data={'since': since.isoformat()})
+        self.assertEqual(['employee4@luizalabs.com'], [change['employee']['email'] for change in page['results']])
+        self.assertNotIn('since=', page['next'])
+
+        response = self.client.get(reverse('employee-changes'), data={'cursor': 'invalid'},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(404, response.status_code)
+
+        response = self.client.get(reverse('employee-changes'), data={'since': 'yesterday'},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+
+
+class WebhookStandIn(object):
+    """Local HTTP server standing in for a webhook subscriber."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if stand_in.failures:
+                    stand_in.failures -= 1
+                    self.send_response(500)
+                else:
+                    stand_in.requests.append((dict(self.headers), json.loads(body.decode('utf-8'))))
+                    self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/hook/'.format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def events(self):
+        return [event for headers, body in self.requests for event in body['events']]
+
+
+@override_settings(CHANGE_FEED_DELAY=0)
+class WebhookOutboxTests(BaseAPITest):
+    """Test class for the employee outbox and its webhook delivery."""
+
+    def _create(self, i):
+        return Employee.objects.create(name='Employee {}'.format(i),
+                                       email='employee{}@luizalabs.com'.format(i),
+                                       department=get_department('Development'),
+                                       gender='M',
+                                       birthdate=datetime(1990, 1, 1),
+                                       hire_date=datetime(2015, 1, 1))
+
+    def _stand_in(self, failures=0):
+        stand_in = WebhookStandIn(failures)
+        self.addCleanup(stand_in.stop)
+        return stand_in
+
+    def test_writes_add_events_in_their_transaction(self):
+        """
+        writes_add_events_in_their_transaction returns True if every kind
+        of write adds its events, and rolled back writes add none.
+        """
+        employee = self._create(0)
+        employee.department = get_department('Sales')
+        employee.save()
+        Employee.objects.bulk_create([
+            Employee(name='employee 1', email='employee1@luizalabs.com', department=get_department('Sales'), gender='F',
+                     birthdate=date(1990, 1, 1), hire_date=date(2015, 1, 1)),
+        ])
+        Employee.objects.filter(department__name='Sales').update(gender='F')
+        employee.delete()
+        try:
+            with transaction.atomic():
+                self._create(2)
+                raise IntegrityError
+        except IntegrityError:
+            pass
+
+        events = [(event.action, json.loads(event.payload)) for event in OutboxEvent.objects.order_by('pk')]
+        self.assertEqual(['create', 'update', 'create', 'update', 'update', 'delete'],
+                         [action for action, payload in events])
+        self.assertEqual('Sales', events[1][1]['department'])
+        self.assertEqual('Employee 1', events[2][1]['name'])
+        self.assertEqual(Employee.objects.get(email='employee1@luizalabs.com').pk, events[2][1]['id'])
+        self.assertEqual(['F', 'F'], [payload['gender'] for action, payload in events[3:5]])
+        self.assertEqual('1990-01-01', events[5][1]['birthdate'])
+
+    def test_delivery_in_batches_with_retries(self):
+        """
+        delivery_in_batches_with_retries returns True if events reach
+        every subscriber in order and in batches, failed deliveries are
+        retried after a backoff, and delivered events are pruned.
+        """
+        healthy = self._stand_in()
+        flaky = self._stand_in(failures=1)
+        WebhookSubscriber.objects.create(url=healthy.url, secret='s3cr3t')
+        WebhookSubscriber.objects.create(url=flaky.url)
+        employees = [self._create(i) for i in range(5)]
+
+        stdout = StringIO()
+        call_command('deliver_webhooks', '--batch-size', '2', '--workers', '2', stdout=stdout)
+        self.assertIn('Delivered 5 events, 1 deliveries failed, pruned 0 events.', stdout.getvalue())
+
+        self.assertEqual([2, 2, 1], [len(body['events']) for headers, body in healthy.requests])
+        self.assertEqual([employee.pk for employee in employees],
+                         [event['employee_id'] for event in healthy.events])
+        headers, body = healthy.requests[0]
+        signature = outbox.get_signature('s3cr3t', json.dumps(body).encode('utf-8'))
+        self.assertEqual(signature, headers[outbox.SIGNATURE_HEADER])
+
+        subscriber = WebhookSubscriber.objects.get(url=flaky.url)
+        self.assertEqual(1, subscriber.failures)
+        self.assertGreater(subscriber.retry_at, timezone.now())
+        self.assertEqual([], flaky.requests)
+
+        call_command('deliver_webhooks', stdout=StringIO())
+        self.assertEqual([], flaky.requests)
+
+        WebhookSubscriber.objects.filter(pk=subscriber.pk).update(retry_at=timezone.now())
+        stdout = StringIO()
+        call_command('deliver_webhooks', '--batch-size', '2', stdout=stdout)
+        self.assertIn('Delivered 5 events, 0 deliveries failed, pruned 5 events.', stdout.getvalue())
+        self.assertEqual(healthy.events, flaky.events)
+        self.assertEqual(0, WebhookSubscriber.objects.get(pk=subscriber.pk).failures)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_backoff_and_metrics(self):
+        """
+        backoff_and_metrics returns True if retries wait exponentially
+        longer, and queue depths and latencies are exposed as metrics.
+        """
+        self.assertEqual([2, 4, 8, 10], [outbox.get_backoff(failures, 2, 10) for failures in range(1, 5)])
+
+        stand_in = self._stand_in()
+        WebhookSubscriber.objects.create(url=stand_in.url)
+        self._create(0)
+        self._create(1)
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        self.client.force_authenticate(self.test_user)
+        subscriber_metrics = self.client.get(reverse('metrics')).json()['webhooks']['subscribers'][0]
+        self.assertEqual(2, subscriber_metrics['queue_depth'])
+        self.assertIsNone(subscriber_metrics['last_delivery_latency'])
+
+        call_command('deliver_webhooks', stdout=StringIO())
+        metrics = self.client.get(reverse('metrics')).json()['webhooks']
+        self.assertEqual(0, metrics['outbox_size'])
+        self.assertEqual(0, metrics['subscribers'][0]['queue_depth'])
+        self.assertEqual(2, metrics['subscribers'][0]['delivered_events'])
+        self.assertGreaterEqual(metrics['subscribers'][0]['last_delivery_latency'], 0)
+
+    def test_prune_moves_inactive_subscribers_past_the_gap(self):
+        """
+        prune_moves_inactive_subscribers_past_the_gap returns True if
+        events pruned while a subscriber was inactive are recorded in its
+        last_error, and once reactivated it gets the following events.
+        """
+        active = self._stand_in()
+        paused = self._stand_in()
+        WebhookSubscriber.objects.create(url=active.url)
+        subscriber = WebhookSubscriber.objects.create(url=paused.url, is_active=False)
+        first = self._create(0)
+        self._create(1)
+
+        stdout = StringIO()
+        call_command('deliver_webhooks', stdout=stdout)
+        self.assertIn('pruned 2 events', stdout.getvalue())
+        subscriber.refresh_from_db()
+        self.assertEqual(2, len(active.events))
+        last_event_id = active.events[-1]['id']
+        self.assertEqual(last_event_id, subscriber.last_event_id)
+        self.assertEqual(
+            'Events {} to {} were pruned while inactive, catch up through the change feed.'.format(
+                active.events[0]['id'], last_event_id
+            ),
+            subscriber.last_error
+        )
+
+        subscriber.is_active = True
+        subscriber.save()
+        first_pk = first.pk
+        first.delete()
+        call_command('deliver_webhooks', stdout=StringIO())
+        self.assertEqual([('delete', first_pk)], [(event['action'], event['employee_id']) for event in paused.events])
+        self.assertEqual('', WebhookSubscriber.objects.get(pk=subscriber.pk).last_error)
+
+
+class EmployeeUpcomingTests(BaseAPITest):
+    """Test class for the upcoming birthdays and work anniversaries."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        Employee.objects.bulk_create([
+            Employee(name=name,
+                     email='{}@luizalabs.com'.format(name.lower().replace(' ', '.')),
+                     department=get_department('Development'),
+                     gender='M',
+                     birthdate=birthdate,
+                     hire_date=hire_date)
+            for name, birthdate, hire_date in (
+                ('John Doe', date(1990, 12, 30), date(2010, 1, 3)),
+                ('Jane Doe', date(1992, 1, 2), date(2015, 12, 29)),
+                ('Leap Roe', date(1992, 2, 29), date(2012, 2, 29)),
+                ('March Roe', date(1985, 3, 1), date(2019, 3, 1)),
+                ('June Roe', date(1980, 6, 15), date(2001, 6, 15)),
+            )
+        ])
+
+    def _get(self, route, **params):
+        response = self.client.get(reverse(route), data=params, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        return [(item['employee']['name'], item['date'], item['years']) for item in response.json()['results']]
+
+    def test_upcoming_across_new_year(self):
+        """
+        upcoming_across_new_year returns True if dates after New Year come
+        after the ones before it, in a single query using the index.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            results = self._get('employee-upcoming-birthdays', start='2026-12-28', days=10)
+        self.assertEqual([('John Doe', '2026-12-30', 36), ('Jane Doe', '2027-01-02', 35)], results)
+
+        selects = [query['sql'] for query in queries if 'birth_monthday' in query['sql']]
+        self.assertEqual(1, len(selects))
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + selects[0])
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertFalse([detail for detail in plan if detail.startswith('SCAN')])
+        self.assertTrue([detail for detail in plan if 'api_employee_birth_md_idx' in detail])
+
+        self.assertEqual(
+            [('Jane Doe', '2026-12-29', 11), ('John Doe', '2027-01-03', 17)],
+            self._get('employee-upcoming-anniversaries', start='2026-12-28', days=10)
+        )
+
+    def test_leap_days(self):
+        """
+        leap_days returns True if February 29th dates come on February
+        28th in common years and on February 29th in leap years.
+        """
+        self.assertEqual([('Leap Roe', '2027-02-28', 35)],
+                         self._get('employee-upcoming-birthdays', start='2027-02-20', days=9))
+        self.assertEqual([], self._get('employee-upcoming-birthdays', start='2028-02-20', days=9))
+        self.assertEqual([('Leap Roe', '2028-02-29', 36), ('March Roe', '2028-03-01', 43)],
+                         self._get('employee-upcoming-birthdays', start='2028-02-20', days=11))
+        self.assertEqual([('March Roe', '2027-03-01', 8)],
+                         self._get('employee-upcoming-anniversaries', start='2027-03-01', days=1))
+
+    def test_window_boundaries(self):
+        """
+        window_boundaries returns True if the window holds ``days`` days,
+        ``start`` being the first and the last one included.
+        """
+        self.assertEqual(([(125, 203)], False), upcoming.get_ranges(date(2025, 1, 25), 10))
+        self.assertEqual(([(1225, 1231), (101, 103)], True), upcoming.get_ranges(date(2025, 12, 25), 10))
+        self.assertEqual(([(101, 1231)], False), upcoming.get_ranges(date(2025, 1, 1), 365))
+
+        self.assertEqual([], self._get('employee-upcoming-birthdays', start='2026-12-21', days=9))
+        self.assertEqual([('John Doe', '2026-12-30', 36)],
+                         self._get('employee-upcoming-birthdays', start='2026-12-21', days=10))
+        self.assertEqual([('John Doe', '2026-12-30', 36)],
+                         self._get('employee-upcoming-birthdays', start='2026-12-30', days=1))
+
+    def test_month_days_follow_writes(self):
+        """
+        month_days_follow_writes returns True if saves, bulk updates and
+        queryset updates keep the month-day columns in sync.
+        """
+        employee = Employee.objects.get(name='June Roe')
+        employee.birthdate = date(1980, 7, 1)
+        employee.save()
+        Employee.objects.filter(name='March Roe').update(birthdate=date(1985, 7, 2))
+        jane = Employee.objects.get(name='Jane Doe')
+        jane.hire_date = date(2015, 7, 3)
+        Employee.objects.bulk_update([jane], ['hire_date'])
+
+        self.assertEqual(
+            [('June Roe', '2026-07-01', 46), ('March Roe', '2026-07-02', 41)],
+            self._get('employee-upcoming-birthdays', start='2026-06-30', days=7)
+        )
+        self.assertEqual([('Jane Doe', '2026-07-03', 11)],
+                         self._get('employee-upcoming-anniversaries', start='2026-06-30', days=7))
+
+    def test_filters_limit_and_invalid_params(self):
+        """
+        filters_limit_and_invalid_params returns True if list filters and
+        limit apply, and invalid parameters respond 400.
+        """
+        response = self.client.get(reverse('employee-upcoming-birthdays'), data={
+            'start': '2026-01-01', 'days': 365, 'limit': 2, 'name': 'roe', 'fields': 'name'
+        }, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        response_data = response.json()
+        self.assertTrue(response_data['has_more'])
+        self.assertEqual([{'name': 'Leap Roe'}, {'name': 'March Roe'}],
+                         [item['employee'] for item in response_data['results']])
+
+        response = self.client.get(reverse('employee-upcoming-birthdays'), data={
+            'start': 'tomorrow', 'days': 400, 'limit': 'all'
+        }, HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'start', 'days', 'limit'}, set(response.json()))
+
+        response = self.client.get(reverse('employee-upcoming-birthdays'), data={'days': 0},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+        self.assertEqual({'days': ['Enter a whole number from 1 to 365.']}, response.json())
+
+
+class DepartmentTests(BaseAPITest):
+    """Test class for departments, referenced by employees and written by name."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        self.development = get_department('Development')
+        self.employee = Employee.objects.create(name='John Doe',
+                                                email='john.doe@luizalabs.com',
+                                                department=self.development,
+                                                gender='M',
+                                                birthdate=datetime(1989, 5, 24),
+                                                hire_date=datetime(2019, 4, 7))
+
+    def _payload(self, name, email, department):
+        return {'name': name, 'email': email, 'department': department,
+                'gender': 'F', 'birthdate': '1990-01-01', 'hire_date': '2019-01-01'}
+
+    def test_intern(self):
+        """
+        intern returns True if names get a single department each, the
+        existing ones being reused.
+        """
+        with self.assertNumQueries(1):
+            self.assertEqual({'Development': self.development}, Department.objects.intern(['Development']))
+
+        departments = Department.objects.intern(['Development', 'Sales', 'Sales'])
+        self.assertEqual(self.development, departments['Development'])
+        self.assertEqual(['Development', 'Sales'], list(Department.objects.values_list('name', flat=True)))
+        self.assertEqual(departments['Sales'], get_department('Sales'))
+
+    def test_written_and_read_by_name(self):
+        """
+        written_and_read_by_name returns True if the API accepts department
+        names, creating the new ones once per batch, and emits names.
+        """
+        response = self.client.post(reverse('employee-bulk'), data=[
+            self._payload('Jane Doe', 'jane.doe@luizalabs.com', 'Sales'),
+            self._payload('Jane Roe', 'jane.roe@luizalabs.com', 'Sales'),
+            self._payload('Richard Roe', 'richard.roe@luizalabs.com', 'Development'),
+        ], format='json', HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(['Sales', 'Sales', 'Development'],
+                         [employee['department'] for employee in response.json()])
+        self.assertEqual(2, Department.objects.count())
+        self.assertEqual(2, Employee.objects.filter(department__name='Sales').count())
+
+        response = self.client.patch(reverse('employee-detail', [self.employee.pk]), data={'department': 'Finance'},
+                                     format='json', HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('Finance', response.json()['department'])
+        self.assertEqual('Finance', Employee.objects.get(pk=self.employee.pk).department.name)
+
+        response = self.client.get(reverse('employee-list'), data={'fields': 'name,department'},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(['Sales', 'Sales', 'Finance', 'Development'],
+                         [employee['department'] for employee in response.json()['results']])
+
+        response = self.client.patch(reverse('employee-detail', [self.employee.pk]), data={'department': ''},
+                                     format='json', HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+        self.assertIn('department', response.json())
+
+    def test_filters_on_department_id(self):
+        """
+        filters_on_department_id returns True if department filters match
+        names in the departments table and employees on their department id.
+        """
+        sales = get_department('Sales')
+        Employee.objects.create(name='Jane Doe', email='jane.doe@luizalabs.com', department=sales,
+                                gender='F', birthdate=datetime(1990, 1, 1), hire_date=datetime(2019, 1, 1))
+
+        for params, names in (({'department_id': sales.pk}, ['Jane Doe']),
+                              ({'department_id': '{},{}'.format(sales.pk, self.development.pk)},
+                               ['Jane Doe', 'John Doe']),
+                              ({'department_exact': 'Sales'}, ['Jane Doe']),
+                              ({'department_prefix': 'Dev'}, ['John Doe']),
+                              ({'department': 'ALE'}, ['Jane Doe']),
+                              ({'q': 'sales jane'}, ['Jane Doe']),
+                              ({'q': 'doe'}, ['Jane Doe', 'John Doe'])):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('employee-list'), data=params, HTTP_AUTHORIZATION=self.auth_token)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(names, [employee['name'] for employee in response.json()['results']])
+            page = [query['sql'] for query in queries if 'LIMIT' in query['sql']][0]
+            self.assertNotIn('"api_department"."name" LIKE', page)
+
+        response = self.client.get(reverse('employee-list'), data={'department_id': 'sales'},
+                                   HTTP_AUTHORIZATION=self.auth_token)
+        self.assertEqual(400, response.status_code)
+        self.assertIn('department_id', response.json())
+
+    def test_stats_follow_department_changes(self):
+        """
+        stats_follow_department_changes returns True if moving employees
+        between departments keeps the aggregates, read by name, exact.
+        """
+        Employee.objects.filter(pk=self.employee.pk).update(department='Sales')
+        self.assertEqual(1, stats.exact_count('Sales'))
+        self.assertEqual(0, stats.exact_count('Development'))
+
+        self.employee.refresh_from_db()
+        self.employee.department = self.development
+        self.employee.save()
+        self.assertEqual(0, stats.exact_count('Sales'))
+        self.assertEqual(1, stats.exact_count('Development', 'M'))
+
+        stats.rebuild('default')
+        self.assertEqual(1, stats.exact_count('Development', 'M'))
+
+
+class CompactRendererTests(BaseAPITest):
+    """Test class for the MessagePack and columnar JSON renderings of employees."""
+
+    def setUp(self):
+        """
+        Set up necessary objects for testing this class.
+        """
+        super().setUp()
+
+        response = self._request_token_authentication('test_user', 'test123456')
+        content = response.json()
+        self.auth_token = 'JWT {}'.format(content['token'])
+
+        Employee.objects.bulk_create([
+            Employee(name='Employee {}'.format(i),
+                     email='employee{}@luizalabs.com'.format(i),
+                     department=get_department('Development' if i % 2 else 'Sales'),
+                     gender='M',
+                     birthdate=date(1990, 1, i + 1),
+                     hire_date=date(2015, 1, 1))
+            for i in range(5)
+        ])
+
+    def _get(self, url, params, media_type='*/*'):
+        response = self.client.get(url, data=params, HTTP_AUTHORIZATION=self.auth_token, HTTP_ACCEPT=media_type)
+        self.assertEqual(200, response.status_code)
+        return response
+
+    def test_messagepack(self):
+        """
+        messagepack returns True if MessagePack responses, negotiated by
+        Accept, decode to the JSON ones and are smaller.
+        """
+        url = reverse('employee-list')
+        params = {'department_exact': 'Development', 'page_size': 1}
+        expected = self._get(url, params)
+        response = self._get(url, params, 'application/msgpack')
+
+        self.assertEqual('application/msgpack', response['Content-Type'])
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(expected.json(), msgpack.unpackb(response.content, raw=False))
+        self.assertLess(len(response.content), len(expected.content))
+
+        response = self._get(reverse('employee-detail', [Employee.objects.first().pk]), {'format': 'msgpack'})
+        self.assertEqual('Employee 0', msgpack.unpackb(response.content, raw=False)['name'])
+
+    def test_columnar(self):
+        """
+        columnar returns True if list results come as one array per field,
+        dates as days since 1970-01-01, keeping pagination and filters.
+        """
+        response = self._get(reverse('employee-list'), {'gender': 'M', 'page_size': 2, 'format': 'columnar'})
+        self.assertEqual('application/vnd.luizalabs.columnar+json', response['Content-Type'])
+        response_data = response.json()
+        self.assertIsNotNone(response_data['next'])
+        results = response_data['results']
+        self.assertEqual(list(EmployeeSerializer.Meta.fields), list(results))
+        self.assertEqual(['Employee 0', 'Employee 1'], results['name'])
+        self.assertEqual(['Sales', 'Development'], results['department'])
+        self.assertEqual([7305, 7306], results['birthdate'])
+        self.assertEqual(date(1990, 1, 2), date.fromordinal(date(1970, 1, 1).toordinal() + results['birthdate'][1]))
+
+        response = self._get(response_data['next'], {}, 'application/vnd.luizalabs.columnar+json')
+        self.assertEqual(['Employee 2', 'Employee 3'], response.json()['results']['name'])
+
+        response = self._get(reverse('employee-list'), {'name': 'nobody', 'format': 'columnar'})
+        self.assertEqual({}, response.json()['results'])
+
+        response = self._get(reverse('employee-list'), {'fields': 'name,hire_date', 'limit': 1, 'format': 'columnar'})
+        response_data = response.json()
+        self.assertEqual(5, response_data['count'])
+        self.assertEqual({'name': ['Employee 0'], 'hire_date': [16436]}, response_data['results'])
+
+        # single objects are left as they are
+        response = self._get(reverse('employee-detail', [Employee.objects.first().pk]), {'format': 'columnar'})
+        self.assertEqual('1990-01-01', response.json()['birthdate'])
+
+    def test_columnar_errors(self):
+        """
+        columnar_errors returns True if error responses and lists of
+        anything but serialized employees are rendered as plain JSON.
+        """
+        payload = [{'name': 'Jane Doe', 'email': 'jane.doe@luizalabs.com'}, {'name': 'John Doe'}]
+        response = self.client.post(reverse('employee-bulk'), data=json.dumps(payload),
+                                    content_type='application/json', HTTP_AUTHORIZATION=self.auth_token,
+                                    HTTP_ACCEPT='application/vnd.luizalabs.columnar+json')
+        self.assertEqual(400, response.status_code)
+        self.assertEqual('application/vnd.luizalabs.columnar+json', response['Content-Type'])
+        response_data = response.json()
+        self.assertIsInstance(response_data, list)
+        self.assertIn('department', response_data[0])
+        self.assertIn('email', response_data[1])
+
+        renderer = ColumnarJSONRenderer()
+        rows = [{'id': 1, 'name': 'Jane Doe'}, {'id': 2}]
+        self.assertEqual(rows, json.loads(renderer.render(rows).decode('utf-8')))
+        rows = [{'id': 1, 'detail': 'Not found.'}]
+        view = EmployeeViewSet(action='list')
+        self.assertEqual(rows, json.loads(renderer.render(rows, renderer_context={'view': view}).decode('utf-8')))
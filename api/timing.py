@@ -0,0 +1,118 @@
+"""
+Per-request instrumentation.
+
+ServerTimingMiddleware counts the queries a request runs and the time
+they take, with execute wrappers on every database connection, and times
+the phases of DRF views: authentication (through ServerTimingMixin), the
+view itself and rendering. The measures go out in a ``Server-Timing``
+header, and requests slower than ``settings.SLOW_REQUEST_THRESHOLD``
+milliseconds are logged to the ``api.timing`` logger.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming(object):
+    """Measures of a single request, usable as a database execute wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.phases = OrderedDict()
+        self.view_start = self.view_end = self.render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the block to the phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def get_metrics(self, total):
+        """Return ``(name, seconds, description)`` of every measure."""
+        phases = self.phases.copy()
+        if self.view_start is not None and self.view_end is not None:
+            phases['view'] = self.view_end - self.view_start - phases.get('auth', 0.0)
+        metrics = [('db', self.db, '{} queries'.format(self.queries))]
+        metrics.extend((name, phases[name], None) for name in ('auth', 'view', 'render') if name in phases)
+        metrics.append(('total', total, None))
+        return metrics
+
+
+class ServerTimingMixin(object):
+    """Time the authentication of a DRF view as the ``auth`` phase."""
+
+    def perform_authentication(self, request):
+        timing = getattr(request, 'server_timing', None)
+        if timing is None:
+            return super().perform_authentication(request)
+        with timing.phase('auth'):
+            super().perform_authentication(request)
+
+
+class ServerTimingMiddleware(object):
+    """Report the measures of every request in a Server-Timing header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.server_timing = RequestTiming()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        if timing.view_start is not None and timing.view_end is None:
+            timing.view_end = time.perf_counter()
+        total = time.perf_counter() - start
+
+        metrics = timing.get_metrics(total)
+        response['Server-Timing'] = ', '.join(
+            '{};dur={:.2f}'.format(name, seconds * 1000) + (';desc="{}"'.format(desc) if desc else '')
+            for name, seconds, desc in metrics
+        )
+
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD', None)
+        if threshold is not None and total * 1000 >= threshold:
+            record = OrderedDict([
+                ('method', request.method),
+                ('path', request.get_full_path()),
+                ('status', response.status_code),
+                ('queries', timing.queries),
+            ])
+            record.update(('{}_ms'.format(name), round(seconds * 1000, 2)) for name, seconds, desc in metrics)
+            logger.warning('Slow request %s', json.dumps(record), extra={'timing': record})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.server_timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = request.server_timing
+        timing.view_end = timing.render_start = time.perf_counter()
+        response.add_post_render_callback(self.record_render(timing))
+        return response
+
+    def record_render(self, timing):
+        def callback(response):
+            timing.phases['render'] = time.perf_counter() - timing.render_start
+        return callback
@@ -0,0 +1,87 @@
+"""
+Upcoming birthdays and work anniversaries.
+
+Employees keep the month and day of their birthdate and hire date as
+``month * 100 + day`` in indexed columns (see Employee.normalize), which
+sort like the calendar: the days of the next N days are then one range
+of them, or two ranges joined by OR when the window crosses New Year,
+answered by the index in a single query.
+
+Employees born or hired on February 29th celebrate on February 28th in
+common years.
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractDay, ExtractMonth
+from django.utils.dateparse import parse_date
+
+# date field: its month-day column
+MONTHDAY_FIELDS = {
+    'birthdate': 'birth_monthday',
+    'hire_date': 'hire_monthday',
+}
+LEAP_DAY = 229
+
+
+def get_monthday(value):
+    """
+    Return ``month * 100 + day`` of a date, given as a date or an ISO
+    string, or the expression computing it from an expression.
+    """
+    if hasattr(value, 'resolve_expression'):
+        return ExtractMonth(value) * 100 + ExtractDay(value)
+    if isinstance(value, str):
+        value = parse_date(value)
+    if value is None:
+        return None
+    return value.month * 100 + value.day
+
+
+def get_ranges(start, days):
+    """
+    Return the ``(first, last)`` month-day ranges, both included, of the
+    ``days`` days starting on ``start``, and whether they cross New Year.
+    ``days`` is at least 1.
+    """
+    end = start + timedelta(days=days - 1)
+    first, last = get_monthday(start), get_monthday(end)
+    if last == 228 and not calendar.isleap(end.year):
+        last = LEAP_DAY
+    if end.year == start.year:
+        return [(first, last)], False
+    return [(first, 1231), (101, last)], True
+
+
+def get_next_date(value, start):
+    """Return the first anniversary of the date ``value`` on or after ``start``."""
+    year = start.year
+    if (value.month, value.day) < (start.month, start.day):
+        year += 1
+    day = value.day
+    if (value.month, day) == (2, 29) and not calendar.isleap(year):
+        day = 28
+    return date(year, value.month, day)
+
+
+def upcoming(queryset, field, start, days):
+    """
+    Filter the employees whose ``field`` anniversary falls in the ``days``
+    days starting on ``start``, in the order they come.
+    """
+    monthday_field = MONTHDAY_FIELDS[field]
+    ranges, wraps = get_ranges(start, days)
+    condition = Q()
+    for first, last in ranges:
+        condition |= Q(**{monthday_field + '__range': (first, last)})
+    queryset = queryset.filter(condition)
+
+    if not wraps:
+        return queryset.order_by(monthday_field, 'name', 'id')
+    # days after New Year come after the ones before it
+    return queryset.annotate(upcoming_wrapped=Case(
+        When(**{monthday_field + '__gte': ranges[0][0], 'then': Value(0)}),
+        default=Value(1),
+        output_field=IntegerField(),
+    )).order_by('upcoming_wrapped', monthday_field, 'name', 'id')
@@ -1,59 +1,420 @@
-from rest_framework import viewsets
+from collections import OrderedDict
 
-from api.models import Employee
-from api.serializers import EmployeeSerializer
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
 
+from api import cache, outbox
+from api.changes import EMPLOYEE_ORDERING, decode_position, encode_position, get_changes
+from api.conditional import ConditionalGetMixin
+from api.fieldsets import SparseFieldsetMixin
+from api.filters import EmployeeFilterSet, FilterSetBackend
+from api.models import Employee, EmployeeTombstone
+from api.pagination import EmployeePagination
+from api.renderers import ColumnarJSONRenderer, CSVRenderer, MessagePackRenderer, NDJSONRenderer
+from api.routers import ReplicaReadMixin
+from api.serializers import EmployeeRowSerializer, EmployeeSerializer
+from api.stats import estimate_count, get_stats
+from api.timing import ServerTimingMixin
+from api.upcoming import get_next_date
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+
+class RowListModelMixin(object):
+    """
+    List a queryset through `row_serializer_class`, a read only serializer
+    working on values_list rows rather than on model instances.
+    """
+    row_serializer_class = None
+
+    def get_row_serializer(self, **kwargs):
+        # the paginator needs its ordering fields in every row
+        kwargs.setdefault('extra_fields', getattr(self.paginator, 'ordering', ()))
+        return self.row_serializer_class(**kwargs)
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_row_serializer()
+        queryset = serializer.get_queryset(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+
+        return Response(serializer.to_representation(queryset))
+
+
+class EmployeeViewSet(ServerTimingMixin, ReplicaReadMixin, ConditionalGetMixin, cache.CachedResponseMixin,
+                      SparseFieldsetMixin, RowListModelMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows employees to be
     listed, added, editted, and removed.
     """
-    queryset = Employee.objects.all()
+    queryset = Employee.objects.select_related('department')
     serializer_class = EmployeeSerializer
+    row_serializer_class = EmployeeRowSerializer
+    # compact representations for bulk consumers, chosen with Accept or ?format=
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (MessagePackRenderer, ColumnarJSONRenderer)
+    pagination_class = EmployeePagination
+    replica_actions = (
+        'list', 'retrieve', 'stats', 'export', 'batch', 'changes', 'upcoming_birthdays', 'upcoming_anniversaries'
+    )
+    fieldset_actions = (
+        'list', 'retrieve', 'export', 'batch', 'changes', 'upcoming_birthdays', 'upcoming_anniversaries'
+    )
+    bulk_max_size = 10000
+    batch_max_size = 100
+    changes_page_size = 1000
+    upcoming_default_days = 30
+    upcoming_max_size = 1000
+    export_chunk_size = 2000
+    filter_backends = (FilterSetBackend,)
+    filterset_class = EmployeeFilterSet
+    filterset = None
 
-    def get_queryset(self):
+    def get_filterset(self):
+        """Return the filterset of the request, validated once per request."""
+        if self.filterset is None:
+            self.filterset = self.filterset_class(self.request.query_params)
+        return self.filterset
+
+    def estimate_count(self):
         """
-        This view should return a list of all the employees for the
-        filtered by the fields specified in the request
+        Count the listed employees from the workforce statistics, when
+        they are only filtered by one department and one gender, else
+        return None.
         """
-        employees = Employee.objects.all()
+        filters = self.get_filterset().cleaned_data
+        if set(filters) - {'department', 'gender'} or any(len(values) > 1 for values in filters.values()):
+            return None
+        return estimate_count(*[filters.get(param, (None,))[0] for param in ('department', 'gender')])
 
-        name = self.request.query_params.get('name')
-        email = self.request.query_params.get('email')
-        department = self.request.query_params.get('department')
-        gender = self.request.query_params.get('gender')
-        birthdate = self.request.query_params.get('birthdate')
-        birthdate_before = self.request.query_params.get('birthdate_before')
-        birthdate_after = self.request.query_params.get('birthdate_after')
-        hire_date = self.request.query_params.get('hire_date')
-        hire_date_before = self.request.query_params.get('hire_date_before')
-        hire_date_after = self.request.query_params.get('hire_date_after')
+    def check_bulk_size(self, data):
+        """
+        Reject bulk payloads that aren't lists or are larger than
+        `bulk_max_size`.
+        """
+        if not isinstance(data, list):
+            raise serializers.ValidationError({
+                'non_field_errors': ['Expected a list of items but got type "{}".'.format(type(data).__name__)]
+            })
+        if len(data) > self.bulk_max_size:
+            raise serializers.ValidationError({
+                'non_field_errors': ['Ensure this list has no more than {} items.'.format(self.bulk_max_size)]
+            })
 
-        if name is not None:
-            employees = employees.filter(name__icontains=name)
+    def get_bulk_ids(self, data):
+        """
+        Return the list of employee ids sent to a bulk route, raising
+        per item errors for anything that isn't a distinct id.
+        """
+        self.check_bulk_size(data)
 
-        if email is not None:
-            employees = employees.filter(email__icontains=email)
+        ids = []
+        seen = set()
+        errors = []
+        for item in data:
+            pk = item.get('id') if isinstance(item, dict) else item
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                errors.append({'id': ['A valid integer is required.']})
+            elif pk in seen:
+                errors.append({'id': ['This id is repeated in the batch.']})
+            else:
+                errors.append({})
+                seen.add(pk)
+            ids.append(pk)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return ids
+
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk')
+    def bulk_create(self, request):
+        """
+        Create a list of employees in a single transaction.
+        """
+        self.check_bulk_size(request.data)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """
+        Partially update a list of employees, each one identified by
+        its "id", in a single transaction.
+        """
+        ids = self.get_bulk_ids(request.data)
+        employees = Employee.objects.in_bulk(ids)
+
+        errors = [{} if pk in employees else {'id': ['Not found.']} for pk in ids]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        instances = [employees[pk] for pk in ids]
+        serializer = self.get_serializer(instances, data=request.data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """
+        Remove a list of employees, given as ids or objects with an "id",
+        in a single transaction.
+        """
+        ids = self.get_bulk_ids(request.data)
+        with transaction.atomic():
+            employees = Employee.objects.filter(pk__in=ids)
+            deleted = set(employees.values_list('pk', flat=True))
+            employees.delete()
+
+        return Response([
+            {'id': pk, 'status': 'deleted' if pk in deleted else 'not_found'}
+            for pk in ids
+        ])
+
+    def get_batch_keys(self, request):
+        """
+        Return the ``(field, value)`` pairs asked for by the comma separated
+        `ids` and `emails` parameters, in order and without duplicates.
+        """
+        keys = []
+        errors = {}
+        for param, field in (('ids', 'id'), ('emails', 'email')):
+            for value in request.query_params.get(param, '').split(','):
+                value = value.strip()
+                if not value:
+                    continue
+                if field == 'id':
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        errors.setdefault(param, []).append('"{}" is not a valid id.'.format(value))
+                        continue
+                if (field, value) not in keys:
+                    keys.append((field, value))
+
+        if not keys and not errors:
+            errors['non_field_errors'] = ['Send the employees to get as `ids` and/or `emails`.']
+        elif len(keys) > self.batch_max_size:
+            errors['non_field_errors'] = ['Ensure no more than {} employees are asked for.'.format(
+                self.batch_max_size
+            )]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return keys
+
+    @action(detail=False)
+    def batch(self, request):
+        """
+        Get up to `batch_max_size` employees by `?ids=1,2` and/or
+        `?emails=a@b.com,c@d.com`. Employees cached by a previous batch are
+        served from the employee cache, the others are read with a single
+        IN query; keys matching no employee are listed under "missing".
+        """
+        keys = self.get_batch_keys(request)
+        generation = cache.get_generation()
+        employees = cache.get_many('employee', keys, generation)
 
-        if department is not None:
-            employees = employees.filter(department__icontains=department)
+        wanted = [key for key in keys if key not in employees]
+        if wanted:
+            ids = [value for field, value in wanted if field == 'id']
+            emails = [value for field, value in wanted if field == 'email']
+            # whole employees are cached, sparse fieldsets are cut from them
+            serializer = self.row_serializer_class()
+            found = serializer.to_representation(serializer.get_queryset(
+                self.get_queryset().filter(Q(pk__in=ids) | Q(email__in=emails))
+            ))
+            fetched = {}
+            for employee in found:
+                fetched[('id', employee['id'])] = employee
+                fetched[('email', employee['email'])] = employee
+            cache.set_many('employee', fetched, generation)
+            employees.update(fetched)
 
-        if gender is not None:
-            employees = employees.filter(gender=gender)
+        results = OrderedDict()
+        missing = {'ids': [], 'emails': []}
+        for field, value in keys:
+            employee = employees.get((field, value))
+            if employee is None:
+                missing[field + 's'].append(value)
+            else:
+                results.setdefault(employee['id'], employee)
 
-        if birthdate is not None:
-            employees = employees.filter(birthdate=birthdate)
-        elif birthdate_before is not None:
-            employees = employees.filter(birthdate__lt=birthdate_before)
-        elif birthdate_after is not None:
-            employees = employees.filter(birthdate__gt=birthdate_after)
+        results = list(results.values())
 
-        if hire_date is not None:
-            employees = employees.filter(hire_date=hire_date)
-        elif hire_date_before is not None:
-            employees = employees.filter(hire_date__lt=hire_date_before)
-        elif hire_date_after is not None:
-            employees = employees.filter(hire_date__gt=hire_date_after)
+        if self.requested_fields is not None:
+            results = [{field: employee[field] for field in self.requested_fields} for employee in results]
+        return Response(OrderedDict([('results', results), ('missing', missing)]))
+
+    def get_change_positions(self, request):
+        """
+        Return the positions the change feed resumes from: the `cursor`
+        of a previous page, else the `since` date time, else the start.
+        """
+        cursor = request.query_params.get('cursor')
+        if cursor is not None:
+            try:
+                return decode_position(cursor)
+            except ValueError:
+                raise NotFound('Invalid cursor')
+
+        since = request.query_params.get('since')
+        if since is None:
+            return (None, None), (None, None)
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            raise serializers.ValidationError({'since': ['Enter a valid date time, in ISO 8601 format.']})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        # every row stamped at or after `since`
+        return (since, 0), (since, 0)
+
+    @action(detail=False)
+    def changes(self, request):
+        """
+        Feed of the employees created or updated and of the ones deleted,
+        in the order they changed, `changes_page_size` at a time. Follow
+        `next` to resume where a page ended: it is always given, and gets
+        the changes made since when polled later. `has_more` tells whether
+        changes are already waiting past this page.
+        """
+        positions = self.get_change_positions(request)
+        serializer = self.get_row_serializer(extra_fields=EMPLOYEE_ORDERING)
+        data, positions, has_more = get_changes(
+            self.get_queryset(), EmployeeTombstone.objects.all(), positions, self.changes_page_size, serializer
+        )
+
+        url = request.build_absolute_uri()
+        url = remove_query_param(url, 'since')
+        return Response(OrderedDict([
+            ('next', replace_query_param(url, 'cursor', encode_position(*positions))),
+            ('has_more', has_more),
+            ('results', data),
+        ]))
+
+    def get_upcoming_params(self, request):
+        """
+        Return the `start` date (today by default), the number of `days`
+        (1 to 365, `start` being the first) and the `limit` of employees
+        of upcoming routes.
+        """
+        errors = {}
+        start = timezone.localdate()
+        if 'start' in request.query_params:
+            try:
+                start = parse_date(request.query_params['start'])
+            except ValueError:
+                start = None
+            if start is None:
+                errors['start'] = ['Enter a valid date formatted as YYYY-MM-DD.']
+
+        numbers = {}
+        for param, default, minimum, maximum in (('days', self.upcoming_default_days, 1, 365),
+                                                 ('limit', self.upcoming_max_size, 0, self.upcoming_max_size)):
+            try:
+                numbers[param] = int(request.query_params.get(param, default))
+            except ValueError:
+                numbers[param] = -1
+            if not minimum <= numbers[param] <= maximum:
+                errors[param] = ['Enter a whole number from {} to {}.'.format(minimum, maximum)]
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return start, numbers['days'], numbers['limit']
+
+    def get_upcoming_response(self, request, field):
+        """
+        List the employees whose `field` anniversary is in the `days` days
+        from `start`, in the order they come, with its date and the
+        number of years it marks. Accepts the list filters.
+        """
+        start, days, limit = self.get_upcoming_params(request)
+        serializer = self.get_row_serializer(extra_fields=(field,))
+        queryset = self.filter_queryset(self.get_queryset()).upcoming(field, start, days)
+        rows = list(serializer.get_queryset(queryset)[:limit + 1])
+
+        results = []
+        for row, employee in zip(rows[:limit], serializer.to_representation(rows[:limit])):
+            value = getattr(row, field)
+            next_date = get_next_date(value, start)
+            results.append(OrderedDict([
+                ('date', next_date.isoformat()),
+                ('years', next_date.year - value.year),
+                ('employee', employee),
+            ]))
+        return Response(OrderedDict([('has_more', len(rows) > limit), ('results', results)]))
+
+    @action(detail=False, url_path='upcoming-birthdays')
+    def upcoming_birthdays(self, request):
+        """
+        Employees whose birthday is in the next `days` days (30 by default)
+        from `start` (today by default), soonest first, with their age.
+        """
+        return self.get_upcoming_response(request, 'birthdate')
+
+    @action(detail=False, url_path='upcoming-anniversaries')
+    def upcoming_anniversaries(self, request):
+        """
+        Employees whose work anniversary is in the next `days` days (30 by
+        default) from `start` (today by default), soonest first, with
+        their years of service.
+        """
+        return self.get_upcoming_response(request, 'hire_date')
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream every employee matching the list filters as NDJSON or CSV
+        (chosen with the Accept header or `?format=ndjson|csv`), reading
+        them from the database `export_chunk_size` rows at a time.
+        """
+        # rows are read after the view returns, pin them to its database
+        queryset = self.filter_queryset(self.get_queryset()).using(self.read_database)
+        fields = self.requested_fields or self.get_serializer_class().Meta.fields
+        columns = [self.row_serializer_class.get_column(field) for field in fields]
+        rows = queryset.values_list(*columns).iterator(chunk_size=self.export_chunk_size)
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(fields, rows),
+            content_type='{}; charset={}'.format(renderer.media_type, renderer.charset)
+        )
+        response['Content-Disposition'] = 'attachment; filename="employees.{}"'.format(renderer.format)
+        return response
+
+    @action(detail=False)
+    def stats(self, request):
+        """
+        Headcount per department, gender, department and gender, age band
+        and tenure band, read from the incrementally kept aggregates.
+        """
+        return Response(cache.get_or_compute(request, self.action, 'stats', get_stats))
+
+
+class MetricsView(ServerTimingMixin, APIView):
+    """
+    API endpoint that exposes operational metrics of the employee API.
+    """
+    permission_classes = (permissions.IsAdminUser,)
 
-        return employees
+    def get(self, request, format=None):
+        return Response({
+            'response_cache': cache.get_stats(),
+            'webhooks': outbox.get_metrics(),
+        })
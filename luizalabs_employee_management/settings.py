@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,6 +87,79 @@ DATABASES = {
     }
 }
 
+# Read replicas of 'default', where EmployeeViewSet reads go (see
+# api.routers). Set DATABASE_REPLICA=1 to read from replica.sqlite3, kept
+# up to date with `python manage.py replicate_database`.
+DATABASE_REPLICAS = []
+if os.environ.get('DATABASE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+    DATABASE_REPLICAS = ['replica']
+
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+# Seconds a user's reads stay on 'default' after they write.
+READ_YOUR_WRITES_WINDOW = 5
+
+# Seconds the employee change feed and the webhook outbox wait before
+# returning a change. Rows are stamped (`updated`, a tombstone's `deleted`)
+# when written, not when committed: a transaction committing more than this
+# after stamping its rows can slip behind a mirror's cursor and be missed.
+# Keep it above the longest transaction writing employees, e.g. bulk
+# imports, at the cost of changes showing up that much later.
+CHANGE_FEED_DELAY = 1
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Employee API responses, counts, batch entries and the generation token
+    # invalidating them all (see api.cache). Entries expire after TIMEOUT
+    # seconds and the least recently used ones are evicted past MAX_ENTRIES.
+    # LocMemCache is per process: with several workers a write only bumps
+    # the generation of the one serving it, and the others keep answering
+    # (304s included) from stale entries for up to TIMEOUT seconds. Point it
+    # at a shared backend (Memcached, Redis, database) before running more
+    # than one worker process.
+    'employees': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'employees',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Authenticated users. The short TIMEOUT bounds how long a change to a
+    # user made outside the ORM, or in another process, can go unnoticed.
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'TIMEOUT': 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+EMPLOYEE_CACHE = 'employees'
+AUTH_CACHE = 'auth'
+# Users pinned to the primary after writing (see api.routers). LocMemCache
+# is per process: with several workers, point it at a shared backend
+# (Memcached, Redis, database) or a user's next read may go to a replica.
+ROUTING_CACHE = 'default'
+
+# Requests slower than this many milliseconds are logged to "api.timing",
+# None disables the slow request log.
+SLOW_REQUEST_THRESHOLD = 500
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': (
          'rest_framework.pagination.LimitOffsetPagination'
@@ -97,8 +171,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.CachedJSONWebTokenAuthentication',
+        'api.authentication.CachedBasicAuthentication',
     ),
 }
 
@@ -29,6 +29,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-token-auth/', obtain_jwt_token, name='api-token-auth'),
     path('api-token-refresh/', refresh_jwt_token, name='api-token-refresh'),
+    path('api/v1/metrics/', api_views.MetricsView.as_view(), name='metrics'),
     path('api/v1/', include(router.urls)),
     path('docs/', include_docs_urls(
         title='Luizalabs Employee Management API',